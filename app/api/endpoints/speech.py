@@ -1,11 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Response
-from fastapi.responses import FileResponse
-from typing import Optional, Dict, Any
+from fastapi import APIRouter, UploadFile, File, HTTPException, status, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from typing import Optional, Dict, Any, AsyncIterator, Tuple
+import hashlib
 import os
+import re
 import logging
 
-from app.services.tts_service import TTSService
+from app.services.audio_codec import AUDIO_MEDIA_TYPES, negotiate_format
+from app.services.audio_upload import UnsupportedAudioError, UploadTooLargeError, ingest_audio, iter_upload_file
+from app.services.tts_service import STREAMABLE_FORMATS, TTSError, TTSService, split_sentences
 from app.services.stt_service import stt_service  # Will be updated in a separate step
+from blocking_io import PoolSaturatedError
+from config import STT_MAX_UPLOAD_BYTES, TTS_DEFAULT_FORMAT, TTS_MAX_TEXT_CHARS
 
 # Configure logging
 logging.basicConfig(
@@ -30,6 +36,138 @@ from pydantic import BaseModel
 class TTSRequest(BaseModel):
     text: str
     language: str = "en"
+    format: Optional[str] = None  # mp3, ogg (Opus) or wav; overrides the Accept header
+    persona: Optional[str] = None  # e.g. "swag_bhai"; sets the speaking rate of the offline engine
+    stream: bool = True  # False (and always for ogg): long text comes back as one complete file with a Content-Length
+
+
+async def _stream_body(first: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Send the already-rendered first chunk, then the rest as they complete."""
+    yield first
+    try:
+        async for piece in rest:
+            yield piece
+    except (TTSError, PoolSaturatedError) as e:
+        # Headers are gone; the client keeps the audio sent so far
+        logger.error(f"TTS stream ended early: {str(e)}")
+    finally:
+        await rest.aclose()
+
+# Cached renderings never change under their key, so clients may keep them
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_NO_CACHE_HEADERS = {
+    "Cache-Control": "no-cache, no-store, must-revalidate",
+    "Pragma": "no-cache",
+    "Expires": "0",
+}
+
+_TTS_KEY = re.compile(r"^[0-9a-f]{64}$")
+
+
+class _RangeNotSatisfiable(Exception):
+    """The Range header names no byte of the audio."""
+
+
+def _etag(data: bytes) -> str:
+    """Strong ETag from a hash of the audio bytes."""
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header lists ``etag`` (weak comparison, as RFC 9110 asks)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range against a body of ``size`` bytes.
+    
+    Returns:
+        Inclusive (start, end) offsets, or None when the header should be
+        ignored (other units, multiple ranges or malformed)
+    
+    Raises:
+        _RangeNotSatisfiable: If the range lies entirely past the end
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                raise _RangeNotSatisfiable()
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise _RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _audio_response(
+    http_request: Request,
+    data: bytes,
+    audio_format: str,
+    extra_headers: Dict[str, str]
+) -> Response:
+    """
+    Serve complete audio with an ETag, answering conditional and range requests.
+    
+    ``If-None-Match`` with the current ETag gets a 304 without a body; a
+    single ``Range`` (honoured only while ``If-Range``, if sent, still
+    matches) gets a 206 with that slice, so players can seek without
+    downloading the whole clip again.
+    
+    Args:
+        http_request: The incoming request, for its conditional headers
+        data: The complete audio file
+        audio_format: One of AUDIO_MEDIA_TYPES
+        extra_headers: Caching and other headers to add to every response
+    """
+    etag = _etag(data)
+    headers = {
+        "Content-Disposition": f"inline; filename=speech.{audio_format}",
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Credentials": "true",
+        **extra_headers
+    }
+    if _etag_matches(http_request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    media_type = AUDIO_MEDIA_TYPES[audio_format]
+    range_header = http_request.headers.get("range")
+    if_range = http_request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = _parse_range(range_header, len(data))
+        except _RangeNotSatisfiable:
+            return Response(
+                status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{len(data)}"}
+            )
+        if byte_range:
+            start, end = byte_range
+            return Response(
+                content=data[start:end + 1],
+                status_code=status.HTTP_206_PARTIAL_CONTENT,
+                media_type=media_type,
+                headers={**headers, "Content-Range": f"bytes {start}-{end}/{len(data)}"}
+            )
+    return Response(content=data, media_type=media_type, headers=headers)
+
 
 @router.options("/tts")
 async def tts_options():
@@ -49,19 +187,35 @@ async def tts_options():
 @router.post("/tts")
 async def text_to_speech(
     request: TTSRequest,
-    response: Response
+    response: Response,
+    http_request: Request
 ):
     """
     Convert text to speech in the specified language.
     
+    The output format comes from the ``format`` field, else the Accept header
+    (audio/mpeg, audio/ogg, audio/wav), else TTS_DEFAULT_FORMAT. MP3 is served
+    as synthesized; Ogg/Opus and WAV are transcoded on the audio pool.
+    
+    Text longer than one sentence is split into chunks that are synthesized
+    in parallel and streamed in order with chunked transfer encoding, so the
+    first audio goes out as soon as the first chunk is ready. With
+    ``stream: false``, and always for Ogg (whose separately encoded chunks
+    would form a chained stream), the chunks are assembled into one file instead.
+    
+    Complete files carry an ETag and honour If-None-Match and Range. When
+    the audio is in the TTS cache, X-TTS-Key and Content-Location name the
+    GET /tts/{key} URL, which clients can cache for good and replay from.
+    
     Args:
-        text: The text to convert to speech (max 500 characters)
+        text: The text to convert to speech (max TTS_MAX_TEXT_CHARS characters)
         language: Language code (hi for Hindi, en for English, etc.)
+        format: Optional output format (mp3, ogg or wav)
+        persona: Optional persona id for the voice
         
     Returns:
         Audio file response with proper headers
     """
-    audio_path = None
     try:
         if not tts_service:
             error_msg = "TTS service is not available"
@@ -88,8 +242,8 @@ async def text_to_speech(
                 }
             )
             
-        if len(request.text) > 500:
-            error_msg = "Text is too long. Maximum 500 characters allowed."
+        if len(request.text) > TTS_MAX_TEXT_CHARS:
+            error_msg = f"Text is too long. Maximum {TTS_MAX_TEXT_CHARS} characters allowed."
             logger.warning(f"{error_msg} Got {len(request.text)} characters")
             return JSONResponse(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -100,62 +254,104 @@ async def text_to_speech(
                 }
             )
             
-        # Generate speech
-        language = request.language or "en"
-        logger.info(f"Generating TTS for {len(request.text)} characters in {language}")
-        
-        # Call the async method and await the result
-        audio_path, error = await tts_service.text_to_speech(request.text, language=language)
-        
-        if error or not audio_path:
-            error_msg = f"Failed to generate speech: {error}"
-            logger.error(error_msg)
+        audio_format = negotiate_format(
+            http_request.headers.get("accept"), request.format, TTS_DEFAULT_FORMAT
+        )
+        if audio_format is None:
+            error_msg = f"Unsupported audio format: {request.format}. Use one of: {', '.join(AUDIO_MEDIA_TYPES)}"
+            logger.warning(error_msg)
             return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                status_code=status.HTTP_400_BAD_REQUEST,
                 content={"error": error_msg},
                 headers={
-                    "Content-Type": "application/json",
                     "Access-Control-Allow-Origin": "*",
                     "Access-Control-Allow-Credentials": "true"
                 }
             )
             
-        if not os.path.exists(audio_path):
-            error_msg = f"Generated audio file not found at: {audio_path}"
+        # Generate speech
+        language = request.language or "en"
+        logger.info(f"Generating TTS for {len(request.text)} characters in {language} as {audio_format}")
+        
+        # Common response headers
+        media_type = AUDIO_MEDIA_TYPES[audio_format]
+        response_headers = {
+            "Content-Type": media_type,
+            "Content-Disposition": f"inline; filename=speech.{audio_format}",
+            **_NO_CACHE_HEADERS,
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Credentials": "true",
+            "Vary": "Origin, Accept"
+        }
+        
+        if request.stream and audio_format in STREAMABLE_FORMATS and len(split_sentences(request.text)) > 1:
+            stream = tts_service.stream_audio(
+                request.text, language=language, audio_format=audio_format, persona=request.persona
+            )
+            try:
+                # Wait for the first chunk so a failure can still get a proper status
+                first_chunk = await stream.__anext__()
+            except TTSError as e:
+                await stream.aclose()
+                error_msg = f"Failed to generate speech: {str(e)}"
+                logger.error(error_msg)
+                return JSONResponse(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    content={"error": error_msg},
+                    headers={
+                        "Content-Type": "application/json",
+                        "Access-Control-Allow-Origin": "*",
+                        "Access-Control-Allow-Credentials": "true"
+                    }
+                )
+            return StreamingResponse(
+                _stream_body(first_chunk, stream),
+                media_type=media_type,
+                headers=response_headers
+            )
+        
+        # Served from the TTS cache when this text (or each of its chunks) was rendered before
+        audio_data, error = await tts_service.render_full(
+            request.text, language=language, audio_format=audio_format, persona=request.persona
+        )
+        
+        if error or not audio_data:
+            error_msg = f"Failed to generate speech: {error}"
             logger.error(error_msg)
             return JSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={"error": "Generated audio file not found"},
+                content={"error": error_msg},
                 headers={
                     "Content-Type": "application/json",
                     "Access-Control-Allow-Origin": "*",
                     "Access-Control-Allow-Credentials": "true"
                 }
             )
+            
+        key = tts_service.cached_key(request.text, language, audio_format, request.persona)
+        if key:
+            # Replays can GET the audio by key and be served from the browser cache
+            cache_headers = {
+                "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+                "Content-Location": http_request.url_for("get_tts_audio", key=key).path,
+                "X-TTS-Key": key,
+                "Vary": "Origin, Accept"
+            }
+        else:
+            cache_headers = {**_NO_CACHE_HEADERS, "Vary": "Origin, Accept"}
+        return _audio_response(http_request, audio_data, audio_format, cache_headers)
         
-        # Read the audio file
-        with open(audio_path, 'rb') as f:
-            audio_data = f.read()
-        
-        # Common response headers
-        response_headers = {
-            "Content-Type": "audio/wav",
-            "Content-Disposition": "inline; filename=speech.wav",
-            "Cache-Control": "no-cache, no-store, must-revalidate",
-            "Pragma": "no-cache",
-            "Expires": "0",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Credentials": "true",
-            "Vary": "Origin"
-        }
-        
-        return Response(
-            content=audio_data,
-            media_type="audio/wav",
-            headers=response_headers,
-            status_code=200
+    except PoolSaturatedError as e:
+        logger.warning(f"Rejecting TTS request: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"error": "Speech synthesis is busy, please retry shortly"},
+            headers={
+                "Retry-After": "1",
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Credentials": "true"
+            }
         )
-        
     except Exception as e:
         error_msg = f"Error in text_to_speech: {str(e)}"
         logger.error(error_msg, exc_info=True)
@@ -182,63 +378,92 @@ async def text_to_speech(
                 "Access-Control-Allow-Credentials": "true"
             }
         )
-        
-    finally:
-        # Clean up the temporary file if it exists
-        if audio_path and os.path.exists(audio_path):
-            try:
-                os.remove(audio_path)
-                logger.info(f"Cleaned up temporary audio file: {audio_path}")
-            except Exception as e:
-                logger.warning(f"Failed to remove temporary audio file {audio_path}: {e}")
-            except Exception as e:
-                logger.error(f"Error cleaning up audio file {audio_path}: {str(e)}")
 
-@router.post("/stt", response_model=Dict[str, Any])
-async def speech_to_text(
-    audio: UploadFile = File(..., description="Audio file to transcribe"),
-    language: str = "en"
-) -> Dict[str, Any]:
+
+@router.api_route("/tts/{key}", methods=["GET", "HEAD"], name="get_tts_audio")
+async def get_tts_audio(key: str, http_request: Request):
     """
-    Convert speech to text in the specified language.
+    Serve cached TTS audio by the key from a previous POST /tts (its X-TTS-Key header).
+    
+    The key addresses the text, voice and format, so the response is
+    immutable: it carries a long-lived Cache-Control, an ETag for
+    revalidation and supports Range requests for seeking.
     
     Args:
-        audio: Audio file to transcribe (WAV, MP3, OGG, etc.)
-        language: Language code (hi for Hindi, en for English, etc.)
+        key: 64-character hex cache key
         
     Returns:
-        Dict containing the transcribed text and metadata
+        The audio, or 404 when the key is unknown or has been evicted
     """
-    # Check if audio file was provided
-    if not audio:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No audio file provided"
+    if not tts_service:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"error": "TTS service is not available"},
+            headers={
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Credentials": "true"
+            }
         )
-    
-    # Validate file type
-    if not audio.content_type or not audio.content_type.startswith('audio/'):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File must be an audio file"
+    path = tts_service.cache.path(key) if _TTS_KEY.match(key) else None
+    audio_format = os.path.splitext(path)[1].lstrip(".") if path else None
+    try:
+        data = await tts_service.cache.get_async(key) if audio_format in AUDIO_MEDIA_TYPES else None
+    except PoolSaturatedError as e:
+        logger.warning(f"Rejecting TTS audio request: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"error": "Speech synthesis is busy, please retry shortly"},
+            headers={
+                "Retry-After": "1",
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Credentials": "true"
+            }
+        )
+    if data is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={"error": "Audio not found; request it again with POST /tts"},
+            headers={
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Credentials": "true"
+            }
         )
+    return _audio_response(http_request, data, audio_format, {"Cache-Control": IMMUTABLE_CACHE_CONTROL})
+
+
+async def _transcribe_upload(
+    chunks: AsyncIterator[bytes],
+    declared_length: Optional[int],
+    language: str,
+    content_type: Optional[str],
+    engine: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Ingest an upload with early limits, then transcribe it.
+    
+    Decoding starts only once the whole upload is in: it runs in the bounded
+    audio_decode process pool, and the VAD trim and engine fallback need the
+    complete clip anyway. Only the size and format checks happen per chunk.
     
+    Raises:
+        HTTPException: 413 for oversized, 415 for unsupported, 400 for empty
+            or unrecognized audio, 503 when decoding is backed up, 500 otherwise
+    """
+    upload = None
     try:
-        # Read the file content
-        logger.info(f"Received audio file: {audio.filename}, size: {audio.size} bytes, type: {audio.content_type}")
-        contents = await audio.read()
-        
-        if not contents:
+        upload = await ingest_audio(chunks, declared_length=declared_length)
+        if not upload.size:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Audio file is empty"
             )
         
         # Transcribe the audio
-        logger.info(f"Transcribing audio (language: {language}, size: {len(contents)} bytes)")
+        logger.info(f"Transcribing audio (language: {language}, size: {upload.size} bytes, format: {upload.audio_format})")
         text, error_msg = await stt_service.transcribe_audio(
-            audio_file=contents,
-            language=language
+            audio_file=upload.source,
+            language=language,
+            engine=engine
         )
         
         if error_msg or not text:
@@ -254,12 +479,31 @@ async def speech_to_text(
             "status": "success",
             "text": text,
             "language": language,
-            "audio_type": audio.content_type,
+            "audio_type": content_type,
             "text_length": len(text)
         }
         
     except HTTPException:
         raise
+    except UploadTooLargeError as e:
+        logger.warning(f"Rejecting STT upload: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Audio file is too large. Maximum {STT_MAX_UPLOAD_BYTES} bytes allowed."
+        )
+    except UnsupportedAudioError as e:
+        logger.warning(f"Rejecting STT upload: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Unsupported audio format"
+        )
+    except PoolSaturatedError as e:
+        logger.warning(f"Rejecting STT request: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Speech recognition is busy, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         error_msg = f"Error in speech-to-text: {str(e)}"
         logger.error(error_msg, exc_info=True)
@@ -267,3 +511,78 @@ async def speech_to_text(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=error_msg
         )
+    finally:
+        if upload is not None:
+            upload.close()
+
+
+@router.post("/stt", response_model=Dict[str, Any])
+async def speech_to_text(
+    audio: UploadFile = File(..., description="Audio file to transcribe"),
+    language: str = "en",
+    engine: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Convert speech to text in the specified language.
+    
+    The file is read in chunks: it is refused once it passes
+    STT_MAX_UPLOAD_BYTES or if its first bytes are not an audio container,
+    and kept on disk rather than in memory above STT_UPLOAD_SPOOL_BYTES.
+    
+    Args:
+        audio: Audio file to transcribe (WAV, MP3, OGG, etc.)
+        language: Language code (hi for Hindi, en for English, etc.)
+        engine: Optional recognizer to try first ("google", or "vosk" for offline en/hi)
+        
+    Returns:
+        Dict containing the transcribed text and metadata
+    """
+    # Check if audio file was provided
+    if not audio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No audio file provided"
+        )
+    
+    # Validate file type
+    if not audio.content_type or not audio.content_type.startswith('audio/'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be an audio file"
+        )
+    
+    logger.info(f"Received audio file: {audio.filename}, size: {audio.size} bytes, type: {audio.content_type}")
+    return await _transcribe_upload(iter_upload_file(audio), audio.size, language, audio.content_type, engine)
+
+
+@router.post("/stt/stream", response_model=Dict[str, Any])
+async def speech_to_text_stream(
+    http_request: Request,
+    language: str = "en",
+    engine: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Convert speech to text from a raw audio request body.
+    
+    Unlike the multipart /stt, whose body is parsed in full before the
+    handler runs, the body here is consumed as it arrives: a Content-Length
+    over STT_MAX_UPLOAD_BYTES is refused before reading, an unsupported
+    container after its first bytes, and an oversized chunked upload as
+    soon as it crosses the limit.
+    
+    Args:
+        language: Language code (hi for Hindi, en for English, etc.)
+        engine: Optional recognizer to try first ("google", or "vosk" for offline en/hi)
+        
+    Returns:
+        Dict containing the transcribed text and metadata
+    """
+    content_type = http_request.headers.get("content-type")
+    if content_type and not content_type.startswith(("audio/", "video/webm", "application/octet-stream")):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Body must be audio"
+        )
+    content_length = http_request.headers.get("content-length")
+    declared_length = int(content_length) if content_length and content_length.isdigit() else None
+    return await _transcribe_upload(http_request.stream(), declared_length, language, content_type, engine)
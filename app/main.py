@@ -1,6 +1,7 @@
-from fastapi import FastAPI, Request, Response, status, HTTPException
+from fastapi import Depends, FastAPI, Request, Response, status, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, Response as FastAPIResponse
+import asyncio
 import logging
 from dotenv import load_dotenv
 from typing import Optional, Union, Dict, Any
@@ -72,15 +73,25 @@ app.add_middleware(
 
 # Import and include routers after app is created
 from app.api.endpoints import chat, speech
+from app.services.stt_service import stt_service
+from app.services.tts_warmup import tts_warmup
+from blocking_io import run_blocking
+from config import TTS_WARM_ON_STARTUP
+from metrics import get_metrics, require_metrics_token
 
 # Include routers with proper prefixes
 app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
 app.include_router(speech.router, prefix="/api/speech", tags=["Speech"])
 
-# Health check endpoint
+# Health check endpoint; tts_warm turns true once startup pre-rendering is done
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "tts_warm": tts_warmup.ready}
+
+# Runtime counters (caches, blocking pools) registered by the services; needs METRICS_TOKEN
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    return get_metrics()
 
 # Root endpoint
 @app.get("/")
@@ -97,3 +108,7 @@ async def startup_event():
     logger.info("Starting GigaBhai API server...")
     logger.info(f"Environment: {os.getenv('ENV', 'development')}")
     logger.info(f"Firebase Project: {os.getenv('FIREBASE_PROJECT_ID', 'not set')}")
+    if TTS_WARM_ON_STARTUP and speech.tts_service:
+        tts_warmup.start(speech.tts_service)
+    # Offline STT models take a while to load; do it before the first upload needs them
+    app.state.stt_preload = asyncio.get_running_loop().create_task(run_blocking("audio", stt_service.preload))
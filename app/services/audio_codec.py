@@ -0,0 +1,379 @@
+import logging
+import struct
+import subprocess
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from config import FFMPEG_BINARY, TTS_OPUS_BITRATE
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for a single ffmpeg run
+TRANSCODE_TIMEOUT_SECONDS = 30
+
+# Output formats the TTS endpoint can serve, by file extension
+AUDIO_MEDIA_TYPES: Dict[str, str] = {
+    "mp3": "audio/mpeg",
+    "ogg": "audio/ogg",
+    "wav": "audio/wav",
+}
+
+# Accept-header media types (and format field aliases) mapped to a format
+_FORMAT_ALIASES: Dict[str, str] = {
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "mp3": "mp3",
+    "audio/ogg": "ogg",
+    "audio/opus": "ogg",
+    "ogg": "ogg",
+    "opus": "ogg",
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/x-wav": "wav",
+    "wav": "wav",
+}
+
+
+class AudioCodecError(RuntimeError):
+    """ffmpeg failed to decode or encode the audio."""
+
+
+class AudioTooLongError(AudioCodecError):
+    """The audio runs longer than the caller allows."""
+
+
+class PCMFormat(NamedTuple):
+    """Layout of interleaved PCM samples."""
+    sample_rate: int
+    channels: int
+    sample_width: int  # Bytes per sample
+
+    @property
+    def bytes_per_second(self) -> int:
+        return self.sample_rate * self.channels * self.sample_width
+
+
+def transcode(
+    data: Optional[bytes],
+    input_format: Optional[str],
+    output_format: str,
+    output_args: Optional[List[str]] = None,
+    timeout: float = TRANSCODE_TIMEOUT_SECONDS,
+    input_path: Optional[str] = None
+) -> bytes:
+    """
+    Transcode audio entirely through pipes: bytes in on stdin, bytes out on stdout.
+
+    Args:
+        data: Encoded input audio; None when reading ``input_path``
+        input_format: ffmpeg demuxer name of the input (e.g. "mp3"); None lets ffmpeg probe it
+        output_format: ffmpeg muxer name of the output (e.g. "wav", "ogg")
+        output_args: Extra encoder arguments (codec, bitrate, sample rate...)
+        timeout: Seconds before ffmpeg is killed
+        input_path: File for ffmpeg to read itself instead of ``data``, so it
+            streams from disk (and can seek, which MP4 with a trailing index needs)
+
+    Returns:
+        Encoded output audio
+    """
+    command = [
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-nostdin",
+        *(["-f", input_format] if input_format else []), "-i", input_path or "pipe:0",
+        *(output_args or []),
+        "-f", output_format, "pipe:1",
+    ]
+    try:
+        result = subprocess.run(
+            command, input=data, stdin=None if input_path is None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        raise AudioCodecError(f"ffmpeg timed out after {timeout}s")
+    except FileNotFoundError:
+        raise AudioCodecError(f"ffmpeg not found ({FFMPEG_BINARY})")
+    if result.returncode != 0 or not result.stdout:
+        raise AudioCodecError(f"ffmpeg failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    output = result.stdout
+    if output_format == "wav":
+        output = fix_wav_header(output)
+    return output
+
+
+def decode_pcm(
+    source: Union[bytes, str],
+    sample_rate: int = 16000,
+    max_seconds: Optional[float] = None,
+    timeout: float = TRANSCODE_TIMEOUT_SECONDS
+) -> bytes:
+    """
+    Decode audio of any container ffmpeg can probe to raw mono 16-bit PCM.
+    
+    Decoding, downmixing and resampling happen in a single ffmpeg run. With
+    ``max_seconds`` ffmpeg stops just past the limit, so an overlong upload
+    costs no more than an acceptable one before it is rejected.
+    
+    Args:
+        source: Encoded audio (WAV, MP3, Ogg, WebM, M4A...), or the path of a file holding it
+        sample_rate: Output sample rate in Hz
+        max_seconds: Longest audio accepted; None for no limit
+        timeout: Seconds before ffmpeg is killed
+        
+    Returns:
+        Little-endian signed 16-bit mono samples
+        
+    Raises:
+        AudioTooLongError: If the audio is longer than ``max_seconds``
+        AudioCodecError: If ffmpeg cannot decode the data or times out
+    """
+    args = ["-ac", "1", "-ar", str(sample_rate), "-acodec", "pcm_s16le"]
+    if max_seconds:
+        args += ["-t", f"{max_seconds + 0.5:.3f}"]
+    if isinstance(source, str):
+        pcm = transcode(None, None, "s16le", args, timeout, input_path=source)
+    else:
+        pcm = transcode(source, None, "s16le", args, timeout)
+    seconds = len(pcm) / PCMFormat(sample_rate, 1, 2).bytes_per_second
+    if max_seconds and seconds > max_seconds:
+        raise AudioTooLongError(f"Audio is longer than {max_seconds:g} seconds")
+    return pcm
+
+
+def fix_wav_header(data: bytes) -> bytes:
+    """
+    Fill in the RIFF and data chunk sizes of a WAV written to a pipe.
+
+    ffmpeg cannot seek back on a pipe, so it leaves both sizes as placeholders;
+    with the whole file in memory they can be patched in place.
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return data
+    buffer = bytearray(data)
+    struct.pack_into("<I", buffer, 4, len(buffer) - 8)
+    offset = 12
+    while offset + 8 <= len(buffer):
+        chunk_id = bytes(buffer[offset:offset + 4])
+        if chunk_id == b"data":
+            struct.pack_into("<I", buffer, offset + 4, len(buffer) - offset - 8)
+            break
+        chunk_size = struct.unpack_from("<I", buffer, offset + 4)[0]
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return bytes(buffer)
+
+
+def _wav_chunks(data: bytes) -> Dict[bytes, int]:
+    """Offsets of the RIFF chunks of a WAV file, up to and including the data chunk."""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise AudioCodecError("Not a WAV file")
+    chunks = {}
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = bytes(data[offset:offset + 4])
+        chunks.setdefault(chunk_id, offset)
+        if chunk_id == b"data":
+            return chunks
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        offset += 8 + chunk_size + (chunk_size & 1)
+    raise AudioCodecError("WAV file has no data chunk")
+
+
+def split_wav(data: bytes) -> Tuple[bytes, bytes]:
+    """
+    Split a WAV file into its header (through the data chunk header) and PCM samples.
+
+    Raises:
+        AudioCodecError: If the data is not a WAV file with a data chunk
+    """
+    offset = _wav_chunks(data)[b"data"]
+    return data[:offset + 8], data[offset + 8:]
+
+
+def wav_samples(data: bytes) -> Tuple[PCMFormat, memoryview]:
+    """
+    Sample format and a zero-copy view of the samples of a WAV file.
+
+    Raises:
+        AudioCodecError: If the data is not a PCM WAV file
+    """
+    chunks = _wav_chunks(data)
+    if b"fmt " not in chunks:
+        raise AudioCodecError("WAV file has no fmt chunk")
+    fmt = chunks[b"fmt "] + 8
+    audio_format, channels, sample_rate = struct.unpack_from("<HHI", data, fmt)
+    bits = struct.unpack_from("<H", data, fmt + 14)[0]
+    if audio_format != 1:
+        raise AudioCodecError(f"WAV file is not PCM (format {audio_format})")
+    start = chunks[b"data"] + 8
+    # Piped WAVs may carry a placeholder size; trust the bytes actually present
+    size = min(struct.unpack_from("<I", data, start - 4)[0], len(data) - start)
+    return PCMFormat(sample_rate, channels, bits // 8), memoryview(data)[start:start + size]
+
+
+def wav_header(pcm_format: PCMFormat, data_size: int) -> bytes:
+    """Canonical 44-byte PCM WAV header for ``data_size`` bytes of samples."""
+    block_align = pcm_format.channels * pcm_format.sample_width
+    return (
+        b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVE"
+        + b"fmt " + struct.pack(
+            "<IHHIIHH", 16, 1, pcm_format.channels, pcm_format.sample_rate,
+            pcm_format.sample_rate * block_align, block_align, pcm_format.sample_width * 8
+        )
+        + b"data" + struct.pack("<I", data_size)
+    )
+
+
+def resample_wav(data: bytes, pcm_format: PCMFormat) -> bytes:
+    """Convert a WAV file to 16-bit PCM at ``pcm_format``'s rate and channel count."""
+    return transcode(data, "wav", "wav", [
+        "-acodec", "pcm_s16le", "-ar", str(pcm_format.sample_rate), "-ac", str(pcm_format.channels)
+    ])
+
+
+def assemble_wav(chunks: List[bytes]) -> bytes:
+    """
+    Join WAV files end to end into one WAV file.
+
+    Each chunk is parsed once and its samples are taken as a memoryview;
+    the output is then built by a single ``bytes.join``, which sizes the
+    result up front and copies every sample exactly once, header first. The
+    cost is linear in the output, unlike repeated ``AudioSegment`` addition,
+    which copies everything accumulated so far at every step. Chunks in a
+    different format than the first (e.g. from a fallback engine) are
+    resampled to match.
+
+    Args:
+        chunks: WAV files in playback order
+
+    Returns:
+        A single WAV file
+    """
+    target: Optional[PCMFormat] = None
+    parts: List[memoryview] = []
+    for chunk in chunks:
+        pcm_format, samples = wav_samples(chunk)
+        if target is None:
+            target = pcm_format
+        elif pcm_format != target:
+            pcm_format, samples = wav_samples(resample_wav(chunk, target))
+        parts.append(samples)
+    if target is None:
+        raise AudioCodecError("No audio to assemble")
+    return b"".join([wav_header(target, sum(len(part) for part in parts)), *parts])
+
+
+def assemble_speech(chunks: List[bytes], audio_format: str) -> bytes:
+    """
+    Join separately rendered chunks into one file of ``audio_format``.
+
+    MP3 chunks are joined as they are (frames concatenate). WAV chunks are
+    assembled into one PCM buffer; for Ogg/Opus that buffer is then encoded
+    once, so the output is a single Ogg stream rather than a chain of them.
+
+    Args:
+        chunks: Chunks in playback order, MP3 for "mp3" output and WAV otherwise
+        audio_format: One of AUDIO_MEDIA_TYPES
+    """
+    if audio_format == "mp3":
+        return b"".join(chunks)
+    wav = assemble_wav(chunks)
+    return wav if audio_format == "wav" else encode_speech(wav, audio_format, "wav")
+
+
+def streaming_wav_header(header: bytes) -> bytes:
+    """
+    Mark a WAV header (as returned by split_wav) as open-ended for streaming.
+
+    The total length is unknown until the last chunk is rendered, so both
+    sizes are set to 0xFFFFFFFF, the convention players accept for streams.
+    """
+    buffer = bytearray(header)
+    struct.pack_into("<I", buffer, 4, 0xFFFFFFFF)
+    struct.pack_into("<I", buffer, len(buffer) - 4, 0xFFFFFFFF)
+    return bytes(buffer)
+
+
+# Encoder arguments per output format
+_ENCODER_ARGS: Dict[str, List[str]] = {
+    "wav": ["-acodec", "pcm_s16le"],
+    "ogg": ["-c:a", "libopus", "-b:a", TTS_OPUS_BITRATE, "-application", "voip"],
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "48k"],
+}
+
+
+def mp3_to_wav(data: bytes) -> bytes:
+    """Decode MP3 bytes to 16-bit PCM WAV bytes."""
+    return transcode(data, "mp3", "wav", _ENCODER_ARGS["wav"])
+
+
+def mp3_to_opus(data: bytes) -> bytes:
+    """Re-encode MP3 bytes as Opus in an Ogg container, tuned for speech."""
+    return transcode(data, "mp3", "ogg", _ENCODER_ARGS["ogg"])
+
+
+def encode_speech(data: bytes, audio_format: str, source_format: str = "mp3") -> bytes:
+    """
+    Produce ``audio_format`` from synthesized audio, transcoding only when needed.
+
+    Args:
+        data: Audio as produced by the TTS engine
+        audio_format: One of AUDIO_MEDIA_TYPES
+        source_format: Format of ``data`` (gTTS produces "mp3", espeak-ng "wav")
+
+    Returns:
+        Encoded audio; the input itself when the formats match
+    """
+    if audio_format not in _ENCODER_ARGS:
+        raise ValueError(f"Unsupported audio format: {audio_format}")
+    if audio_format == source_format:
+        return data
+    return transcode(data, source_format, audio_format, _ENCODER_ARGS[audio_format])
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    ranges = []
+    for part in accept.split(","):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+            elif name.strip() == "codecs" and value.strip('"').lower() != "opus" and media_type == "audio/ogg":
+                quality = 0.0  # Ogg with a codec we do not produce
+        ranges.append((media_type.lower(), quality))
+    return ranges
+
+
+def negotiate_format(accept: Optional[str], requested: Optional[str], default: str) -> Optional[str]:
+    """
+    Pick the TTS output format for a request.
+
+    An explicit ``requested`` format wins; otherwise the highest-quality
+    Accept entry naming a supported format is used. Wildcards, a missing
+    header, or one naming no audio type we produce (e.g. plain
+    ``application/json`` from older clients) fall back to ``default``.
+
+    Args:
+        accept: Value of the Accept header, if any
+        requested: Format named in the request body, if any
+        default: Format to serve when the client expresses no preference
+
+    Returns:
+        A key of AUDIO_MEDIA_TYPES, or None when ``requested`` is not supported
+    """
+    if requested:
+        return _FORMAT_ALIASES.get(requested.lower().strip())
+    if not accept:
+        return default
+    best, best_quality = None, 0.0
+    for media_type, quality in _parse_accept(accept):
+        if quality <= best_quality:
+            continue
+        if media_type in ("*/*", "audio/*"):
+            best, best_quality = default, quality
+        elif _FORMAT_ALIASES.get(media_type) and media_type.startswith("audio/"):
+            best, best_quality = _FORMAT_ALIASES[media_type], quality
+    return best or default
@@ -0,0 +1,200 @@
+import logging
+import os
+import tempfile
+from typing import AsyncIterator, Optional, Union
+
+from blocking_io import run_blocking
+from config import STT_MAX_UPLOAD_BYTES, STT_UPLOAD_SPOOL_BYTES, UPLOAD_DIR
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the client per step
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+# Enough of the upload to recognize every container below
+SNIFF_BYTES = 12
+
+
+class UploadRejectedError(ValueError):
+    """The upload was refused before it was fully read."""
+
+
+class UploadTooLargeError(UploadRejectedError):
+    """The upload is larger than the configured maximum."""
+
+
+class UnsupportedAudioError(UploadRejectedError):
+    """The upload does not start like any audio container we decode."""
+
+
+def sniff_audio_format(head: bytes) -> Optional[str]:
+    """
+    Identify an audio container from its first bytes.
+    
+    Args:
+        head: At least SNIFF_BYTES bytes from the start of the file, when available
+        
+    Returns:
+        A short container name ("wav", "mp3", "ogg", "webm"...), or None
+    """
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"  # Matroska/WebM, as recorded by browsers
+    if head[4:8] == b"ftyp":
+        return "mp4"  # M4A/AAC, 3GP from mobile recorders
+    if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if head[:5] == b"#!AMR":
+        return "amr"
+    if head[:4] == b"caff":
+        return "caf"
+    if head[:3] == b"ID3":
+        return "mp3"
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        # MPEG audio frame sync; ADTS AAC shares it with layer bits 00
+        return "aac" if head[1] & 0x06 == 0 else "mp3"
+    return None
+
+
+class AudioUpload:
+    """Audio received from a client, held in memory or spooled to a file.
+
+    Chunks accumulate in memory until the upload passes ``spool_bytes``;
+    from then on they go to a file in UPLOAD_DIR, so small clips never
+    touch disk and large ones never sit whole in memory. ``source`` is
+    what the decoder takes: the bytes, or the path for ffmpeg to read
+    itself. Close the upload to remove its file.
+    """
+
+    def __init__(self, spool_bytes: Optional[int] = None, directory: Optional[str] = None):
+        self.spool_bytes = STT_UPLOAD_SPOOL_BYTES if spool_bytes is None else spool_bytes
+        self.directory = directory or UPLOAD_DIR
+        self.audio_format: Optional[str] = None
+        self.size = 0
+        self.path: Optional[str] = None
+        self._buffer = bytearray()
+        self._file = None
+
+    @property
+    def spooled(self) -> bool:
+        return self.path is not None
+
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk (blocking once the upload is spooled to disk)."""
+        self.size += len(chunk)
+        if self._file is None and len(self._buffer) + len(chunk) <= self.spool_bytes:
+            self._buffer += chunk
+            return
+        if self._file is None:
+            fd, self.path = tempfile.mkstemp(dir=self.directory, suffix=".upload")
+            self._file = os.fdopen(fd, "wb")
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        self._file.write(chunk)
+
+    def finish(self) -> None:
+        """Flush a spooled upload so its file can be read by another process."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """The upload as bytes, or the path of its spool file."""
+        return self.path if self.path else bytes(self._buffer)
+
+    def close(self) -> None:
+        """Discard the upload, removing its spool file."""
+        self.finish()
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+        self._buffer = bytearray()
+
+    def __enter__(self) -> "AudioUpload":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+async def ingest_audio(
+    chunks: AsyncIterator[bytes],
+    max_bytes: Optional[int] = None,
+    spool_bytes: Optional[int] = None,
+    declared_length: Optional[int] = None
+) -> AudioUpload:
+    """
+    Read an audio upload chunk by chunk, rejecting it as early as possible.
+    
+    A declared length over the limit is refused before anything is read; an
+    upload that grows past it is refused at the chunk that crosses it, and
+    one that does not start like an audio container is refused on its first
+    bytes. Nothing after the rejecting chunk is read.
+    
+    Args:
+        chunks: The request body or file as it arrives
+        max_bytes: Largest upload accepted (default STT_MAX_UPLOAD_BYTES)
+        spool_bytes: Size above which the upload is kept on disk (default STT_UPLOAD_SPOOL_BYTES)
+        declared_length: Content-Length announced by the client, if any
+        
+    Returns:
+        The complete upload; the caller must close it
+        
+    Raises:
+        UploadTooLargeError: If the upload is, or claims to be, over max_bytes
+        UnsupportedAudioError: If the first bytes match no audio container
+    """
+    max_bytes = STT_MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    if declared_length is not None and declared_length > max_bytes:
+        raise UploadTooLargeError(f"Audio upload is larger than {max_bytes} bytes")
+    upload = AudioUpload(spool_bytes)
+    spool_bytes = upload.spool_bytes
+    head = b""
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if upload.size + len(chunk) > max_bytes:
+                raise UploadTooLargeError(f"Audio upload is larger than {max_bytes} bytes")
+            if upload.audio_format is None and len(head) < SNIFF_BYTES:
+                head += chunk[:SNIFF_BYTES - len(head)]
+                if len(head) >= SNIFF_BYTES:
+                    upload.audio_format = sniff_audio_format(head)
+                    if upload.audio_format is None:
+                        raise UnsupportedAudioError("Upload is not a supported audio format")
+            if upload.spooled or upload.size + len(chunk) > spool_bytes:
+                # Disk writes stay off the event loop
+                await run_blocking("audio", upload.write, chunk)
+            else:
+                upload.write(chunk)
+        if upload.audio_format is None and head:
+            # Shorter than the sniff window
+            upload.audio_format = sniff_audio_format(head)
+            if upload.audio_format is None:
+                raise UnsupportedAudioError("Upload is not a supported audio format")
+        if upload.spooled:
+            await run_blocking("audio", upload.finish)
+    except BaseException:
+        upload.close()
+        raise
+    if upload.spooled:
+        logger.info(f"Spooled {upload.size} byte {upload.audio_format} upload to {upload.path}")
+    return upload
+
+
+async def iter_upload_file(file, chunk_size: int = UPLOAD_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """Read a Starlette UploadFile in chunks."""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
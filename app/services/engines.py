@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Type
+
+from metrics import LatencyStats, register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class EngineStats:
+    """Per-engine call latency and failures, plus how often fallback was used."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency: Dict[str, LatencyStats] = {}
+        self._failures: Dict[str, int] = {}
+        self.fallbacks = 0
+
+    def observe(self, engine: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            latency = self._latency.setdefault(engine, LatencyStats())
+            if not ok:
+                self._failures[engine] = self._failures.get(engine, 0) + 1
+        if ok:
+            latency.observe(seconds)
+
+    def record_fallback(self) -> None:
+        with self._lock:
+            self.fallbacks += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            engines = dict(self._latency)
+            failures = dict(self._failures)
+            fallbacks = self.fallbacks
+        return {
+            "fallbacks": fallbacks,
+            "engines": {
+                name: {"failures": failures.get(name, 0), "latency": latency.snapshot()}
+                for name, latency in engines.items()
+            },
+        }
+
+
+def timed_call(
+    stats: EngineStats,
+    engine_name: str,
+    call: Callable[..., Any],
+    *args,
+    expected_errors: Tuple[Type[BaseException], ...] = ()
+) -> Any:
+    """
+    Run one engine call and record its latency, or its failure, in ``stats``.
+
+    Args:
+        stats: Where to record the outcome
+        engine_name: Engine the call belongs to
+        call: The blocking engine method
+        *args: Arguments for ``call``
+        expected_errors: Exceptions that are a normal answer rather than a
+            failure of the engine (still re-raised)
+
+    Returns:
+        Whatever ``call`` returns
+    """
+    started = time.perf_counter()
+    try:
+        result = call(*args)
+    except expected_errors:
+        stats.observe(engine_name, time.perf_counter() - started, ok=True)
+        raise
+    except Exception:
+        stats.observe(engine_name, time.perf_counter() - started, ok=False)
+        raise
+    stats.observe(engine_name, time.perf_counter() - started, ok=True)
+    return result
+
+
+def create_engines(kind: str, engine_types: Dict[str, Callable[[], Any]], names: Iterable[str],
+                   default: Callable[[], Any]) -> List[Any]:
+    """
+    Engines in fallback order, skipping unknown or unavailable ones.
+
+    An engine with a ``stats`` method gets it registered with /metrics as
+    ``<kind>_<name>``.
+
+    Args:
+        kind: "tts" or "stt", for log messages and metrics names
+        engine_types: Engine classes by name
+        names: Engine names, first preferred
+        default: Engine used when nothing else is usable
+
+    Returns:
+        Available engines
+    """
+    engines = []
+    for name in names:
+        engine_type = engine_types.get(name)
+        if engine_type is None:
+            logger.warning(f"Unknown {kind.upper()} engine '{name}' ignored")
+            continue
+        engine = engine_type()
+        if not engine.available():
+            logger.warning(f"{kind.upper()} engine '{name}' is not available on this host")
+            continue
+        engines.append(engine)
+        if callable(getattr(engine, "stats", None)):
+            register_metrics(f"{kind}_{name}", engine.stats)
+    return engines or [default()]
@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import speech_recognition as sr
+
+from app.services.engines import EngineStats, create_engines as build_engines, timed_call
+from config import MODELS_DIR, STT_ENGINES, STT_VOSK_RECOGNIZERS
+from metrics import register_metrics
+
+try:
+    import vosk
+    vosk.SetLogLevel(-1)
+except ImportError:  # Optional: only needed for offline recognition
+    vosk = None
+
+logger = logging.getLogger(__name__)
+
+# Language mapping for Google speech recognition
+LANGUAGE_MAP = {
+    "hi": "hi-IN",  # Hindi
+    "en": "en-US",  # English
+    "es": "es-ES",  # Spanish
+    "fr": "fr-FR",  # French
+    "de": "de-DE",  # German
+    "it": "it-IT",  # Italian
+    "pt": "pt-BR",  # Portuguese
+    "ru": "ru-RU",  # Russian
+    "ja": "ja-JP",  # Japanese
+    "ko": "ko-KR",  # Korean
+    "zh": "zh-CN",  # Chinese (Simplified)
+    "ar": "ar-EG"   # Arabic (Egypt)
+}
+
+# Vosk model directories under MODELS_DIR, as laid out by download_models.py
+VOSK_MODEL_DIRS = {
+    "en": "vosk-model-small-en",
+    "hi": "vosk-model-small-hi",
+}
+
+# Samples fed to a Vosk recognizer per call (0.5 s at 16 kHz, 16-bit)
+VOSK_FEED_BYTES = 16000
+
+
+class SpeechNotRecognizedError(RuntimeError):
+    """The engine ran but found no words in the audio."""
+
+
+def to_audio_data(pcm: bytes, sample_rate: int = 16000, sample_width: int = 2) -> sr.AudioData:
+    """Recognizer input straight from decoded PCM, with no WAV file in between."""
+    return sr.AudioData(pcm, sample_rate, sample_width)
+
+
+class STTEngine(ABC):
+    """A speech recognizer over 16-bit mono PCM.
+
+    ``recognize`` blocks and is run on the audio pool. ``supports`` tells
+    whether the engine can handle a language at all, so requests in other
+    languages go straight to the next engine.
+    """
+
+    name = "engine"
+
+    def available(self) -> bool:
+        return True
+
+    def supports(self, language: str) -> bool:
+        return True
+
+    @abstractmethod
+    def recognize(self, pcm: bytes, sample_rate: int, language: str) -> str:
+        """Transcribe ``pcm``; raises SpeechNotRecognizedError when nothing is heard."""
+
+
+class GoogleEngine(STTEngine):
+    """Google's web speech API via SpeechRecognition: broad language coverage, one network round trip."""
+
+    name = "google"
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, pcm: bytes, sample_rate: int, language: str) -> str:
+        try:
+            return self.recognizer.recognize_google(
+                to_audio_data(pcm, sample_rate), language=LANGUAGE_MAP.get(language, "en-US")
+            )
+        except sr.UnknownValueError:
+            raise SpeechNotRecognizedError("Google Speech Recognition could not understand the audio")
+        except sr.RequestError as e:
+            raise RuntimeError(f"Could not request results from Google Speech Recognition service: {e}")
+
+
+class RecognizerPool:
+    """Reusable recognizers for one model.
+
+    A Kaldi recognizer holds decoding state and serves one stream at a
+    time, while the model behind it is read-only and shared. Recognizers
+    are created on demand up to ``size`` and reset on return; a caller
+    finding all of them busy waits for one to come back.
+    """
+
+    def __init__(self, factory, size: int):
+        self._factory = factory
+        self.size = size
+        self._idle: List[Any] = []
+        self._available = threading.Condition()
+        self.created = 0
+        self.waits = 0
+
+    def acquire(self):
+        waited = False
+        with self._available:
+            # Re-checked after every wake-up: a discard frees a slot rather than a recognizer
+            while not self._idle and self.created >= self.size:
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self.created += 1
+        try:
+            return self._factory()
+        except BaseException:
+            self.discard()
+            raise
+
+    def release(self, recognizer) -> None:
+        with self._available:
+            self._idle.append(recognizer)
+            self._available.notify()
+
+    def discard(self) -> None:
+        """Forget a recognizer left in an unknown state, freeing its slot for a waiter."""
+        with self._available:
+            self.created -= 1
+            self._available.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._available:
+            return {"size": self.size, "created": self.created, "idle": len(self._idle), "waits": self.waits}
+
+
+class VoskEngine(STTEngine):
+    """Offline Kaldi recognition with the Vosk small models: local, predictable latency, en and hi only.
+
+    Each model is loaded once per process, on first use or by ``preload``,
+    and shared read-only by a pool of recognizers. Vosk releases the GIL
+    while decoding, so recognizers on the audio pool's threads run in
+    parallel.
+    """
+
+    name = "vosk"
+
+    def __init__(self, models_dir: str = MODELS_DIR, pool_size: int = STT_VOSK_RECOGNIZERS):
+        self.models_dir = models_dir
+        self.pool_size = pool_size
+        self._models: Dict[str, Any] = {}
+        self._pools: Dict[str, RecognizerPool] = {}
+        self._lock = threading.Lock()
+
+    def _model_path(self, language: str) -> Optional[str]:
+        directory = VOSK_MODEL_DIRS.get(language)
+        path = os.path.join(self.models_dir, directory) if directory else None
+        return path if path and os.path.isdir(path) else None
+
+    def available(self) -> bool:
+        return vosk is not None and any(self._model_path(language) for language in VOSK_MODEL_DIRS)
+
+    def supports(self, language: str) -> bool:
+        return vosk is not None and self._model_path(language) is not None
+
+    def _pool(self, language: str, sample_rate: int) -> RecognizerPool:
+        key = f"{language}:{sample_rate}"
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is not None:
+                return pool
+            model = self._models.get(language)
+            if model is None:
+                started = time.perf_counter()
+                model = vosk.Model(self._model_path(language))
+                self._models[language] = model
+                logger.info(f"Loaded Vosk {language} model in {time.perf_counter() - started:.1f}s")
+            pool = RecognizerPool(lambda: vosk.KaldiRecognizer(model, sample_rate), self.pool_size)
+            self._pools[key] = pool
+            return pool
+
+    def preload(self, sample_rate: int = 16000) -> None:
+        """Load every installed model now rather than on the first request (blocking)."""
+        for language in VOSK_MODEL_DIRS:
+            if self.supports(language):
+                self._pool(language, sample_rate)
+
+    def recognize(self, pcm: bytes, sample_rate: int, language: str) -> str:
+        if not self.supports(language):
+            raise RuntimeError(f"No Vosk model for language '{language}'")
+        pool = self._pool(language, sample_rate)
+        recognizer = pool.acquire()
+        try:
+            texts = []
+            view = memoryview(pcm)
+            for offset in range(0, len(view), VOSK_FEED_BYTES):
+                if recognizer.AcceptWaveform(bytes(view[offset:offset + VOSK_FEED_BYTES])):
+                    texts.append(json.loads(recognizer.Result()).get("text", ""))
+            # FinalResult also resets the recognizer for its next stream
+            texts.append(json.loads(recognizer.FinalResult()).get("text", ""))
+        except BaseException:
+            pool.discard()
+            raise
+        pool.release(recognizer)
+        text = " ".join(t for t in texts if t)
+        if not text:
+            raise SpeechNotRecognizedError("Vosk could not understand the audio")
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pools = dict(self._pools)
+        return {key: pool.stats() for key, pool in pools.items()}
+
+
+ENGINE_TYPES = {
+    "google": GoogleEngine,
+    "vosk": VoskEngine,
+}
+
+
+engine_stats = EngineStats()
+register_metrics("stt_engines", engine_stats.stats)
+
+
+def timed_recognize(engine: STTEngine, pcm: bytes, sample_rate: int, language: str) -> str:
+    """Run ``engine.recognize`` and record its latency, or a failure other than finding no words."""
+    return timed_call(engine_stats, engine.name, engine.recognize, pcm, sample_rate, language,
+                      expected_errors=(SpeechNotRecognizedError,))
+
+
+def create_engines(names: Optional[List[str]] = None) -> List[STTEngine]:
+    """
+    Engines in fallback order, skipping unknown or unavailable ones.
+
+    Args:
+        names: Engine names, first preferred (default: STT_ENGINES)
+
+    Returns:
+        Available engines; Google alone if nothing else is usable
+    """
+    return build_engines("stt", ENGINE_TYPES, names or STT_ENGINES, GoogleEngine)
@@ -1,10 +1,14 @@
-import os
-import tempfile
 import logging
-from typing import Optional, Dict, Any, Tuple
-import speech_recognition as sr
-from pydub import AudioSegment
-import io
+from typing import Optional, Dict, Any, List, Tuple, Union
+
+from app.services.audio_codec import AudioCodecError, AudioTooLongError, PCMFormat
+# LANGUAGE_MAP and to_audio_data moved to stt_engines; still importable from here
+from app.services.stt_engines import (
+    LANGUAGE_MAP, SpeechNotRecognizedError, STTEngine, create_engines, engine_stats, timed_recognize, to_audio_data
+)
+from app.services.vad import decode_speech, vad_stats
+from blocking_io import PoolSaturatedError, run_blocking, run_in_process
+from config import STT_DECODE_TIMEOUT_SECONDS, STT_MAX_AUDIO_SECONDS
 
 # Configure logging
 logging.basicConfig(
@@ -13,133 +17,142 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Language mapping for speech recognition
-LANGUAGE_MAP = {
-    "hi": "hi-IN",  # Hindi
-    "en": "en-US",  # English
-    "es": "es-ES",  # Spanish
-    "fr": "fr-FR",  # French
-    "de": "de-DE",  # German
-    "it": "it-IT",  # Italian
-    "pt": "pt-BR",  # Portuguese
-    "ru": "ru-RU",  # Russian
-    "ja": "ja-JP",  # Japanese
-    "ko": "ko-KR",  # Korean
-    "zh": "zh-CN",  # Chinese (Simplified)
-    "ar": "ar-EG"   # Arabic (Egypt)
-}
+# What the recognizer is fed: 16 kHz mono 16-bit PCM
+STT_PCM_FORMAT = PCMFormat(16000, 1, 2)
+
 
 class STTService:
     """
-    Speech-to-Text service using Google's Speech Recognition.
+    Speech-to-Text service over pluggable engines (Google, offline Vosk).
     Converts speech from audio files to text.
     """
     
-    def __init__(self):
-        """Initialize the STT service."""
-        self.recognizer = sr.Recognizer()
-        self.recognizer.energy_threshold = 300  # Minimum audio energy for speech detection
-        self.recognizer.pause_threshold = 0.8   # Seconds of non-speaking audio before a phrase is considered complete
-        logger.info("STT Service initialized")
+    def __init__(self, engines: Optional[List[STTEngine]] = None):
+        """
+        Initialize the STT service.
+        
+        Args:
+            engines: Engines in fallback order; defaults to STT_ENGINES
+        """
+        self.engines = engines or create_engines()
+        logger.info(f"STT Service initialized. Engines: {', '.join(e.name for e in self.engines)}")
+
+    def _engine_order(self, engine: Optional[str]) -> List[STTEngine]:
+        """Configured engines, with the requested one (if any) moved to the front."""
+        if not engine:
+            return list(self.engines)
+        requested = [e for e in self.engines if e.name == engine]
+        if not requested:
+            raise ValueError(f"STT engine '{engine}' is not available. Use one of: {', '.join(e.name for e in self.engines)}")
+        return requested + [e for e in self.engines if e.name != engine]
+
+    def preload(self) -> None:
+        """Load the models of offline engines now rather than on the first request (blocking)."""
+        for candidate in self.engines:
+            if not hasattr(candidate, "preload"):
+                continue
+            try:
+                candidate.preload(STT_PCM_FORMAT.sample_rate)
+            except Exception as e:
+                logger.error(f"Failed to load models for STT engine {candidate.name}: {str(e)}")
 
     async def transcribe_audio(
         self,
-        audio_file: bytes,
-        language: str = "en"
+        audio_file: Union[bytes, str],
+        language: str = "en",
+        engine: Optional[str] = None
     ) -> Tuple[Optional[str], Optional[str]]:
         """
         Transcribe audio to text.
         
+        Engines are tried in order, skipping those without the language;
+        one that fails (network, missing model) hands over to the next,
+        while one that hears no words ends the attempt.
+        
         Args:
-            audio_file: Audio file in bytes
+            audio_file: Audio file in bytes, or the path of an upload spooled to disk
             language: Language code (default: "en" for English)
+            engine: Engine to try first ("google", "vosk"); the others remain fallbacks
             
         Returns:
             Tuple of (transcribed_text, error_message)
+            
+        Raises:
+            PoolSaturatedError: If too many uploads are already waiting to be decoded
         """
         if not audio_file:
             return None, "No audio data provided"
+        try:
+            engines = self._engine_order(engine)
+        except ValueError as e:
+            return None, str(e)
+        language = language.lower().strip()
             
         try:
-            # Convert audio to WAV format if needed
-            audio = self._convert_audio(audio_file)
-            if not audio:
-                return None, "Unsupported audio format"
+            # Decoding, resampling and voice-activity detection are CPU-bound:
+            # run them in the process pool so concurrent uploads use every core
+            pcm, vad = await run_in_process(
+                "audio_decode", decode_speech, audio_file, STT_PCM_FORMAT.sample_rate,
+                STT_MAX_AUDIO_SECONDS, STT_DECODE_TIMEOUT_SECONDS,
+                timeout=STT_DECODE_TIMEOUT_SECONDS
+            )
+            vad_stats.record(vad, STT_PCM_FORMAT.sample_rate)
+            logger.info(
+                f"VAD: {vad.duration:.1f}s clip, speech ratio {vad.speech_ratio:.2f}, "
+                f"noise floor {vad.noise_floor:.0f}, sending {len(pcm) / STT_PCM_FORMAT.bytes_per_second:.1f}s"
+            )
+            if not vad.has_speech:
+                # Every frame is quiet in absolute terms: nothing for the
+                # recognizer to find, so skip the round trip
+                return None, "No speech detected in the audio"
             
-            # Save to a temporary WAV file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                audio.export(temp_file.name, format="wav")
-                temp_path = temp_file.name
+            logger.info(f"Transcribing audio (language: {language}, {len(pcm)} bytes of PCM)")
             
-            try:
-                # Use the audio file as the audio source
-                with sr.AudioFile(temp_path) as source:
-                    # Adjust for ambient noise
-                    self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                    
-                    # Listen for the data (load audio to memory)
-                    audio_data = self.recognizer.record(source)
-                    
-                    # Get the language code, default to English if not found
-                    lang_code = LANGUAGE_MAP.get(language.lower().strip(), "en-US")
-                    
-                    logger.info(f"Transcribing audio (language: {lang_code}, size: {len(audio_file)} bytes)")
-                    
-                    # Recognize speech using Google Speech Recognition
-                    text = self.recognizer.recognize_google(
-                        audio_data,
-                        language=lang_code
-                    )
-                    
-                    logger.info(f"Successfully transcribed audio: {text[:100]}...")
-                    return text, None
-                    
-            except sr.UnknownValueError:
-                error_msg = "Google Speech Recognition could not understand the audio"
-                logger.warning(error_msg)
-                return None, error_msg
-                
-            except sr.RequestError as e:
-                error_msg = f"Could not request results from Google Speech Recognition service: {e}"
-                logger.error(error_msg)
-                return None, error_msg
-                
-            finally:
-                # Clean up the temporary file
+            errors = []
+            for candidate in engines:
+                if not candidate.supports(language):
+                    continue
                 try:
-                    os.unlink(temp_path)
+                    text = await run_blocking(
+                        "audio", timed_recognize, candidate, pcm, STT_PCM_FORMAT.sample_rate, language
+                    )
+                except (SpeechNotRecognizedError, PoolSaturatedError):
+                    raise
                 except Exception as e:
-                    logger.warning(f"Could not remove temporary file {temp_path}: {e}")
-                    
-        except Exception as e:
-            error_msg = f"Error in transcribe_audio: {str(e)}"
-            logger.error(error_msg, exc_info=True)
+                    logger.warning(f"STT engine {candidate.name} failed: {str(e)}")
+                    errors.append(str(e))
+                    continue
+                if candidate is not engines[0]:
+                    engine_stats.record_fallback()
+                logger.info(f"Successfully transcribed audio with {candidate.name}: {text[:100]}...")
+                return text, None
+            
+            error_msg = "; ".join(errors) or f"No STT engine supports language '{language}'"
+            logger.error(error_msg)
             return None, error_msg
-    
-    def _convert_audio(self, audio_data: bytes) -> Optional[AudioSegment]:
-        """
-        Convert audio data to a format compatible with speech recognition.
-        
-        Args:
-            audio_data: Raw audio data in various formats
+                
+        except AudioTooLongError as e:
+            logger.warning(str(e))
+            return None, str(e)
             
-        Returns:
-            AudioSegment object or None if conversion fails
-        """
-        try:
-            # Try to detect the format from the data
-            audio = AudioSegment.from_file(io.BytesIO(audio_data))
+        except AudioCodecError as e:
+            logger.error(f"Error converting audio: {str(e)}")
+            return None, "Unsupported audio format"
             
-            # Convert to mono, 16kHz, 16-bit PCM
-            audio = audio.set_channels(1)
-            audio = audio.set_frame_rate(16000)
-            audio = audio.set_sample_width(2)
+        except TimeoutError:
+            logger.error(f"Audio decoding timed out after {STT_DECODE_TIMEOUT_SECONDS}s")
+            return None, "Audio decoding timed out"
             
-            return audio
+        except SpeechNotRecognizedError as e:
+            logger.warning(str(e))
+            return None, str(e)
             
+        except PoolSaturatedError:
+            raise
         except Exception as e:
-            logger.error(f"Error converting audio: {str(e)}")
-            return None
+            error_msg = f"Error in transcribe_audio: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            return None, error_msg
 
 # Create a singleton instance
 stt_service = STTService()
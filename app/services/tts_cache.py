@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from blocking_io import run_blocking
+from config import TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES
+from metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of TTS input: NFC unicode with whitespace runs collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, language: str, audio_format: str) -> str:
+    """Content address of a rendering: sha256 of normalized text, language and format."""
+    material = f"{normalize_text(text)}\x00{language}\x00{audio_format}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Encoded TTS audio stored on disk under its content address.
+
+    Files are named ``{key}.{format}`` and written atomically (temp file in
+    the same directory, then ``os.replace``), so readers never see partial
+    audio and concurrent writers of the same key are harmless. An in-memory
+    LRU index tracks sizes and evicts the least recently used files once the
+    directory exceeds ``max_bytes``; on startup it is rebuilt from the files
+    on disk, oldest modification time first.
+    """
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._formats: Dict[str, str] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            key, _, audio_format = name.partition(".")
+            path = os.path.join(self.cache_dir, name)
+            if len(key) != 64 or not audio_format or name.endswith(".tmp"):
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, key, audio_format, stat.st_size))
+        for _, key, audio_format, size in sorted(entries):
+            self._index[key] = size
+            self._formats[key] = audio_format
+            self._bytes += size
+        self._evict()
+
+    def path(self, key: str) -> Optional[str]:
+        """Path of a cached entry, or None."""
+        with self._lock:
+            audio_format = self._formats.get(key)
+        return os.path.join(self.cache_dir, f"{key}.{audio_format}") if audio_format else None
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached audio bytes for ``key``, refreshing its LRU position."""
+        with self._lock:
+            audio_format = self._formats.get(key)
+            if audio_format is None:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.{audio_format}"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            # Removed behind our back; forget it
+            self._drop(key)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    async def get_async(self, key: str) -> Optional[bytes]:
+        """``get`` for callers on the event loop: the file read runs on the TTS pool."""
+        with self._lock:
+            if key not in self._formats:
+                self.misses += 1
+                return None
+        return await run_blocking("tts", self.get, key)
+
+    def put(self, key: str, data: bytes, audio_format: str) -> str:
+        """Store audio under ``key`` atomically and return its path."""
+        path = os.path.join(self.cache_dir, f"{key}.{audio_format}")
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._bytes -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._formats[key] = audio_format
+            self._bytes += len(data)
+        self._evict()
+        return path
+
+    def _drop(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._bytes -= self._index.pop(key)
+            return self._formats.pop(key)
+
+    def _evict(self) -> None:
+        while True:
+            with self._lock:
+                if self._bytes <= self.max_bytes or not self._index:
+                    return
+                key, size = self._index.popitem(last=False)
+                audio_format = self._formats.pop(key)
+                self._bytes -= size
+                self.evictions += 1
+            try:
+                os.remove(os.path.join(self.cache_dir, f"{key}.{audio_format}"))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_default_cache: Optional[TTSCache] = None
+
+
+def get_tts_cache() -> TTSCache:
+    """Process-wide TTS cache, created on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TTSCache()
+        register_metrics("tts_cache", _default_cache.stats)
+    return _default_cache
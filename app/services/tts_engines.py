@@ -0,0 +1,139 @@
+import io
+import logging
+import shutil
+import subprocess
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+from gtts import gTTS
+
+from app.services.engines import EngineStats, create_engines as build_engines, timed_call
+from config import ESPEAK_BINARY, TTS_ENGINES, TTS_GTTS_TIMEOUT_SECONDS
+from metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# Speaking rate (words per minute) per persona, as tuned for the old pyttsx3 voices
+PERSONA_RATES = {
+    "swag": 180,     # Slightly faster for swag
+    "ceo": 150,      # Slower for CEO
+    "roast": 170,    # Medium-fast for roasts
+    "vidhyarthi": 160,  # Medium for student
+    "jugadu": 155,   # Medium-slow for jugaad
+}
+DEFAULT_RATE = 160
+
+# gTTS language codes that espeak-ng names differently
+_ESPEAK_VOICES = {"zh-CN": "cmn"}
+
+
+def persona_rate(persona: Optional[str]) -> int:
+    """Speaking rate for a persona id ("swag" or "swag_bhai" style)."""
+    key = (persona or "").lower().strip()
+    if key.endswith("_bhai"):
+        key = key[:-len("_bhai")]
+    return PERSONA_RATES.get(key, DEFAULT_RATE)
+
+
+class TTSEngine(ABC):
+    """A speech synthesizer producing one encoded format.
+
+    ``synthesize`` blocks and is run on the TTS pool. ``voice_key`` names
+    everything that changes the audio besides the text, and is what the
+    TTS cache keys renderings by.
+    """
+
+    name = "engine"
+    native_format = "wav"
+
+    def available(self) -> bool:
+        return True
+
+    def voice_key(self, lang_code: str, persona: Optional[str] = None) -> str:
+        return f"{self.name}:{lang_code}"
+
+    @abstractmethod
+    def synthesize(self, text: str, lang_code: str, persona: Optional[str] = None) -> bytes:
+        """Render ``text`` to audio in ``native_format``."""
+
+
+class GTTSEngine(TTSEngine):
+    """Google Translate's TTS endpoint via gTTS: good voices, one network round trip per call."""
+
+    name = "gtts"
+    native_format = "mp3"
+
+    def __init__(self, timeout: float = TTS_GTTS_TIMEOUT_SECONDS):
+        self.timeout = timeout
+
+    def voice_key(self, lang_code: str, persona: Optional[str] = None) -> str:
+        # Persona does not change gTTS output; plain language keeps earlier cache entries valid
+        return lang_code
+
+    def synthesize(self, text: str, lang_code: str, persona: Optional[str] = None) -> bytes:
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang_code, slow=False, timeout=self.timeout).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class EspeakEngine(TTSEngine):
+    """Offline espeak-ng synthesis: robotic but local, with per-persona speaking rates."""
+
+    name = "espeak"
+    native_format = "wav"
+
+    def __init__(self, binary: str = ESPEAK_BINARY, timeout: float = 10.0):
+        self.binary = binary
+        self.timeout = timeout
+
+    def available(self) -> bool:
+        return shutil.which(self.binary) is not None
+
+    def voice_key(self, lang_code: str, persona: Optional[str] = None) -> str:
+        return f"espeak:{_ESPEAK_VOICES.get(lang_code, lang_code)}:{persona_rate(persona)}"
+
+    def synthesize(self, text: str, lang_code: str, persona: Optional[str] = None) -> bytes:
+        command = [
+            self.binary, "--stdout", "--stdin",
+            "-v", _ESPEAK_VOICES.get(lang_code, lang_code),
+            "-s", str(persona_rate(persona)),
+        ]
+        try:
+            result = subprocess.run(
+                command, input=text.encode("utf-8"), stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=self.timeout
+            )
+        except FileNotFoundError:
+            raise RuntimeError(f"espeak-ng not found ({self.binary})")
+        except subprocess.TimeoutExpired:
+            raise RuntimeError(f"espeak-ng timed out after {self.timeout}s")
+        if result.returncode != 0 or not result.stdout:
+            raise RuntimeError(f"espeak-ng failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return result.stdout
+
+
+ENGINE_TYPES = {
+    "gtts": GTTSEngine,
+    "espeak": EspeakEngine,
+}
+
+
+engine_stats = EngineStats()
+register_metrics("tts_engines", engine_stats.stats)
+
+
+def timed_synthesize(engine: TTSEngine, text: str, lang_code: str, persona: Optional[str] = None) -> bytes:
+    """Run ``engine.synthesize`` and record its latency or failure."""
+    return timed_call(engine_stats, engine.name, engine.synthesize, text, lang_code, persona)
+
+
+def create_engines(names: Optional[List[str]] = None) -> List[TTSEngine]:
+    """
+    Engines in fallback order, skipping unknown or unavailable ones.
+
+    Args:
+        names: Engine names, first preferred (default: TTS_ENGINES)
+
+    Returns:
+        Available engines; gTTS alone if nothing else is usable
+    """
+    return build_engines("tts", ENGINE_TYPES, names or TTS_ENGINES, GTTSEngine)
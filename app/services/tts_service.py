@@ -1,10 +1,21 @@
+import asyncio
 import os
+import re
+import threading
 import time
-from typing import Optional, Tuple
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 import logging
 from pathlib import Path
-from gtts import gTTS
-from pydub import AudioSegment
+
+from app.services.audio_codec import (
+    AUDIO_MEDIA_TYPES, PCMFormat, assemble_speech, encode_speech, resample_wav, split_wav, streaming_wav_header,
+    wav_samples
+)
+from app.services.tts_cache import TTSCache, cache_key, get_tts_cache, normalize_text
+from app.services.tts_engines import TTSEngine, create_engines, engine_stats, timed_synthesize
+from blocking_io import PoolSaturatedError, run_blocking
+from config import TTS_CHUNK_MAX_CHARS, TTS_STREAM_CONCURRENCY
+from metrics import LatencyStats, register_metrics
 
 # Configure logging
 logging.basicConfig(
@@ -29,82 +40,382 @@ LANGUAGE_MAP = {
     "ar": "ar"   # Arabic
 }
 
+# Sentence ends (Latin punctuation and the Devanagari danda), then clause breaks
+_SENTENCE_END = re.compile(r"(?<=[.!?\u0964\u0965])\s+")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+# Formats whose chunks can be sent back to back as one stream. Separately
+# encoded Ogg files only form a chained Ogg stream, of which many players
+# play just the first link, so Ogg is always assembled and encoded once.
+STREAMABLE_FORMATS = ("mp3", "wav")
+
+
+class TTSError(RuntimeError):
+    """A chunk of a streamed rendering could not be synthesized."""
+
+
+def _fragments(sentence: str, max_chars: int) -> Iterator[str]:
+    for clause in _CLAUSE_END.split(sentence):
+        if len(clause) <= max_chars:
+            yield clause
+            continue
+        for word in clause.split():
+            for start in range(0, len(word), max_chars):
+                yield word[start:start + max_chars]
+
+
+def _pack(parts: List[str], max_chars: int) -> List[str]:
+    chunks: List[str] = []
+    for part in parts:
+        if chunks and len(chunks[-1]) + 1 + len(part) <= max_chars:
+            chunks[-1] += " " + part
+        else:
+            chunks.append(part)
+    return chunks
+
+
+def split_sentences(text: str, max_chars: Optional[int] = None) -> List[str]:
+    """
+    Split text into synthesis chunks at sentence boundaries.
+    
+    Sentences longer than ``max_chars`` are broken at clause punctuation, then
+    between words. The first chunk is a single sentence so audio can start as
+    soon as possible; the rest are packed up to ``max_chars`` to keep the
+    number of synthesis calls down.
+    
+    Args:
+        text: Text to split
+        max_chars: Upper bound on the length of a chunk (default: TTS_CHUNK_MAX_CHARS)
+        
+    Returns:
+        Chunks in reading order; empty for blank text
+    """
+    max_chars = max_chars or TTS_CHUNK_MAX_CHARS
+    text = normalize_text(text)
+    if not text:
+        return []
+    pieces: List[str] = []
+    for sentence in _SENTENCE_END.split(text):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+        else:
+            pieces.extend(_pack(list(_fragments(sentence, max_chars)), max_chars))
+    return pieces[:1] + _pack(pieces[1:], max_chars)
+
+
+class StreamStats:
+    """Counters and time-to-first-audio for streamed renderings."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.chunks = 0
+        self.failed = 0
+        self.time_to_first_audio = LatencyStats()
+
+    def record(self, chunks: int = 0, streams: int = 0, failed: int = 0) -> None:
+        with self._lock:
+            self.streams += streams
+            self.chunks += chunks
+            self.failed += failed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {"streams": self.streams, "chunks": self.chunks, "failed": self.failed}
+        return {**counters, "time_to_first_audio": self.time_to_first_audio.snapshot()}
+
+
+stream_stats = StreamStats()
+register_metrics("tts_stream", stream_stats.stats)
+
 class TTSService:
     """
-    Text-to-Speech service using gTTS (Google Text-to-Speech).
-    Converts text to speech and saves it as a WAV file.
+    Text-to-Speech service over pluggable engines (gTTS, offline espeak-ng).
+    Converts text to speech as MP3, Ogg/Opus or WAV audio, cached on disk by content.
+    Synthesis and transcoding run in memory; nothing touches disk but the cache.
     """
     
-    def __init__(self, output_dir: str = "tts_output"):
+    def __init__(
+        self,
+        output_dir: str = "tts_output",
+        cache: Optional[TTSCache] = None,
+        engines: Optional[List[TTSEngine]] = None
+    ):
         """
         Initialize the TTS service.
         
         Args:
-            output_dir: Directory to save the generated audio files
+            output_dir: Unused since synthesis moved to memory; kept for compatibility
+            cache: Rendered-audio cache; defaults to the shared TTS cache
+            engines: Engines in fallback order; defaults to TTS_ENGINES
         """
         self.output_dir = output_dir
-        os.makedirs(self.output_dir, exist_ok=True)
-        logger.info(f"TTS Service initialized. Output directory: {os.path.abspath(self.output_dir)}")
+        self.cache = cache or get_tts_cache()
+        self.engines = engines or create_engines()
+        logger.info(
+            f"TTS Service initialized. Engines: {', '.join(e.name for e in self.engines)}. "
+            f"Cache directory: {os.path.abspath(self.cache.cache_dir)}"
+        )
 
-    async def text_to_speech(
-        self, 
-        text: str, 
-        language: str = "en"
-    ) -> Tuple[Optional[str], Optional[str]]:
+    def _cache_key(self, text: str, lang_code: str, audio_format: str, persona: Optional[str]) -> str:
+        return cache_key(text, self.engines[0].voice_key(lang_code, persona), audio_format)
+
+    def cached_key(self, text: str, language: str, audio_format: str, persona: Optional[str] = None) -> Optional[str]:
+        """
+        Cache key under which this exact rendering is stored, for serving it by key.
+        
+        Returns:
+            The key, or None when the audio is not in the cache (long text
+            assembled from chunks, fallback output, or evicted)
+        """
+        lang_code = LANGUAGE_MAP.get(language.lower().strip(), "en")
+        key = self._cache_key(text, lang_code, audio_format, persona)
+        return key if self.cache.path(key) else None
+
+    def _render(self, text: str, lang_code: str, audio_format: str, persona: Optional[str] = None) -> bytes:
+        """
+        Synthesize and encode audio, trying each engine in order.
+        
+        The first engine's output is cached, both in its native format and
+        the requested one, so a text rendered in one format is only
+        transcoded when another is requested. Fallback output is returned
+        but not cached, so the preferred voice takes over again once its
+        engine recovers.
+        
+        Raises:
+            TTSError: If every engine failed
+        """
+        errors = []
+        for engine in self.engines:
+            primary = engine is self.engines[0]
+            voice = engine.voice_key(lang_code, persona)
+            source_key = cache_key(text, voice, engine.native_format)
+            try:
+                source = self.cache.get(source_key) if primary and audio_format != engine.native_format else None
+                if source is None:
+                    source = timed_synthesize(engine, text, lang_code, persona)
+                    if primary:
+                        self.cache.put(source_key, source, engine.native_format)
+                data = encode_speech(source, audio_format, engine.native_format)
+            except Exception as e:
+                logger.warning(f"TTS engine {engine.name} failed: {str(e)}")
+                errors.append(f"{engine.name}: {str(e)}")
+                continue
+            if not primary:
+                engine_stats.record_fallback()
+                logger.info(f"TTS served by fallback engine {engine.name}")
+            elif audio_format != engine.native_format:
+                self.cache.put(cache_key(text, voice, audio_format), data, audio_format)
+            return data
+        raise TTSError("All TTS engines failed: " + "; ".join(errors))
+
+    async def get_audio(
+        self,
+        text: str,
+        language: str = "en",
+        audio_format: str = "wav",
+        persona: Optional[str] = None
+    ) -> Tuple[Optional[bytes], Optional[str]]:
         """
-        Convert text to speech using gTTS and save as WAV file.
+        Get audio for text, from the TTS cache or freshly synthesized.
         
         Args:
             text: Text to convert to speech
             language: Language code (default: "en" for English)
+            audio_format: Output format, one of AUDIO_MEDIA_TYPES (default: "wav")
+            persona: Persona id, for engines whose voice depends on it
         
         Returns:
-            Tuple of (file_path, error_message)
+            Tuple of (audio_bytes, error_message)
+            
+        Raises:
+            PoolSaturatedError: If the TTS pool is too backed up to take the request
         """
         if not text or not text.strip():
             return None, "No text provided"
+        if audio_format not in AUDIO_MEDIA_TYPES:
+            return None, f"Unsupported audio format: {audio_format}"
+        
+        # Get the language code, default to English if not found
+        lang_code = LANGUAGE_MAP.get(language.lower().strip(), "en")
+        key = self._cache_key(text, lang_code, audio_format, persona)
         
-        mp3_filename = None
-        wav_filename = None
+        data = await self.cache.get_async(key)
+        if data is not None:
+            return data, None
         
         try:
-            # Generate a unique filename
-            timestamp = int(time.time())
-            mp3_filename = os.path.join(self.output_dir, f"output_{timestamp}.mp3")
-            wav_filename = os.path.join(self.output_dir, f"output_{timestamp}.wav")
-            
-            # Get the language code, default to English if not found
-            lang_code = LANGUAGE_MAP.get(language.lower().strip(), "en")
-            
-            logger.info(f"Generating TTS for text (language: {lang_code}, length: {len(text)} chars)")
-            
-            # Create gTTS object and save as MP3
-            tts = gTTS(text=text, lang=lang_code, slow=False)
-            tts.save(mp3_filename)
-            
-            # Convert MP3 to WAV using pydub
-            audio = AudioSegment.from_mp3(mp3_filename)
-            audio.export(wav_filename, format="wav")
-            
-            # Verify the file was created
-            if not os.path.exists(wav_filename):
-                return None, "Failed to create WAV file"
-                
-            logger.info(f"TTS generated successfully: {wav_filename}")
-            return wav_filename, None
-            
+            logger.info(f"Generating TTS for text (language: {lang_code}, format: {audio_format}, length: {len(text)} chars)")
+            # gTTS (network), espeak-ng and ffmpeg block; keep them on the TTS
+            # pool, apart from the STT work on the audio pool
+            data = await run_blocking("tts", self._render, text, lang_code, audio_format, persona)
+            logger.info(f"TTS generated successfully: {key} ({len(data)} bytes)")
+            return data, None
+        except PoolSaturatedError:
+            raise
         except Exception as e:
             error_msg = f"Error in text_to_speech: {str(e)}"
             logger.error(error_msg, exc_info=True)
             return None, error_msg
+
+    async def render_full(
+        self,
+        text: str,
+        language: str = "en",
+        audio_format: str = "wav",
+        persona: Optional[str] = None,
+        concurrency: int = TTS_STREAM_CONCURRENCY
+    ) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Render long text as one complete file, for clients that cannot stream.
+        
+        Chunks are synthesized in parallel like stream_audio (MP3 for MP3
+        output, WAV otherwise, each cached on its own) and then assembled
+        in a single pass; Ogg/Opus is encoded once from the joined PCM.
+        
+        Args:
+            text: Text to convert to speech
+            language: Language code (default: "en" for English)
+            audio_format: Output format, one of AUDIO_MEDIA_TYPES (default: "wav")
+            persona: Persona id, for engines whose voice depends on it
+            concurrency: Chunks synthesized in parallel
+            
+        Returns:
+            Tuple of (audio_bytes, error_message)
+        """
+        chunks = split_sentences(text)
+        if len(chunks) <= 1:
+            return await self.get_audio(text, language, audio_format, persona)
+        if audio_format not in AUDIO_MEDIA_TYPES:
+            return None, f"Unsupported audio format: {audio_format}"
+        chunk_format = "mp3" if audio_format == "mp3" else "wav"
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def render(chunk: str) -> Tuple[Optional[bytes], Optional[str]]:
+            async with semaphore:
+                return await self.get_audio(chunk, language, chunk_format, persona)
+        
+        results = await asyncio.gather(*(render(chunk) for chunk in chunks))
+        errors = [error for _, error in results if error]
+        if errors:
+            return None, errors[0]
+        try:
+            data = await run_blocking("tts", assemble_speech, [data for data, _ in results], audio_format)
+            return data, None
+        except PoolSaturatedError:
+            raise
+        except Exception as e:
+            error_msg = f"Error assembling speech: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            return None, error_msg
+
+    async def stream_audio(
+        self,
+        text: str,
+        language: str = "en",
+        audio_format: str = "wav",
+        concurrency: int = TTS_STREAM_CONCURRENCY,
+        persona: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Render long text chunk by chunk, yielding audio in order as it is ready.
+        
+        Chunks (see split_sentences) are synthesized concurrently, at most
+        ``concurrency`` at a time for this stream, and each goes through the
+        TTS cache on its own. MP3 frames concatenate as they are; for WAV
+        the first chunk's header is sent open-ended and later
+        chunks contribute only their samples, resampled to the first chunk's
+        format when they differ (e.g. one came from a fallback engine).
+        
+        Args:
+            text: Text to convert to speech
+            language: Language code (default: "en" for English)
+            audio_format: Output format, one of STREAMABLE_FORMATS (default: "wav");
+                use render_full for Ogg
+            concurrency: Chunks synthesized in parallel
+            persona: Persona id, for engines whose voice depends on it
             
+        Yields:
+            Consecutive pieces of one audio stream
+            
+        Raises:
+            TTSError: If a chunk fails; pieces already yielded stay valid audio
+            PoolSaturatedError: If the TTS pool rejects a chunk
+            ValueError: If ``audio_format`` cannot be streamed
+        """
+        if audio_format not in STREAMABLE_FORMATS:
+            raise ValueError(f"Audio format {audio_format} cannot be streamed chunk by chunk")
+        chunks = split_sentences(text)
+        if not chunks:
+            raise TTSError("No text provided")
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def render(chunk: str) -> bytes:
+            async with semaphore:
+                data, error = await self.get_audio(chunk, language, audio_format, persona)
+            if error:
+                raise TTSError(error)
+            return data
+        
+        started = time.perf_counter()
+        stream_stats.record(streams=1)
+        tasks = [asyncio.ensure_future(render(chunk)) for chunk in chunks]
+        target: Optional[PCMFormat] = None
+        try:
+            for index, task in enumerate(tasks):
+                data = await task
+                if audio_format == "wav":
+                    pcm_format, samples = wav_samples(data)
+                    if target is None:
+                        target = pcm_format
+                        header, samples = split_wav(data)
+                        data = streaming_wav_header(header) + samples
+                    else:
+                        if pcm_format != target:
+                            data = await run_blocking("tts", resample_wav, data, target)
+                            samples = wav_samples(data)[1]
+                        data = bytes(samples)
+                if index == 0:
+                    stream_stats.time_to_first_audio.observe(time.perf_counter() - started)
+                stream_stats.record(chunks=1)
+                yield data
+        except Exception:
+            stream_stats.record(failed=1)
+            raise
         finally:
-            # Clean up the temporary MP3 file if it exists
-            if mp3_filename and os.path.exists(mp3_filename):
-                try:
-                    os.remove(mp3_filename)
-                except Exception as e:
-                    logger.warning(f"Could not remove temporary MP3 file: {e}")
+            # Client went away or a chunk failed: stop rendering the rest
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # Retrieved; the first failure was already raised
+
+    async def text_to_speech(
+        self, 
+        text: str, 
+        language: str = "en"
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Convert text to speech and return the path of the cached WAV file.
+        
+        The file belongs to the TTS cache; callers must not delete it. Audio
+        from a fallback engine is not cached and so has no path.
+        
+        Args:
+            text: Text to convert to speech
+            language: Language code (default: "en" for English)
+        
+        Returns:
+            Tuple of (file_path, error_message)
+        """
+        data, error = await self.get_audio(text, language)
+        if error:
+            return None, error
+        lang_code = LANGUAGE_MAP.get(language.lower().strip(), "en")
+        path = self.cache.path(self._cache_key(text, lang_code, "wav", None))
+        if path is None:
+            return None, "Audio was produced by a fallback engine and not cached"
+        return path, None
 
     async def generate_tts(
         self, 
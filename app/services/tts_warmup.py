@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.tts_service import TTSService, split_sentences
+from config import TTS_WARM_CONCURRENCY, TTS_WARM_FORMATS, TTS_WARM_LANGUAGES
+from metrics import register_metrics
+from personalities import FAST_PATH_REPLIES, PERSONALITY_PROMPTS
+
+logger = logging.getLogger(__name__)
+
+
+def warm_texts() -> List[Tuple[str, Optional[str]]]:
+    """(text, persona) pairs every client asks for: each persona's intro line, then the canned chat replies."""
+    intros = [(persona["intro"], persona_id) for persona_id, persona in PERSONALITY_PROMPTS.items()]
+    return list(dict.fromkeys(intros + [(reply, None) for reply in FAST_PATH_REPLIES]))
+
+
+class TTSWarmup:
+    """Pre-renders the scripted lines into the TTS cache in the background.
+
+    Each text is warmed exactly as /api/speech/tts will look it up: texts
+    the endpoint streams in sentence chunks are rendered chunk by chunk.
+    ``ready`` turns true once every rendering has been attempted; failures
+    are counted and logged but do not hold readiness back, since an
+    unwarmed line is still synthesized on demand.
+    """
+
+    def __init__(
+        self,
+        languages: Optional[List[str]] = None,
+        formats: Optional[List[str]] = None,
+        concurrency: int = TTS_WARM_CONCURRENCY
+    ):
+        self.languages = languages or TTS_WARM_LANGUAGES
+        self.formats = formats or TTS_WARM_FORMATS
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+        self.total = 0
+        self.rendered = 0
+        self.failed = 0
+        self.duration = 0.0
+
+    def _jobs(self) -> List[Tuple[str, Optional[str], str, str]]:
+        chunks = list(dict.fromkeys(
+            (chunk, persona) for text, persona in warm_texts() for chunk in split_sentences(text)
+        ))
+        return [
+            (chunk, persona, language, audio_format)
+            for language in self.languages
+            for audio_format in self.formats
+            for chunk, persona in chunks
+        ]
+
+    async def run(self, service: TTSService) -> None:
+        """Render every warm text in every configured language and format."""
+        jobs = self._jobs()
+        with self._lock:
+            self.total = len(jobs)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+
+        async def warm(text: str, persona: Optional[str], language: str, audio_format: str) -> None:
+            async with semaphore:
+                try:
+                    _, error = await service.get_audio(text, language, audio_format, persona)
+                except Exception as e:
+                    error = str(e)
+            with self._lock:
+                if error:
+                    self.failed += 1
+                else:
+                    self.rendered += 1
+            if error:
+                logger.warning(f"TTS warm-up failed for '{text[:40]}' ({language}, {audio_format}): {error}")
+
+        await asyncio.gather(*(warm(*job) for job in jobs))
+        with self._lock:
+            self.duration = time.perf_counter() - started
+            self.ready = True
+        logger.info(
+            f"TTS warm-up finished in {self.duration:.1f}s: {self.rendered}/{self.total} rendered, {self.failed} failed"
+        )
+
+    def start(self, service: TTSService) -> asyncio.Task:
+        """Start warming in the background of the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run(service))
+        return self._task
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "total": self.total,
+                "rendered": self.rendered,
+                "failed": self.failed,
+                "duration_s": round(self.duration, 3),
+            }
+
+
+tts_warmup = TTSWarmup()
+register_metrics("tts_warmup", tts_warmup.stats)
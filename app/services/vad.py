@@ -0,0 +1,165 @@
+import logging
+import threading
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from app.services.audio_codec import decode_pcm
+from metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# Analysis frame length
+FRAME_MS = 30
+
+# A frame is voiced when its RMS is this many times the noise floor...
+SPEECH_ENERGY_RATIO = 3.0
+# ...and above this absolute level (16-bit RMS), so digital silence has no "speech"
+MIN_SPEECH_RMS = 100.0
+
+# Unvoiced consonants (s, sh, f) are quiet but cross zero often
+UNVOICED_ENERGY_RATIO = 1.5
+UNVOICED_MIN_RMS = 50.0
+UNVOICED_MIN_ZCR = 0.3
+
+# Quietest share of frames taken as background noise
+NOISE_PERCENTILE = 10
+
+# Kept around the detected speech so onsets and trailing consonants survive
+PAD_MS = 200
+
+
+class VADResult(NamedTuple):
+    """Where the speech is in a clip of 16-bit mono PCM."""
+    start: int  # First byte of speech (padded)
+    end: int  # One past the last byte of speech (padded)
+    speech_ratio: float  # Share of frames classified as speech
+    noise_floor: float  # RMS of the background, from the quietest frames
+    duration: float  # Seconds of audio analysed
+
+    @property
+    def has_speech(self) -> bool:
+        return self.end > self.start
+
+
+def frame_features(samples: np.ndarray, frame_len: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-frame RMS energy and zero-crossing rate, computed over all frames at once.
+
+    Args:
+        samples: 16-bit mono samples
+        frame_len: Samples per frame; a trailing partial frame is ignored
+
+    Returns:
+        (rms, zcr) arrays with one value per frame
+    """
+    count = len(samples) // frame_len
+    frames = samples[:count * frame_len].reshape(count, frame_len).astype(np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(frame_len - 1, 1)
+    return rms, zcr
+
+
+def detect_speech(pcm: Union[bytes, memoryview], sample_rate: int = 16000) -> VADResult:
+    """
+    Find the speech in a clip with an energy and zero-crossing detector.
+
+    The noise floor comes from the quietest frames of the clip itself, so no
+    leading stretch has to be set aside for calibration; a frame is speech
+    when it is well above that floor, or moderately above it with the high
+    zero-crossing rate of an unvoiced consonant.
+
+    The floor is only meaningful when the clip has some background to
+    measure. A clip with no quiet stretch (push-to-talk speech with no
+    pause) or too little contrast to separate speech from noise is kept
+    whole rather than trimmed; only a clip quiet in absolute terms (every
+    frame below MIN_SPEECH_RMS) is reported as having no speech.
+
+    Args:
+        pcm: Little-endian 16-bit mono samples
+        sample_rate: Sample rate of ``pcm``
+
+    Returns:
+        The padded speech span in bytes, with the speech ratio and noise floor
+    """
+    samples = np.frombuffer(pcm, dtype="<i2")
+    frame_len = max(1, sample_rate * FRAME_MS // 1000)
+    duration = len(samples) / sample_rate
+    if len(samples) < frame_len:
+        return VADResult(0, 0, 0.0, 0.0, duration)
+
+    rms, zcr = frame_features(samples, frame_len)
+    noise_floor = float(np.percentile(rms, NOISE_PERCENTILE))
+    voiced = rms > max(noise_floor * SPEECH_ENERGY_RATIO, MIN_SPEECH_RMS)
+    unvoiced = (rms > max(noise_floor * UNVOICED_ENERGY_RATIO, UNVOICED_MIN_RMS)) & (zcr > UNVOICED_MIN_ZCR)
+    speech = voiced | unvoiced
+
+    indices = np.flatnonzero(speech)
+    if noise_floor >= MIN_SPEECH_RMS or (not len(indices) and rms.max() >= MIN_SPEECH_RMS):
+        # No silence to calibrate against, or speech indistinguishable from the
+        # noise: keep the whole clip and let the recognizer decide
+        loud = float(np.count_nonzero(rms >= MIN_SPEECH_RMS)) / len(rms)
+        return VADResult(0, len(samples) * 2, loud, noise_floor, duration)
+    if not len(indices):
+        return VADResult(0, 0, 0.0, noise_floor, duration)
+    pad = sample_rate * PAD_MS // 1000
+    start = max(0, int(indices[0]) * frame_len - pad)
+    end = min(len(samples), (int(indices[-1]) + 1) * frame_len + pad)
+    return VADResult(start * 2, end * 2, float(len(indices)) / len(speech), noise_floor, duration)
+
+
+def decode_speech(
+    source: Union[bytes, str],
+    sample_rate: int,
+    max_seconds: Optional[float],
+    timeout: float
+) -> Tuple[bytes, VADResult]:
+    """
+    Decode an upload and cut it down to its speech, in one worker call.
+
+    Runs in the audio_decode process pool, so only the trimmed samples are
+    sent back to the server process.
+
+    Returns:
+        (trimmed PCM, VAD result for the full clip); the PCM is empty when
+        no speech was found
+    """
+    pcm = decode_pcm(source, sample_rate, max_seconds, timeout)
+    result = detect_speech(pcm, sample_rate)
+    return pcm[result.start:result.end], result
+
+
+class VADStats:
+    """Counters for the VAD stage in front of recognition."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clips = 0
+        self.no_speech = 0
+        self.input_seconds = 0.0
+        self.speech_seconds = 0.0
+        self.speech_ratio_sum = 0.0
+
+    def record(self, result: VADResult, sample_rate: int) -> None:
+        with self._lock:
+            self.clips += 1
+            self.input_seconds += result.duration
+            self.speech_seconds += (result.end - result.start) / 2 / sample_rate
+            self.speech_ratio_sum += result.speech_ratio
+            if not result.has_speech:
+                self.no_speech += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clips": self.clips,
+                "no_speech": self.no_speech,
+                "input_seconds": round(self.input_seconds, 2),
+                "sent_seconds": round(self.speech_seconds, 2),
+                "mean_speech_ratio": round(self.speech_ratio_sum / self.clips, 4) if self.clips else 0.0,
+            }
+
+
+vad_stats = VADStats()
+register_metrics("stt_vad", vad_stats.stats)
@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from config import AUTH_TOKEN_CACHE_SIZE, AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TTL_SECONDS
+from metrics import register_metrics
+
+
+class ExpiringCache:
+    """Count-bounded LRU whose entries each carry an absolute expiry (epoch seconds)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def _put(self, key: Hashable, value: Any, expires_at: float) -> None:
+        if expires_at <= time.time() or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, expires_at)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class TokenCache(ExpiringCache):
+    """Decoded Firebase ID tokens, keyed by the SHA-256 of the raw token.
+
+    An entry is served until the token's own ``exp`` claim, so a cached token
+    is never accepted after Firebase would have rejected it as expired. Raw
+    tokens are never kept in memory.
+    """
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        return self._get(self._key(token))
+
+    def put(self, token: str, decoded_token: Dict[str, Any]) -> None:
+        exp = decoded_token.get("exp")
+        if exp:
+            self._put(self._key(token), decoded_token, float(exp))
+
+    def invalidate_user(self, uid: str) -> None:
+        """Drop every cached token issued to ``uid`` (e.g. after revoking its sessions)."""
+        with self._lock:
+            for key in [k for k, (decoded, _) in self._entries.items() if decoded.get("uid") == uid]:
+                del self._entries[key]
+
+
+class UserRecordCache(ExpiringCache):
+    """Firebase Auth user records, kept for a short TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        super().__init__(max_entries)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, uid: str) -> Optional[Any]:
+        return self._get(uid)
+
+    def put(self, uid: str, user_record: Any) -> None:
+        self._put(uid, user_record, time.time() + self.ttl_seconds)
+
+    def invalidate(self, uid: str) -> None:
+        self._invalidate(uid)
+
+
+token_cache = TokenCache(AUTH_TOKEN_CACHE_SIZE)
+user_record_cache = UserRecordCache(AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TTL_SECONDS)
+
+register_metrics("auth_token_cache", token_cache.stats)
+register_metrics("auth_user_cache", user_record_cache.stats)
+
+
+def invalidate_user(uid: str) -> None:
+    """Forget everything cached for a user; call after changing claims, disabling or deleting them."""
+    token_cache.invalidate_user(uid)
+    user_record_cache.invalidate(uid)
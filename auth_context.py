@@ -0,0 +1,73 @@
+import logging
+from typing import Any, Dict
+
+from firebase_admin import auth
+
+from auth_cache import user_record_cache
+from blocking_io import run_blocking
+from profile_provisioner import profile_provisioner, profile_id_for_user
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+async def load_user_record(uid: str):
+    """Fetch a Firebase Auth user record, served from the short-TTL user cache when possible."""
+    user = user_record_cache.get(uid)
+    if user is None:
+        user = await run_blocking("auth", auth.get_user, uid)
+        user_record_cache.put(uid, user)
+    return user
+
+
+def user_data_from_record(user) -> Dict[str, Any]:
+    """Full user context from an Auth user record, queueing profile provisioning if needed."""
+    user_data = {
+        'uid': user.uid,
+        'email': user.email,
+        'email_verified': user.email_verified,
+        'display_name': user.display_name,
+        'phone_number': user.phone_number,
+        'photo_url': user.photo_url,
+        'disabled': user.disabled,
+        'custom_claims': user.custom_claims or {}
+    }
+
+    # Use profile_id from custom claims if available; otherwise derive it from the
+    # provider and let the background provisioner persist it to the claims
+    user_data['profile_id'] = profile_id_for_user(user)
+    if not user_data['custom_claims'].get('profile_id'):
+        profile_provisioner.request(user.uid, user_data['profile_id'], user_data['custom_claims'])
+    return user_data
+
+
+async def user_data_from_claims(decoded_token: Dict[str, Any]) -> Dict[str, Any]:
+    """Lightweight user context built from verified token claims only.
+
+    Custom claims are copied into ID tokens, so ``profile_id`` is normally
+    present and no Admin SDK call is made. Tokens minted before the claim was
+    provisioned fall back to the user record, so the profile id always
+    matches the one the full user context would report.
+
+    Args:
+        decoded_token: Claims of a verified Firebase ID token
+
+    Returns:
+        Dict with uid, email, email_verified, profile_id and sign_in_provider
+    """
+    firebase_claims = decoded_token.get('firebase') or {}
+    profile_id = decoded_token.get('profile_id')
+    if not profile_id:
+        profile_id = user_data_from_record(await load_user_record(decoded_token['uid']))['profile_id']
+    return {
+        'uid': decoded_token['uid'],
+        'email': decoded_token.get('email'),
+        'email_verified': decoded_token.get('email_verified', False),
+        'profile_id': profile_id,
+        'sign_in_provider': firebase_claims.get('sign_in_provider'),
+    }
+
+
+async def load_full_user(user_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Opt-in upgrade of a claims-only context to the full user-record context."""
+    return user_data_from_record(await load_user_record(user_data['uid']))
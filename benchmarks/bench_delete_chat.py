@@ -0,0 +1,68 @@
+"""
+Benchmark: deleting a 10k-message conversation against the in-memory Firestore fake.
+
+Compares the chunked, parallel deletion used by delete_chat with a sequential
+baseline (one batch in flight at a time). The fake sleeps ``--latency`` seconds
+per round-trip to model network latency to Firestore.
+
+    python benchmarks/bench_delete_chat.py --messages 10000 --latency 0.02
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from chat_deletion import delete_chat_tree
+from tests.fake_firestore import FakeFirestore
+
+
+def seed(db: FakeFirestore, messages: int):
+    user_ref = db.collection('users').document('profile_bench')
+    chat_ref = user_ref.collection('chats').document('chat_bench')
+    chat_ref.set({'title': 'bench'})
+    batch = db.batch()
+    for i in range(messages):
+        batch.set(chat_ref.collection('messages').document(), {'message': f"m{i}", 'response': f"r{i}"})
+        if len(batch) == 500:
+            batch.commit()
+            batch = db.batch()
+    if len(batch):
+        batch.commit()
+    user_ref.collection('summary').document('chat_bench').set({'compressed_memory': []})
+    return chat_ref, user_ref.collection('summary').document('chat_bench')
+
+
+async def run(messages: int, latency: float, max_parallel: int) -> None:
+    db = FakeFirestore()
+    chat_ref, summary_ref = seed(db, messages)
+    db.latency = latency
+    db.round_trips = 0
+
+    start = time.perf_counter()
+    deleted = await delete_chat_tree(db, chat_ref, summary_ref, max_parallel=max_parallel)
+    elapsed = time.perf_counter() - start
+
+    assert db.document_count() == 0, "documents left behind"
+    print(
+        f"max_parallel={max_parallel:<3} deleted={deleted:<6} round_trips={db.round_trips:<4} "
+        f"elapsed={elapsed * 1000:8.1f} ms  ({deleted / elapsed:,.0f} docs/s)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated seconds per round-trip")
+    args = parser.parse_args()
+
+    print(f"Deleting a {args.messages}-message chat, {args.latency * 1000:.0f} ms simulated latency")
+    for max_parallel in (1, 4, 8):
+        asyncio.run(run(args.messages, args.latency, max_parallel))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Microbenchmark: decode cost of reading 100 chat messages for LLM context.
+
+Compares the previous get_chat_messages decoding (three to_dict() calls per
+snapshot, every stored field) with the projected get_recent_turns path (only
+message/response/timestamp fetched, one to_dict() per snapshot, ChatTurn
+records). Snapshots come from the in-memory Firestore fake, whose to_dict()
+deep-copies like the real client.
+
+    python benchmarks/bench_message_decode.py
+"""
+import sys
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from memory_store import CHAT_TURN_FIELDS, chat_turn_from_dict
+from tests.fake_firestore import FakeFirestore
+
+MESSAGES = 100
+REPEATS = 200
+
+
+def seed():
+    db = FakeFirestore()
+    messages = db.collection('users').document('p').collection('chats').document('c').collection('messages')
+    for i in range(MESSAGES):
+        messages.document().set({
+            'user_id': 'uid_0123456789abcdef',
+            'profile_id': 'uid_0123456789abcdef_google.com',
+            'personality': 'swag_bhai',
+            'message': f"user message number {i} " * 6,
+            'response': f"assistant response number {i} " * 20,
+            'timestamp': datetime.now(timezone.utc),
+        })
+    return messages
+
+
+def legacy_decode(snapshots):
+    return [{
+        'id': msg.id,
+        **msg.to_dict(),
+        'timestamp': msg.to_dict().get('timestamp').isoformat() if msg.to_dict().get('timestamp') else None
+    } for msg in snapshots]
+
+
+def projected_decode(snapshots):
+    return [chat_turn_from_dict(msg.id, msg.to_dict()) for msg in snapshots]
+
+
+def payload_size(records):
+    total = 0
+    for record in records:
+        values = record.values() if isinstance(record, dict) else record
+        total += sum(len(str(v)) for v in values)
+    return total
+
+
+def main():
+    messages = seed()
+    full = messages.order_by('timestamp', direction='DESCENDING').limit(MESSAGES).get()
+    projected = messages.select(CHAT_TURN_FIELDS).order_by('timestamp', direction='DESCENDING').limit(MESSAGES).get()
+
+    legacy = timeit.timeit(lambda: legacy_decode(full), number=REPEATS) / REPEATS
+    new = timeit.timeit(lambda: projected_decode(projected), number=REPEATS) / REPEATS
+
+    print(f"Decoding {MESSAGES} messages (mean of {REPEATS} runs)")
+    print(f"  legacy   (3x to_dict, all fields): {legacy * 1e6:9.1f} us   payload ~{payload_size(legacy_decode(full)):,} chars")
+    print(f"  projected(1x to_dict, ChatTurn)  : {new * 1e6:9.1f} us   payload ~{payload_size(projected_decode(projected)):,} chars")
+    print(f"  speedup: {legacy / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: assembling a long rendering from per-sentence WAV chunks.
+
+Builds about two minutes of 24 kHz mono 16-bit audio (gTTS's output format)
+split into sentence-sized chunks and joins them two ways:
+
+  pydub     sum(AudioSegment(chunk) ...) then export to WAV, as a naive
+            implementation would; every addition copies everything so far
+  assembler audio_codec.assemble_wav: parse each chunk once, one
+            preallocated join, header written first
+
+Reports wall time and peak traced memory for several chunk counts.
+
+    python benchmarks/bench_pcm_assembly.py --seconds 120 --chunks 40,120,400
+"""
+import argparse
+import io
+import math
+import struct
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pydub import AudioSegment
+
+from app.services.audio_codec import PCMFormat, assemble_wav, wav_header
+
+PCM = PCMFormat(24000, 1, 2)
+
+
+def make_chunks(seconds: float, count: int):
+    samples = int(seconds * PCM.sample_rate / count)
+    tone = struct.pack(f"<{samples}h", *(int(8000 * math.sin(i / 8)) for i in range(samples)))
+    return [wav_header(PCM, len(tone)) + tone for _ in range(count)]
+
+
+def with_pydub(chunks):
+    combined = AudioSegment.empty()
+    for chunk in chunks:
+        combined += AudioSegment(data=chunk)
+    out = io.BytesIO()
+    combined.export(out, format="wav")
+    return out.getvalue()
+
+
+def measure(label, fn, chunks):
+    tracemalloc.start()
+    started = time.perf_counter()
+    data = fn(chunks)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return label, elapsed, peak, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=120.0, help="total audio duration")
+    parser.add_argument("--chunks", default="40,120,400", help="comma-separated chunk counts")
+    args = parser.parse_args()
+
+    print(f"{args.seconds:.0f}s of {PCM.sample_rate} Hz mono 16-bit PCM\n")
+    print(f"{'chunks':>6}  {'method':<9} {'time ms':>9} {'peak MiB':>9} {'output MiB':>10}")
+    for count in (int(c) for c in args.chunks.split(",")):
+        chunks = make_chunks(args.seconds, count)
+        for label, fn in (("pydub", with_pydub), ("assembler", assemble_wav)):
+            label, elapsed, peak, size = measure(label, fn, chunks)
+            print(f"{count:>6}  {label:<9} {elapsed * 1000:>9.1f} {peak / 2**20:>9.1f} {size / 2**20:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
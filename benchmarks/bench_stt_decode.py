@@ -0,0 +1,75 @@
+"""
+Benchmark: handing decoded upload audio to the speech recognizer.
+
+Starts from synthetic 16 kHz mono 16-bit clips (the output of
+audio_codec.decode_pcm) and builds the recognizer's AudioData two ways:
+
+  tempfile  export a temporary WAV, reopen it with sr.AudioFile, calibrate
+            on the first 0.5 s and record the rest, then delete the file
+  memory    stt_service.to_audio_data: slice the PCM bytes directly
+
+Recognition itself (a network call) and voice-activity trimming are left
+out. Reports clips per second for several clip lengths.
+
+    python benchmarks/bench_stt_decode.py --seconds 2,10,30 --repeat 50
+"""
+import argparse
+import math
+import os
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import speech_recognition as sr
+from pydub import AudioSegment
+
+from app.services.stt_service import to_audio_data
+
+
+def make_clip(seconds: float) -> AudioSegment:
+    samples = int(seconds * 16000)
+    pcm = struct.pack(f"<{samples}h", *(int(6000 * math.sin(i / 5)) for i in range(samples)))
+    return AudioSegment(data=pcm, sample_width=2, frame_rate=16000, channels=1)
+
+
+def via_tempfile(audio: AudioSegment) -> sr.AudioData:
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
+        temp_path = temp_file.name
+    try:
+        audio.export(temp_path, format="wav")
+        recognizer = sr.Recognizer()
+        with sr.AudioFile(temp_path) as source:
+            recognizer.adjust_for_ambient_noise(source, duration=0.5)
+            return recognizer.record(source)
+    finally:
+        os.unlink(temp_path)
+
+
+def throughput(fn, audio: AudioSegment, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(audio)
+    return repeat / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", default="2,10,30", help="comma-separated clip lengths")
+    parser.add_argument("--repeat", type=int, default=50, help="clips per measurement")
+    args = parser.parse_args()
+
+    print(f"{'clip s':>6}  {'tempfile/s':>10} {'memory/s':>10} {'speedup':>8}")
+    for seconds in (float(s) for s in args.seconds.split(",")):
+        audio = make_clip(seconds)
+        old = throughput(via_tempfile, audio, args.repeat)
+        new = throughput(lambda clip: to_audio_data(clip.raw_data), audio, args.repeat)
+        print(f"{seconds:>6.0f}  {old:>10.0f} {new:>10.0f} {new / old:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: voice-activity trimming before speech recognition.
+
+Builds synthetic 16 kHz clips of a few seconds of speech-like audio
+(harmonic, amplitude-modulated voicing with noisy consonants) between long
+stretches of background noise, as phone recordings with late starts and
+forgotten stop buttons look, and reports per clip:
+
+  vad ms       time for vad.detect_speech on the whole clip
+  sent s       audio left for recognition: before (everything after the old
+               0.5 s calibration skip) and after trimming
+  FLAC KiB     the payload recognize_google uploads, before and after
+
+    python benchmarks/bench_stt_vad.py --speech 3 --silence 2,10,30
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import speech_recognition as sr
+
+from app.services.vad import detect_speech
+
+RATE = 16000
+rng = np.random.default_rng(0)
+
+
+def make_clip(speech_seconds: float, silence_seconds: float) -> bytes:
+    def noise(seconds):
+        return rng.normal(0, 40, int(seconds * RATE))
+
+    t = np.arange(int(speech_seconds * RATE)) / RATE
+    voiced = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 6)) * 2500
+    voiced *= 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    voiced += rng.normal(0, 120, len(t)) * (np.sin(2 * np.pi * 1.5 * t) > 0.7)
+    lead = silence_seconds / 3
+    samples = np.concatenate([noise(lead), voiced, noise(silence_seconds - lead)])
+    return np.clip(samples, -32768, 32767).astype("<i2").tobytes()
+
+
+def flac_size(pcm: bytes) -> int:
+    return len(sr.AudioData(pcm, RATE, 2).get_flac_data())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--speech", type=float, default=3.0, help="seconds of speech per clip")
+    parser.add_argument("--silence", default="2,10,30", help="comma-separated seconds of silence per clip")
+    parser.add_argument("--repeat", type=int, default=20, help="VAD runs per clip")
+    args = parser.parse_args()
+
+    print(f"{'clip s':>6} {'vad ms':>7} {'ratio':>6} {'sent s before':>14} {'after':>6} {'FLAC KiB before':>16} {'after':>6}")
+    for silence in (float(s) for s in args.silence.split(",")):
+        pcm = make_clip(args.speech, silence)
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            result = detect_speech(pcm, RATE)
+        elapsed = (time.perf_counter() - started) / args.repeat
+        before = pcm[RATE:]  # 0.5 s of 16-bit samples skipped by the old calibration
+        after = pcm[result.start:result.end]
+        print(
+            f"{len(pcm) / 2 / RATE:>6.1f} {elapsed * 1000:>7.2f} {result.speech_ratio:>6.2f} "
+            f"{len(before) / 2 / RATE:>14.1f} {len(after) / 2 / RATE:>6.1f} "
+            f"{flac_size(before) / 1024:>16.0f} {flac_size(after) / 1024:>6.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
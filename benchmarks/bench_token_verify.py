@@ -0,0 +1,56 @@
+"""
+Benchmark: local Firebase ID token verification throughput on one core.
+
+Signs tokens with a locally generated RSA key and verifies them with
+FirebaseTokenVerifier (keys parsed once when the certificates are loaded).
+For comparison, the baseline parses the X.509 certificate on every call, as
+a verifier without a key cache would.
+
+    python benchmarks/bench_token_verify.py --seconds 3
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from tests.test_token_verifier import PROJECT_ID, _certificate, _token
+from token_verifier import FirebaseTokenVerifier
+
+
+def measure(label: str, verify, token: str, seconds: float) -> None:
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        verify(token)
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {count / elapsed:>10,.0f} verifications/s  ({elapsed / count * 1e6:6.1f} us each)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0, help="duration of each measurement")
+    args = parser.parse_args()
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    certificates = {"key-1": _certificate(key)}
+    token = _token(key)
+
+    verifier = FirebaseTokenVerifier(PROJECT_ID)
+    verifier.load_certificates(certificates)
+
+    def reload_and_verify(t):
+        verifier.load_certificates(certificates)
+        return verifier.verify(t)
+
+    measure("cached keys", verifier.verify, token, args.seconds)
+    measure("parse certificate per call", reload_and_verify, token, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: synthesis latency per TTS engine.
+
+Renders the persona intro lines with each configured engine (gTTS over the
+network, espeak-ng locally) straight through the engine, bypassing the TTS
+cache, and reports p50/p95/max latency and failures. Engines that are not
+available on this host are reported and skipped.
+
+    python benchmarks/bench_tts_engines.py --rounds 5 --engines gtts,espeak
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.tts_engines import ENGINE_TYPES
+from personalities import PERSONALITY_PROMPTS
+
+
+def measure(engine, lines, rounds, language):
+    latencies, failures, last_error = [], 0, None
+    for _ in range(rounds):
+        for persona, text in lines:
+            started = time.perf_counter()
+            try:
+                engine.synthesize(text, language, persona)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                failures += 1
+                last_error = str(e)
+    return latencies, failures, last_error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3, help="passes over the intro lines")
+    parser.add_argument("--engines", default=",".join(ENGINE_TYPES), help="comma-separated engine names")
+    parser.add_argument("--language", default="en", help="gTTS language code")
+    args = parser.parse_args()
+
+    lines = [(persona_id, persona["intro"]) for persona_id, persona in PERSONALITY_PROMPTS.items()]
+    print(f"{len(lines)} lines x {args.rounds} rounds\n")
+    print(f"{'engine':<8} {'ok':>4} {'fail':>5} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for name in args.engines.split(","):
+        engine = ENGINE_TYPES[name.strip()]()
+        if not engine.available():
+            print(f"{engine.name:<8} not available on this host")
+            continue
+        latencies, failures, last_error = measure(engine, lines, args.rounds, args.language)
+        if not latencies:
+            print(f"{engine.name:<8} {0:>4} {failures:>5}   all failed: {last_error}")
+            continue
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        print(f"{engine.name:<8} {len(latencies):>4} {failures:>5} {statistics.median(latencies) * 1000:>8.0f} "
+              f"{p95 * 1000:>8.0f} {latencies[-1] * 1000:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark: payload size and server CPU per TTS output format.
+
+Starts from one MP3 (a synthetic tone standing in for gTTS output, so no
+network is needed) and encodes it with encode_speech for each format the
+/api/speech/tts endpoint negotiates. CPU is process plus child (ffmpeg)
+user+system time, so it reflects what the server pays per request.
+Requires ffmpeg with libopus on PATH (or FFMPEG_BINARY).
+
+    python benchmarks/bench_tts_formats.py --seconds 6 --iterations 20
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.audio_codec import AUDIO_MEDIA_TYPES, encode_speech
+from benchmarks.bench_tts_pipeline import make_mp3
+from config import FFMPEG_BINARY
+
+
+def cpu_seconds() -> float:
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=6.0, help="duration of the test clip")
+    parser.add_argument("--iterations", type=int, default=20, help="encodes per format")
+    args = parser.parse_args()
+
+    if shutil.which(FFMPEG_BINARY) is None:
+        sys.exit(f"ffmpeg not found ({FFMPEG_BINARY}); install it or set FFMPEG_BINARY")
+
+    mp3 = make_mp3(args.seconds)
+    print(f"clip: {args.seconds}s speech-rate tone, {args.iterations} encodes per format\n")
+    print(f"{'format':<8} {'media type':<12} {'bytes':>10} {'kbit/s':>8} {'cpu ms/req':>11} {'wall ms/req':>12}")
+    for audio_format, media_type in AUDIO_MEDIA_TYPES.items():
+        cpu, wall = cpu_seconds(), time.perf_counter()
+        for _ in range(args.iterations):
+            data = encode_speech(mp3, audio_format)
+        cpu = (cpu_seconds() - cpu) / args.iterations
+        wall = (time.perf_counter() - wall) / args.iterations
+        print(f"{audio_format:<8} {media_type:<12} {len(data):>10,} {len(data) * 8 / args.seconds / 1000:>8.1f} "
+              f"{cpu * 1000:>11.2f} {wall * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
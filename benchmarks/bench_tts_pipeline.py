@@ -0,0 +1,97 @@
+"""
+Benchmark: TTS post-processing, legacy temp-file pipeline vs in-memory pipes.
+
+Both sides start from the same MP3 (a synthetic tone standing in for gTTS
+output, so no network is needed) and produce WAV bytes:
+
+  legacy     write MP3 to disk, pydub AudioSegment.from_mp3, export WAV to
+             disk, read it back, delete both files
+  in-memory  mp3_to_wav: MP3 on ffmpeg's stdin, WAV from its stdout
+
+Reports requests/s at the given concurrency, filesystem operations per
+request and bytes written to storage (from /proc/self/io on Linux).
+Requires ffmpeg on PATH (or FFMPEG_BINARY).
+
+    python benchmarks/bench_tts_pipeline.py --requests 200 --concurrency 4
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.audio_codec import mp3_to_wav
+from config import FFMPEG_BINARY
+
+
+def make_mp3(seconds: float) -> bytes:
+    return subprocess.run(
+        [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-f", "lavfi",
+         "-i", f"sine=frequency=440:duration={seconds}", "-ac", "1", "-ar", "24000",
+         "-b:a", "32k", "-f", "mp3", "pipe:1"],
+        stdout=subprocess.PIPE, check=True
+    ).stdout
+
+
+def legacy_pipeline(mp3: bytes, workdir: str) -> bytes:
+    """The pre-refactor TTSService flow: 2 writes, 2 reads, 2 deletes per request."""
+    from pydub import AudioSegment
+
+    stem = os.path.join(workdir, uuid.uuid4().hex)
+    with open(f"{stem}.mp3", "wb") as f:
+        f.write(mp3)
+    AudioSegment.from_mp3(f"{stem}.mp3").export(f"{stem}.wav", format="wav")
+    with open(f"{stem}.wav", "rb") as f:
+        data = f.read()
+    os.remove(f"{stem}.mp3")
+    os.remove(f"{stem}.wav")
+    return data
+
+
+def storage_bytes_written() -> int:
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["write_bytes"])
+    except (OSError, KeyError):
+        return 0
+
+
+def measure(label: str, fn, requests: int, concurrency: int, file_ops: int) -> None:
+    written = storage_bytes_written()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: fn(), range(requests)))
+    elapsed = time.perf_counter() - start
+    written = storage_bytes_written() - written
+    print(f"{label:<10} {requests / elapsed:>8.1f} req/s  {file_ops} file ops/req  "
+          f"{written / requests / 1024:>8.1f} KiB written/req")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="renders per pipeline")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel renders (audio pool size)")
+    parser.add_argument("--seconds", type=float, default=4.0, help="duration of the test clip")
+    args = parser.parse_args()
+
+    if shutil.which(FFMPEG_BINARY) is None:
+        sys.exit(f"ffmpeg not found ({FFMPEG_BINARY}); install it or set FFMPEG_BINARY")
+
+    mp3 = make_mp3(args.seconds)
+    print(f"clip: {args.seconds}s, {len(mp3)} bytes MP3, {args.requests} requests, concurrency {args.concurrency}")
+    with tempfile.TemporaryDirectory() as workdir:
+        measure("legacy", lambda: legacy_pipeline(mp3, workdir), args.requests, args.concurrency, 6)
+    measure("in-memory", lambda: mp3_to_wav(mp3), args.requests, args.concurrency, 0)
+
+
+if __name__ == "__main__":
+    main()
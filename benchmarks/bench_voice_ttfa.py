@@ -0,0 +1,92 @@
+"""
+Benchmark: end-to-end time-to-first-audio of a voice chat reply.
+
+Simulates the LLM as a token stream (first-token latency, then a steady
+token rate) and TTS as a fixed round trip plus a per-character cost, then
+compares:
+
+  serial     /chat returns the full text, then /api/speech/tts renders it
+  pipelined  voice mode: voice_pipeline.voice_events synthesizes each
+             sentence as soon as the stream completes it
+
+Time-to-first-audio (TTFA) is measured from the start of the request to the
+first playable audio; total is until the last audio is ready.
+
+    python benchmarks/bench_voice_ttfa.py --first-token-ms 300 --token-ms 15
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from voice_pipeline import voice_events
+
+SENTENCES = [
+    "Arre bhai, ye toh ekdum mast sawaal hai!",
+    "Dekho, pehle apna budget clear karo aur phir options compare karo.",
+    "Agar EMI zyada lag rahi hai toh thoda wait karna better hai.",
+    "Aur haan, festive season mein offers bhi milte hain, toh wahi time pakdo.",
+    "Koi aur doubt ho toh bindaas pucho, main yahin hoon!",
+]
+
+
+async def llm_stream(text: str, first_token: float, per_token: float):
+    await asyncio.sleep(first_token)
+    for word in text.split(" "):
+        yield word + " "
+        await asyncio.sleep(per_token)
+
+
+def tts_delay(text: str, base: float, per_char: float) -> float:
+    return base + per_char * len(text)
+
+
+async def serial(text, args):
+    started = time.perf_counter()
+    reply = "".join([delta async for delta in llm_stream(text, args.first_token_ms / 1000, args.token_ms / 1000)])
+    await asyncio.sleep(tts_delay(reply, args.tts_base_ms / 1000, args.tts_char_ms / 1000))
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed
+
+
+async def pipelined(text, args):
+    started = time.perf_counter()
+
+    async def synthesize(sentence):
+        await asyncio.sleep(tts_delay(sentence, args.tts_base_ms / 1000, args.tts_char_ms / 1000))
+        return sentence.encode(), None
+
+    first_audio = None
+    deltas = llm_stream(text, args.first_token_ms / 1000, args.token_ms / 1000)
+    async for event in voice_events(deltas, synthesize, "mp3", args.concurrency, started=started):
+        if event["type"] == "audio" and first_audio is None:
+            first_audio = time.perf_counter() - started
+    return first_audio, time.perf_counter() - started
+
+
+async def run(args):
+    print(f"{'sentences':>9} {'chars':>6}   {'serial TTFA':>11} {'pipelined TTFA':>14}   {'serial total':>12} {'pipelined total':>15}")
+    for count in range(1, len(SENTENCES) + 1):
+        text = " ".join(SENTENCES[:count])
+        serial_ttfa, serial_total = await serial(text, args)
+        piped_ttfa, piped_total = await pipelined(text, args)
+        print(f"{count:>9} {len(text):>6}   {serial_ttfa * 1000:>9.0f}ms {piped_ttfa * 1000:>12.0f}ms   "
+              f"{serial_total * 1000:>10.0f}ms {piped_total * 1000:>13.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--first-token-ms", type=float, default=300, help="LLM time to first token")
+    parser.add_argument("--token-ms", type=float, default=15, help="LLM time per word")
+    parser.add_argument("--tts-base-ms", type=float, default=350, help="TTS round trip per request")
+    parser.add_argument("--tts-char-ms", type=float, default=4, help="TTS cost per character")
+    parser.add_argument("--concurrency", type=int, default=3, help="sentences synthesized in parallel")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
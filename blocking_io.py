@@ -0,0 +1,325 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import (
+    BLOCKING_POOL_SIZES, BLOCKING_QUEUE_LIMITS, BLOCKING_SATURATION_LOG_SECONDS,
+    PROCESS_POOL_SIZES, PROCESS_QUEUE_LIMITS
+)
+from metrics import LatencyStats, register_metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturatedError(RuntimeError):
+    """A pool's wait queue is full; the call was rejected without running."""
+
+
+class BlockingPool:
+    """Bounded thread pool for the blocking calls of one dependency.
+
+    Each dependency (Firestore, Firebase Auth, Storage, audio processing)
+    gets its own pool, so a slow dependency fills only its own threads and
+    cannot starve the others or the event loop. Time spent waiting for a
+    thread and time spent running are recorded separately; when every
+    thread is busy and calls start queueing, a warning is logged at most
+    once per ``saturation_log_seconds``. With ``max_queue`` set, calls
+    arriving while that many are already waiting are rejected with
+    PoolSaturatedError instead of piling up behind them.
+    """
+
+    def __init__(self, name: str, max_workers: int, saturation_log_seconds: float = 30.0, max_queue: int = 0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.saturation_log_seconds = saturation_log_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._last_warning = 0.0
+        self.queue_time = LatencyStats()
+        self.run_time = LatencyStats()
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.saturated = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-io")
+            return self._executor
+
+    def _note_submission(self) -> None:
+        with self._lock:
+            waiting = self.queued - max(0, self.max_workers - self.active)
+            if self.max_queue and waiting >= self.max_queue:
+                self.rejected += 1
+                raise PoolSaturatedError(f"Blocking pool '{self.name}' is full: {self.max_queue} calls already waiting")
+            self.queued += 1
+            if self.active + self.queued <= self.max_workers:
+                return
+            self.saturated += 1
+            now = time.monotonic()
+            if now - self._last_warning < self.saturation_log_seconds:
+                return
+            self._last_warning = now
+            queued = self.queued
+        logger.warning(
+            f"Blocking pool '{self.name}' saturated: {self.max_workers} threads busy, {queued} calls waiting "
+            f"(p95 queue time {self.queue_time.percentile(0.95) * 1000:.1f} ms)"
+        )
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on this pool and await its result.
+
+        Raises:
+            PoolSaturatedError: If ``max_queue`` calls are already waiting
+        """
+        self._note_submission()
+        executor = self._get_executor()
+        submitted = time.perf_counter()
+        state = {"started": False, "abandoned": False}
+
+        def call():
+            started = time.perf_counter()
+            with self._lock:
+                if state["abandoned"]:
+                    return None
+                state["started"] = True
+                self.queued -= 1
+                self.active += 1
+            self.queue_time.observe(started - submitted)
+            try:
+                result = fn(*args, **kwargs)
+                with self._lock:
+                    self.completed += 1
+                return result
+            except BaseException:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                self.run_time.observe(time.perf_counter() - started)
+                with self._lock:
+                    self.active -= 1
+
+        context = contextvars.copy_context()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(context.run, call))
+        except asyncio.CancelledError:
+            # A call cancelled before a thread picked it up never runs
+            with self._lock:
+                if not state["started"]:
+                    state["abandoned"] = True
+                    self.queued -= 1
+            raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "completed": self.completed,
+                "failed": self.failed,
+                "saturated": self.saturated,
+                "rejected": self.rejected,
+            }
+        counters["queue_time"] = self.queue_time.snapshot()
+        counters["run_time"] = self.run_time.snapshot()
+        return counters
+
+
+def _timed_call(fn: Callable[..., Any], args: tuple, kwargs: dict) -> Tuple[float, float, Any]:
+    """Worker-side wrapper: when the call started (monotonic, shared across processes) and how long it ran."""
+    started = time.monotonic()
+    result = fn(*args, **kwargs)
+    return started, time.monotonic() - started, result
+
+
+class ProcessPool(BlockingPool):
+    """Bounded process pool for CPU-bound calls that threads would serialize on the GIL.
+
+    Same accounting, saturation warnings and queue limit as BlockingPool.
+    A worker process cannot report when it picks a call up, so every call
+    in flight counts as queued until it finishes; ``stats`` splits them
+    into active and waiting by the worker count. Queue and run time come
+    back with the result. ``fn`` and its arguments must be picklable
+    (module-level functions, bytes). A call that exceeds its timeout is
+    abandoned: it is cancelled if it has not started, otherwise its
+    worker stays busy until it returns, so the callee should bound its own
+    run time too. Workers are spawned rather than forked, so they never
+    inherit the server's threads or locks.
+    """
+
+    def __init__(self, name: str, max_workers: int, saturation_log_seconds: float = 30.0, max_queue: int = 0):
+        super().__init__(name, max_workers, saturation_log_seconds, max_queue)
+        self._process_executor: Optional[ProcessPoolExecutor] = None
+        self.timed_out = 0
+
+    def _get_process_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._process_executor is None:
+                self._process_executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._process_executor
+
+    def _finished(self, future: Future) -> None:
+        with self._lock:
+            self.queued -= 1
+            if future.cancelled():
+                return
+            if future.exception() is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        if future.exception() is None:
+            _, elapsed, _ = future.result()
+            self.run_time.observe(elapsed)
+
+    async def run(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` in a worker process and await its result.
+
+        Args:
+            fn: Picklable callable
+            timeout: Seconds to wait for the result; None waits indefinitely
+
+        Raises:
+            PoolSaturatedError: If ``max_queue`` calls are already waiting
+            TimeoutError: If the result did not arrive within ``timeout``
+        """
+        self._note_submission()
+        submitted = time.monotonic()
+        try:
+            future = self._get_process_executor().submit(_timed_call, fn, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+            raise
+        future.add_done_callback(self._finished)
+        try:
+            started, _, result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise TimeoutError(f"Process pool '{self.name}' call timed out after {timeout}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. killed by the OOM killer); start afresh on the next call
+            with self._lock:
+                if self._process_executor is not None:
+                    self._process_executor.shutdown(wait=False)
+                    self._process_executor = None
+            raise
+        self.queue_time.observe(max(0.0, started - submitted))
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._process_executor = self._process_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        counters = super().stats()
+        in_flight = counters["queued"]
+        counters["active"] = min(in_flight, self.max_workers)
+        counters["queued"] = in_flight - counters["active"]
+        counters["timed_out"] = self.timed_out
+        counters["kind"] = "process"
+        return counters
+
+
+_pools: Dict[str, BlockingPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name: str) -> BlockingPool:
+    """Return the pool for a dependency ("firestore", "auth", "storage", "audio" or "tts")."""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            if name not in BLOCKING_POOL_SIZES:
+                raise ValueError(f"Unknown blocking pool: {name}")
+            pool = BlockingPool(
+                name, BLOCKING_POOL_SIZES[name], BLOCKING_SATURATION_LOG_SECONDS, BLOCKING_QUEUE_LIMITS.get(name, 0)
+            )
+            _pools[name] = pool
+        return pool
+
+
+def get_process_pool(name: str) -> ProcessPool:
+    """Return the process pool for CPU-bound work ("audio_decode")."""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            if name not in PROCESS_POOL_SIZES:
+                raise ValueError(f"Unknown process pool: {name}")
+            pool = ProcessPool(
+                name, PROCESS_POOL_SIZES[name], BLOCKING_SATURATION_LOG_SECONDS, PROCESS_QUEUE_LIMITS.get(name, 0)
+            )
+            _pools[name] = pool
+        return pool
+
+
+async def run_blocking(pool: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking call on the named dependency pool without blocking the event loop.
+
+    Args:
+        pool: Pool name ("firestore", "auth", "storage", "audio" or "tts")
+        fn: Blocking callable
+        *args, **kwargs: Arguments for fn
+
+    Returns:
+        Whatever fn returns; exceptions propagate unchanged
+
+    Raises:
+        PoolSaturatedError: If the pool's wait queue is full
+    """
+    return await get_pool(pool).run(fn, *args, **kwargs)
+
+
+async def run_in_process(pool: str, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """Run a CPU-bound call in the named process pool without blocking the event loop.
+
+    Args:
+        pool: Process pool name ("audio_decode")
+        fn: Picklable module-level callable
+        *args, **kwargs: Picklable arguments for fn
+        timeout: Seconds to wait for the result; None waits indefinitely
+
+    Returns:
+        Whatever fn returns; exceptions propagate unchanged
+
+    Raises:
+        PoolSaturatedError: If the pool's wait queue is full
+        TimeoutError: If the result did not arrive in time
+    """
+    return await get_process_pool(pool).run(fn, *args, timeout=timeout, **kwargs)
+
+
+def blocking_io_stats() -> Dict[str, Any]:
+    with _pools_lock:
+        pools = dict(_pools)
+    return {name: pool.stats() for name, pool in pools.items()}
+
+
+register_metrics("blocking_io", blocking_io_stats)
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from blocking_io import run_blocking
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Firestore rejects batches with more than 500 writes; stay comfortably below it
+DELETE_BATCH_SIZE = 450
+# Maximum number of batch commits in flight for a single deletion
+DELETE_MAX_PARALLEL = 4
+# How long finished jobs stay queryable through the status endpoint
+DELETE_JOB_TTL_SECONDS = 3600
+
+# Jobs started by this process; their status is also saved to the memory
+# store so a poll answered by another worker finds them
+_jobs: Dict[str, "DeleteJob"] = {}
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+class DeleteJob:
+    """Status record for a background chat deletion."""
+
+    def __init__(self, chat_id: str, owner_id: str):
+        self.id = str(uuid.uuid4())
+        self.chat_id = chat_id
+        self.owner_id = owner_id
+        self.status = "pending"
+        self.deleted = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "chat_id": self.chat_id,
+            "status": self.status,
+            "deleted": self.deleted,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    def to_record(self) -> Dict[str, Any]:
+        """The status plus the owner, as saved to the memory store."""
+        return {**self.to_dict(), "owner_id": self.owner_id}
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "DeleteJob":
+        job = cls(record["chat_id"], record["owner_id"])
+        job.id = record["job_id"]
+        job.status = record["status"]
+        job.deleted = record.get("deleted", 0)
+        job.error = record.get("error")
+        job.created_at = record["created_at"]
+        job.finished_at = record.get("finished_at")
+        return job
+
+    def expired(self) -> bool:
+        return bool(self.finished_at) and self.finished_at < time.time() - DELETE_JOB_TTL_SECONDS
+
+
+def _chunks(items: Iterable[Any], size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def delete_refs_chunked(
+    db,
+    refs: Iterable[Any],
+    batch_size: int = DELETE_BATCH_SIZE,
+    max_parallel: int = DELETE_MAX_PARALLEL,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Delete document references in batches, committing several batches concurrently.
+
+    Args:
+        db: Firestore client
+        refs: Document references to delete
+        batch_size: Writes per batch (must stay below Firestore's 500 limit)
+        max_parallel: Maximum number of batch commits in flight
+        on_progress: Optional callback receiving the running count of deleted documents
+
+    Returns:
+        Number of deleted documents
+    """
+    semaphore = asyncio.Semaphore(max_parallel)
+    deleted = 0
+
+    def commit(chunk: List[Any]) -> int:
+        batch = db.batch()
+        for ref in chunk:
+            batch.delete(ref)
+        batch.commit()
+        return len(chunk)
+
+    async def run(chunk: List[Any]) -> None:
+        nonlocal deleted
+        try:
+            count = await run_blocking("firestore", commit, chunk)
+            deleted += count
+            if on_progress:
+                on_progress(deleted)
+        finally:
+            semaphore.release()
+
+    tasks = []
+    for chunk in _chunks(refs, batch_size):
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(run(chunk)))
+    if tasks:
+        await asyncio.gather(*tasks)
+    return deleted
+
+
+async def delete_chat_tree(
+    db,
+    chat_ref,
+    summary_ref=None,
+    batch_size: int = DELETE_BATCH_SIZE,
+    max_parallel: int = DELETE_MAX_PARALLEL,
+    on_progress: Optional[Callable[[int], None]] = None,
+    subcollections: Iterable[str] = ('messages',),
+) -> int:
+    """Delete a chat document, all of its messages and its summary document.
+
+    Messages are listed with an empty projection so only references are fetched,
+    then removed in chunked batches. The chat and summary documents are deleted
+    last so a partially failed job can be retried from the same chat id.
+
+    Args:
+        subcollections: Child collections of the chat holding its messages
+
+    Returns:
+        Number of deleted documents
+    """
+    def list_message_refs() -> List[Any]:
+        return [
+            doc.reference
+            for name in subcollections
+            for doc in chat_ref.collection(name).select([]).stream()
+        ]
+
+    message_refs = await run_blocking("firestore", list_message_refs)
+    deleted = await delete_refs_chunked(
+        db, message_refs, batch_size=batch_size, max_parallel=max_parallel, on_progress=on_progress
+    )
+    tail = [chat_ref] + ([summary_ref] if summary_ref is not None else [])
+    deleted += await delete_refs_chunked(db, tail, batch_size=batch_size, max_parallel=1)
+    return deleted
+
+
+def _prune_jobs() -> None:
+    for job_id in [j.id for j in _jobs.values() if j.expired()]:
+        _jobs.pop(job_id, None)
+
+
+async def start_delete_job(
+    chat_id: str,
+    owner_id: str,
+    run: Callable[[DeleteJob], Awaitable[int]],
+    save: Optional[Callable[[Dict[str, Any]], Awaitable[bool]]] = None,
+) -> DeleteJob:
+    """Schedule a deletion on the running event loop and return its job record immediately.
+
+    Args:
+        chat_id: The chat being deleted
+        owner_id: Effective user id (profile_id or uid) that owns the chat
+        run: Coroutine function performing the deletion; receives the job for progress updates
+        save: Coroutine function storing ``job.to_record()`` where every worker
+            can read it, returning False on failure; called when the job is
+            created, starts and finishes
+    """
+    _prune_jobs()
+    job = DeleteJob(chat_id, owner_id)
+    _jobs[job.id] = job
+
+    async def persist() -> None:
+        # On failure the local record still answers polls that reach this worker
+        if save is not None and not await save(job.to_record()):
+            logger.error(f"Failed to save status of delete job {job.id}")
+
+    await persist()
+
+    async def runner() -> None:
+        job.status = "running"
+        await persist()
+        try:
+            job.deleted = await run(job)
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Delete job {job.id} for chat {chat_id} failed: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+            _tasks.pop(job.id, None)
+            await persist()
+
+    # Keep a strong reference so the task is not garbage collected mid-run
+    _tasks[job.id] = asyncio.create_task(runner())
+    return job
+
+
+def get_delete_job(job_id: str, owner_id: Optional[str] = None) -> Optional[DeleteJob]:
+    """Look up a deletion job started by this process, optionally restricted to the owning profile."""
+    job = _jobs.get(job_id)
+    if job is None or (owner_id is not None and job.owner_id != owner_id):
+        return None
+    return job
@@ -20,10 +20,84 @@ SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "your-supabase-jwt-secret
 FIREBASE_API_KEY = os.getenv("FIREBASE_API_KEY")
 FIREBASE_AUTH_DOMAIN = os.getenv("FIREBASE_AUTH_DOMAIN")
 FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID")
+# Verify ID tokens locally against cached Google signing keys instead of through the Admin SDK
+FIREBASE_LOCAL_TOKEN_VERIFY = os.getenv("FIREBASE_LOCAL_TOKEN_VERIFY", "true").lower() == "true"
 FIREBASE_STORAGE_BUCKET = os.getenv("FIREBASE_STORAGE_BUCKET")
 FIREBASE_MESSAGING_SENDER_ID = os.getenv("FIREBASE_MESSAGING_SENDER_ID")
 FIREBASE_APP_ID = os.getenv("FIREBASE_APP_ID")
 
+# Conversation Storage Configuration
+# "firestore" (default), "firestore_paged" or "sqlite" for a single-node local database
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "firestore")
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", os.path.join(os.path.dirname(__file__), "data", "gigabhai.db"))
+# Paged Firestore layout (MEMORY_BACKEND=firestore_paged): turns per page document and byte cap per page
+FIRESTORE_PAGE_SIZE = int(os.getenv("FIRESTORE_PAGE_SIZE", "50"))
+FIRESTORE_PAGE_MAX_BYTES = int(os.getenv("FIRESTORE_PAGE_MAX_BYTES", str(900 * 1024)))
+# Compressed-memory summary cache (Firestore backend)
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+SUMMARY_CACHE_FRESH_SECONDS = float(os.getenv("SUMMARY_CACHE_FRESH_SECONDS", "2"))
+
+# Authentication caches: decoded ID tokens (kept until their exp) and Firebase Auth user records
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60"))
+
+# Thread pools for blocking SDK calls, one per dependency (see blocking_io.py)
+BLOCKING_POOL_SIZES = {
+    "firestore": int(os.getenv("BLOCKING_POOL_FIRESTORE", "32")),
+    "auth": int(os.getenv("BLOCKING_POOL_AUTH", "8")),
+    "storage": int(os.getenv("BLOCKING_POOL_STORAGE", "8")),
+    "audio": int(os.getenv("BLOCKING_POOL_AUDIO", "4")),
+    "tts": int(os.getenv("BLOCKING_POOL_TTS", "8")),
+}
+# Calls allowed to wait for a thread before new ones are rejected (0 = unbounded)
+BLOCKING_QUEUE_LIMITS = {
+    "audio": int(os.getenv("BLOCKING_QUEUE_AUDIO", "32")),
+    "tts": int(os.getenv("BLOCKING_QUEUE_TTS", "64")),
+}
+# Process pools for CPU-bound work that the GIL would serialize (see blocking_io.ProcessPool)
+PROCESS_POOL_SIZES = {
+    "audio_decode": int(os.getenv("PROCESS_POOL_AUDIO_DECODE", str(min(4, os.cpu_count() or 1)))),
+}
+PROCESS_QUEUE_LIMITS = {
+    "audio_decode": int(os.getenv("PROCESS_QUEUE_AUDIO_DECODE", "16")),
+}
+# Minimum seconds between "pool saturated" warnings per pool
+BLOCKING_SATURATION_LOG_SECONDS = float(os.getenv("BLOCKING_SATURATION_LOG_SECONDS", "30"))
+# Bearer token for /metrics; the endpoint is disabled while it is unset
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Text-to-speech audio cache (content-addressed files, LRU-evicted above the size cap)
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(__file__), "data", "tts_cache"))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+# Format served when the client neither asks for one nor sends a specific Accept header
+TTS_DEFAULT_FORMAT = os.getenv("TTS_DEFAULT_FORMAT", "wav")
+TTS_OPUS_BITRATE = os.getenv("TTS_OPUS_BITRATE", "32k")
+# Long text is split at sentence boundaries and synthesized in parallel chunks
+TTS_MAX_TEXT_CHARS = int(os.getenv("TTS_MAX_TEXT_CHARS", "5000"))
+TTS_CHUNK_MAX_CHARS = int(os.getenv("TTS_CHUNK_MAX_CHARS", "200"))
+TTS_STREAM_CONCURRENCY = int(os.getenv("TTS_STREAM_CONCURRENCY", "3"))
+# Synthesis engines in fallback order (gtts, espeak); only the first one's output is cached
+TTS_ENGINES = [name.strip() for name in os.getenv("TTS_ENGINES", "gtts,espeak").split(",") if name.strip()]
+TTS_GTTS_TIMEOUT_SECONDS = float(os.getenv("TTS_GTTS_TIMEOUT_SECONDS", "5"))
+ESPEAK_BINARY = os.getenv("ESPEAK_BINARY", "espeak-ng")
+# Persona intros and canned replies pre-rendered into the cache at startup
+TTS_WARM_ON_STARTUP = os.getenv("TTS_WARM_ON_STARTUP", "true").lower() == "true"
+TTS_WARM_LANGUAGES = [lang.strip() for lang in os.getenv("TTS_WARM_LANGUAGES", "en,hi").split(",") if lang.strip()]
+TTS_WARM_FORMATS = [fmt.strip() for fmt in os.getenv("TTS_WARM_FORMATS", TTS_DEFAULT_FORMAT).split(",") if fmt.strip()]
+TTS_WARM_CONCURRENCY = int(os.getenv("TTS_WARM_CONCURRENCY", "2"))
+
+# Speech-to-text uploads: decoding is killed after the timeout, longer audio is rejected
+STT_DECODE_TIMEOUT_SECONDS = float(os.getenv("STT_DECODE_TIMEOUT_SECONDS", "20"))
+STT_MAX_AUDIO_SECONDS = float(os.getenv("STT_MAX_AUDIO_SECONDS", "120"))
+# Uploads past the byte cap are rejected while reading; above the spool size they are written to UPLOAD_DIR
+STT_MAX_UPLOAD_BYTES = int(os.getenv("STT_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+STT_UPLOAD_SPOOL_BYTES = int(os.getenv("STT_UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+# Recognition engines in fallback order (google, vosk); vosk needs the models from download_models.py
+STT_ENGINES = [name.strip() for name in os.getenv("STT_ENGINES", "google,vosk").split(",") if name.strip()]
+STT_VOSK_RECOGNIZERS = int(os.getenv("STT_VOSK_RECOGNIZERS", "4"))
+
 # Application Configuration
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
 MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
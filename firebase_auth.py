@@ -4,6 +4,11 @@ import os
 import logging
 from pathlib import Path
 
+from blocking_io import run_blocking
+from config import FIREBASE_PROJECT_ID, FIREBASE_LOCAL_TOKEN_VERIFY
+from metrics import register_metrics
+from token_verifier import FirebaseTokenVerifier, StaleKeysError, UnknownKeyError
+
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -67,10 +72,35 @@ def initialize_firebase():
 # Initialize Firebase when this module is imported
 initialize_firebase()
 
+def _create_token_verifier():
+    if not FIREBASE_LOCAL_TOKEN_VERIFY:
+        return None
+    project_id = FIREBASE_PROJECT_ID or firebase_admin.get_app().project_id
+    if not project_id:
+        logger.warning("No Firebase project id configured; verifying tokens with the Admin SDK")
+        return None
+    verifier = FirebaseTokenVerifier(project_id)
+    register_metrics("token_verifier", verifier.stats)
+    return verifier
+
+
+token_verifier = _create_token_verifier()
+
+
 async def verify_firebase_token(token: str) -> dict:
     try:
         logger.debug(f"Attempting to verify token: {token[:20]}...")
-        decoded_token = auth.verify_id_token(token)
+        if token_verifier is not None:
+            token_verifier.ensure_refreshing()
+            try:
+                decoded_token = token_verifier.verify(token)
+                logger.debug("Token verified successfully")
+                return decoded_token
+            except (UnknownKeyError, StaleKeysError) as e:
+                # Keys not fetched yet, just rotated or too stale to trust: let the
+                # Admin SDK decide, off the event loop
+                logger.debug(f"Falling back to the Admin SDK: {str(e)}")
+        decoded_token = await run_blocking("auth", auth.verify_id_token, token)
         logger.debug("Token verified successfully")
         return decoded_token
     except Exception as e:
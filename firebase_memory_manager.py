@@ -7,260 +7,407 @@ from typing import Dict, List, Any, Optional
 from firebase_admin import firestore, auth
 import firebase_admin
 from firebase_admin import credentials
+from blocking_io import run_blocking
+from chat_deletion import delete_chat_tree
+from metrics import register_metrics
+from summary_cache import SummaryCache
+from config import SUMMARY_CACHE_MAX_BYTES, SUMMARY_CACHE_FRESH_SECONDS
+from memory_store import CHAT_TURN_FIELDS, ChatTurn, MemoryStore, chat_turn_from_dict
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Initialize Firestore
-db = firestore.client()
-
-async def store_compressed_memory(chat_id: str, user_id: str, profile_id: str, compressed_memory: list):
-    """
-    Store compressed (summarized) chat memory for a conversation under a summary index per user.
-    """
-    try:
-        effective_user_id = profile_id or user_id
-        summary_ref = db.collection('users').document(effective_user_id).collection('summary').document(chat_id)
-        summary_ref.set({'compressed_memory': compressed_memory})
-        return True
-    except Exception as e:
-        logger.error(f"Error storing compressed memory: {str(e)}")
-        return False
-
-async def get_compressed_memory(chat_id: str, user_id: str, profile_id: str):
-    """
-    Retrieve compressed (summarized) chat memory for a conversation from the summary index per user.
-    """
-    try:
-        effective_user_id = profile_id or user_id
-        summary_ref = db.collection('users').document(effective_user_id).collection('summary').document(chat_id)
-        summary_doc = summary_ref.get()
-        if summary_doc.exists:
-            return summary_doc.to_dict().get('compressed_memory', [])
-        return []
-    except Exception as e:
-        logger.error(f"Error retrieving compressed memory: {str(e)}")
-        return []
-
-async def store_message(
-    user_id: str, 
-    profile_id: str = None, 
-    personality: str = "swag", 
-    message: str = None, 
-    response: str = None, 
-    chat_id: str = None
-) -> str:
-    """Store a message in Firestore
+class FirestoreMemoryStore(MemoryStore):
+    """Conversation storage backed by Firestore (users/{id}/chats/{chat}/messages)."""
     
-    Args:
-        user_id: The user ID from Firebase Auth
-        profile_id: The profile ID for data isolation
-        personality: The personality used for the response
-        message: The user message
-        response: The AI response
-        chat_id: The chat ID (optional, will create new if not provided)
-        
-    Returns:
-        The chat ID
-    """
-    try:
-        logger.info(f"Storing message for user_id: {user_id}, profile_id: {profile_id}")
-        
-        # Use profile_id for data isolation if available, otherwise use user_id
-        effective_user_id = profile_id or user_id
-        
-        # Create a new chat if no chat_id provided
-        if not chat_id:
-            chat_ref = db.collection('users').document(effective_user_id).collection('chats').document()
-            chat_data = {
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP,
-                'personality': personality,
-                'title': f"Chat {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-            }
-            chat_ref.set(chat_data)
-            chat_id = chat_ref.id
-        else:
-            chat_ref = db.collection('users').document(effective_user_id).collection('chats').document(chat_id)
-            chat_doc = chat_ref.get() # Attempt to get the document
-            if not chat_doc.exists:
-                # Document doesn't exist, create it
-                logger.info(f"Chat document {chat_id} not found for profile {effective_user_id}. Creating new one.")
-                chat_data = {
-                    'created_at': firestore.SERVER_TIMESTAMP,
-                    'updated_at': firestore.SERVER_TIMESTAMP,
-                    'personality': personality,  # Use current message's personality
-                    'title': f"Continuation of chat {datetime.now().strftime('%Y-%m-%d %H:%M')}" # Default title
-                }
-                chat_ref.set(chat_data) # Set will create the document if it doesn't exist
-            else:
-                # Document exists, update its timestamp
-                chat_ref.update({'updated_at': firestore.SERVER_TIMESTAMP})
-        
-        # Add the message to the chat
-        message_ref = chat_ref.collection('messages').document()
-        message_data = {
-            'user_id': user_id,
-            'profile_id': profile_id,
-            'personality': personality,
-            'message': message,
-            'response': response,
-            'timestamp': firestore.SERVER_TIMESTAMP
-        }
-        message_ref.set(message_data)
-        
-        return chat_id
-        
-    except Exception as e:
-        logger.error(f"Error storing message in Firestore: {str(e)}")
-        raise
-
-async def get_chat_history(user_id: str, profile_id: str = None, limit: int = 50) -> List[Dict[str, Any]]:
-    """Get chat history for a user from Firestore
+    # Child collections of a chat document that hold its turns
+    MESSAGE_COLLECTIONS = ('messages',)
     
-    Args:
-        user_id: The user ID from Firebase Auth
-        profile_id: The profile ID for data isolation
-        limit: Maximum number of messages to return
-        
-    Returns:
-        List of chat messages with metadata
-    """
-    try:
-        logger.info(f"Getting chat history for user_id: {user_id}, profile_id: {profile_id}")
-        
-        # Use profile_id for data isolation if available
-        effective_user_id = profile_id or user_id
-        
-        # Get all chats for the user, ordered by most recent
-        chats_ref = db.collection('users').document(effective_user_id).collection('chats')
-        chats = chats_ref.order_by('updated_at', direction='DESCENDING').stream()
+    def __init__(self, db=None, summary_cache: Optional[SummaryCache] = None):
+        """
+        Args:
+            db: Firestore client; defaults to firestore.client() on first use
+            summary_cache: Cache for summary documents; defaults to one sized from config
+        """
+        self._db = db
+        self.summary_cache = summary_cache or SummaryCache(
+            max_bytes=SUMMARY_CACHE_MAX_BYTES,
+            fresh_seconds=SUMMARY_CACHE_FRESH_SECONDS
+        )
+        register_metrics("summary_cache", self.summary_cache.stats)
+    
+    @property
+    def db(self):
+        # Initialize Firestore lazily so importing this module needs no Firebase app
+        if self._db is None:
+            self._db = firestore.client()
+        return self._db
+    
+    async def _run(self, fn, *args):
+        # Firestore calls block on network I/O; run them on the dedicated pool
+        return await run_blocking("firestore", fn, *args)
+    
+    async def store_compressed_memory(self, chat_id: str, user_id: str, profile_id: str, compressed_memory: list):
+        """
+        Store compressed (summarized) chat memory for a conversation under a summary index per user.
         
-        result = []
-        for chat in chats:
-            chat_data = chat.to_dict()
-            chat_data['id'] = chat.id
-            
-            # Get the most recent message for each chat
-            messages_ref = chat.reference.collection('messages')
-            messages = messages_ref.order_by('timestamp', direction='DESCENDING').limit(1).stream()
+        The summary document carries a version that is incremented transactionally
+        on every write, so cached copies in other workers can detect staleness.
+        """
+        try:
+            effective_user_id = profile_id or user_id
+            summary_ref = self.db.collection('users').document(effective_user_id).collection('summary').document(chat_id)
             
-            for message in messages:
-                message_data = message.to_dict()
-                chat_data['last_message'] = message_data.get('message', '')
-                chat_data['last_message_time'] = message_data.get('timestamp')
-                break
-                
-            result.append(chat_data)
+            @firestore.transactional
+            def write_summary(transaction) -> int:
+                snapshot = summary_ref.get(field_paths=['version'], transaction=transaction)
+                version = ((snapshot.to_dict() or {}).get('version') or 0) + 1 if snapshot.exists else 1
+                transaction.set(summary_ref, {'compressed_memory': compressed_memory, 'version': version})
+                return version
             
-            # Apply limit
-            if len(result) >= limit:
-                break
-                
-        return result
-        
-    except Exception as e:
-        logger.error(f"Error getting chat history from Firestore: {str(e)}")
-        raise
+            version = await self._run(write_summary, self.db.transaction())
+            self.summary_cache.put((effective_user_id, chat_id), version, compressed_memory)
+            return True
+        except Exception as e:
+            logger.error(f"Error storing compressed memory: {str(e)}")
+            return False
 
-async def get_chat_messages(chat_id: str, user_id: str, profile_id: str = None, limit: int = 100) -> List[Dict[str, Any]]:
-    """Get messages for a specific chat
-    
-    Args:
-        chat_id: The chat ID
-        user_id: The user ID from Firebase Auth
-        profile_id: The profile ID for data isolation
-        limit: Maximum number of messages to return
-        
-    Returns:
-        List of messages in the chat
-    """
-    try:
-        effective_user_id = profile_id or user_id
-        messages_ref = (
-            db.collection('users')
-            .document(effective_user_id)
-            .collection('chats')
-            .document(chat_id)
-            .collection('messages')
-            .order_by('timestamp', direction='DESCENDING')
-            .limit(limit)
-        )
-        
-        messages = messages_ref.get()
-        return [{
-            'id': msg.id,
-            **msg.to_dict(),
-            'timestamp': msg.to_dict().get('timestamp').isoformat() if msg.to_dict().get('timestamp') else None
-        } for msg in messages]
+    async def get_compressed_memory(self, chat_id: str, user_id: str, profile_id: str):
+        """
+        Retrieve compressed (summarized) chat memory for a conversation from the summary index per user.
         
-    except Exception as e:
-        logger.error(f"Error getting chat messages from Firestore: {str(e)}")
-        raise
+        Served from the summary cache when the cached version is fresh or still
+        matches the version stored in Firestore.
+        """
+        try:
+            effective_user_id = profile_id or user_id
+            key = (effective_user_id, chat_id)
+            summary_ref = self.db.collection('users').document(effective_user_id).collection('summary').document(chat_id)
+            
+            cached_version, cached_value, fresh = self.summary_cache.lookup(key)
+            if cached_version is not None:
+                if fresh:
+                    self.summary_cache.record("hit")
+                    return list(cached_value)
+                # Staleness check: fetch only the version field (smaller, but billed as a document read)
+                version_doc = await self._run(lambda: summary_ref.get(field_paths=['version']))
+                current_version = (version_doc.to_dict() or {}).get('version', 0) if version_doc.exists else 0
+                if current_version == cached_version:
+                    self.summary_cache.mark_fresh(key)
+                    self.summary_cache.record("revalidated")
+                    return list(cached_value)
+                if current_version < cached_version:
+                    # Summary deleted and recreated elsewhere: its versions started over
+                    self.summary_cache.invalidate(key)
+                self.summary_cache.record("stale")
+            else:
+                self.summary_cache.record("miss")
+            
+            summary_doc = await self._run(summary_ref.get)
+            if summary_doc.exists:
+                data = summary_doc.to_dict()
+                compressed_memory = data.get('compressed_memory', [])
+                self.summary_cache.put(key, data.get('version', 0), compressed_memory)
+                return list(compressed_memory)
+            self.summary_cache.put(key, 0, [])
+            return []
+        except Exception as e:
+            logger.error(f"Error retrieving compressed memory: {str(e)}")
+            return []
 
-async def update_chat_title(chat_id: str, user_id: str, title: str, profile_id: str = None) -> bool:
-    """Update the title of a chat
-    
-    Args:
-        chat_id: The chat ID
-        user_id: The user ID from Firebase Auth
-        title: The new title
-        profile_id: The profile ID for data isolation
-        
-    Returns:
-        bool: True if successful
-    """
-    try:
+    async def store_message(
+        self,
+        user_id: str, 
+        profile_id: str = None, 
+        personality: str = "swag", 
+        message: str = None, 
+        response: str = None, 
+        chat_id: str = None
+    ) -> str:
+        """Store a message in Firestore
+
+        Args:
+            user_id: The user ID from Firebase Auth
+            profile_id: The profile ID for data isolation
+            personality: The personality used for the response
+            message: The user message
+            response: The AI response
+            chat_id: The chat ID (optional, will create new if not provided)
+
+        Returns:
+            The chat ID
+        """
+        try:
+            logger.info(f"Storing message for user_id: {user_id}, profile_id: {profile_id}")
+
+            def write() -> str:
+                nonlocal chat_id
+                # Use profile_id for data isolation if available, otherwise use user_id
+                effective_user_id = profile_id or user_id
+
+                # Create a new chat if no chat_id provided
+                if not chat_id:
+                    chat_ref = self.db.collection('users').document(effective_user_id).collection('chats').document()
+                    chat_data = {
+                        'created_at': firestore.SERVER_TIMESTAMP,
+                        'updated_at': firestore.SERVER_TIMESTAMP,
+                        'personality': personality,
+                        'title': f"Chat {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+                    }
+                    chat_ref.set(chat_data)
+                    chat_id = chat_ref.id
+                else:
+                    chat_ref = self.db.collection('users').document(effective_user_id).collection('chats').document(chat_id)
+                    chat_doc = chat_ref.get() # Attempt to get the document
+                    if not chat_doc.exists:
+                        # Document doesn't exist, create it
+                        logger.info(f"Chat document {chat_id} not found for profile {effective_user_id}. Creating new one.")
+                        chat_data = {
+                            'created_at': firestore.SERVER_TIMESTAMP,
+                            'updated_at': firestore.SERVER_TIMESTAMP,
+                            'personality': personality,  # Use current message's personality
+                            'title': f"Continuation of chat {datetime.now().strftime('%Y-%m-%d %H:%M')}" # Default title
+                        }
+                        chat_ref.set(chat_data) # Set will create the document if it doesn't exist
+                    else:
+                        # Document exists, update its timestamp
+                        chat_ref.update({'updated_at': firestore.SERVER_TIMESTAMP})
+
+                # Add the message to the chat
+                message_ref = chat_ref.collection('messages').document()
+                message_data = {
+                    'user_id': user_id,
+                    'profile_id': profile_id,
+                    'personality': personality,
+                    'message': message,
+                    'response': response,
+                    'timestamp': firestore.SERVER_TIMESTAMP
+                }
+                message_ref.set(message_data)
+                return chat_id
+
+            return await self._run(write)
+
+        except Exception as e:
+            logger.error(f"Error storing message in Firestore: {str(e)}")
+            raise
+
+    async def get_chat_history(self, user_id: str, profile_id: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get chat history for a user from Firestore
+
+        Args:
+            user_id: The user ID from Firebase Auth
+            profile_id: The profile ID for data isolation
+            limit: Maximum number of messages to return
+
+        Returns:
+            List of chat messages with metadata
+        """
+        try:
+            logger.info(f"Getting chat history for user_id: {user_id}, profile_id: {profile_id}")
+
+            # Use profile_id for data isolation if available
+            effective_user_id = profile_id or user_id
+
+            # Get all chats for the user, ordered by most recent
+            chats_ref = self.db.collection('users').document(effective_user_id).collection('chats')
+
+            def read() -> List[Dict[str, Any]]:
+                chats = chats_ref.order_by('updated_at', direction='DESCENDING').stream()
+
+                result = []
+                for chat in chats:
+                    chat_data = chat.to_dict()
+                    chat_data['id'] = chat.id
+
+                    # Get the most recent message for each chat
+                    messages_ref = chat.reference.collection('messages')
+                    messages = messages_ref.order_by('timestamp', direction='DESCENDING').limit(1).stream()
+
+                    for message in messages:
+                        message_data = message.to_dict()
+                        chat_data['last_message'] = message_data.get('message', '')
+                        chat_data['last_message_time'] = message_data.get('timestamp')
+                        break
+
+                    result.append(chat_data)
+
+                    # Apply limit
+                    if len(result) >= limit:
+                        break
+
+                return result
+
+            return await self._run(read)
+
+        except Exception as e:
+            logger.error(f"Error getting chat history from Firestore: {str(e)}")
+            raise
+
+    async def get_chat_messages(self, chat_id: str, user_id: str, profile_id: str = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get messages for a specific chat
+
+        Args:
+            chat_id: The chat ID
+            user_id: The user ID from Firebase Auth
+            profile_id: The profile ID for data isolation
+            limit: Maximum number of messages to return
+
+        Returns:
+            List of messages in the chat
+        """
+        try:
+            effective_user_id = profile_id or user_id
+            messages_ref = (
+                self.db.collection('users')
+                .document(effective_user_id)
+                .collection('chats')
+                .document(chat_id)
+                .collection('messages')
+                .order_by('timestamp', direction='DESCENDING')
+                .limit(limit)
+            )
+
+            def read() -> List[Dict[str, Any]]:
+                result = []
+                for msg in messages_ref.stream():
+                    # Decode each snapshot once; to_dict() deep-copies the document
+                    data = msg.to_dict()
+                    timestamp = data.get('timestamp')
+                    data['id'] = msg.id
+                    # The profile the chat lives under, even for turns stored without one
+                    data['profile_id'] = data.get('profile_id') or effective_user_id
+                    data['timestamp'] = timestamp.isoformat() if timestamp else None
+                    result.append(data)
+                return result
+
+            return await self._run(read)
+
+        except Exception as e:
+            logger.error(f"Error getting chat messages from Firestore: {str(e)}")
+            raise
+
+    async def get_recent_turns(self, chat_id: str, user_id: str, profile_id: str = None, limit: int = 100) -> List[ChatTurn]:
+        """Get the newest turns of a chat for building LLM context
+
+        Only message, response and timestamp are fetched (field projection),
+        and each document is decoded once into a compact ChatTurn.
+
+        Args:
+            chat_id: The chat ID
+            user_id: The user ID from Firebase Auth
+            profile_id: The profile ID for data isolation
+            limit: Maximum number of turns to return
+
+        Returns:
+            List of ChatTurn records, newest first
+        """
+        try:
+            effective_user_id = profile_id or user_id
+            messages_ref = (
+                self.db.collection('users')
+                .document(effective_user_id)
+                .collection('chats')
+                .document(chat_id)
+                .collection('messages')
+                .select(CHAT_TURN_FIELDS)
+                .order_by('timestamp', direction='DESCENDING')
+                .limit(limit)
+            )
+            return await self._run(lambda: [chat_turn_from_dict(msg.id, msg.to_dict()) for msg in messages_ref.stream()])
+
+        except Exception as e:
+            logger.error(f"Error getting chat turns from Firestore: {str(e)}")
+            raise
+
+    async def chat_exists(self, chat_id: str, user_id: str, profile_id: str = None) -> bool:
+        """Whether the chat document exists, read with an empty projection"""
         effective_user_id = profile_id or user_id
-        (
-            db.collection('users')
-            .document(effective_user_id)
-            .collection('chats')
-            .document(chat_id)
-            .update({
+        chat_ref = self.db.collection('users').document(effective_user_id).collection('chats').document(chat_id)
+        chat_doc = await self._run(lambda: chat_ref.get(field_paths=[]))
+        return chat_doc.exists
+
+    async def update_chat_title(self, chat_id: str, user_id: str, title: str, profile_id: str = None) -> bool:
+        """Update the title of a chat
+
+        Args:
+            chat_id: The chat ID
+            user_id: The user ID from Firebase Auth
+            title: The new title
+            profile_id: The profile ID for data isolation
+
+        Returns:
+            bool: True if successful
+        """
+        try:
+            effective_user_id = profile_id or user_id
+            chat_ref = (
+                self.db.collection('users')
+                .document(effective_user_id)
+                .collection('chats')
+                .document(chat_id)
+            )
+            await self._run(chat_ref.update, {
                 'title': title,
                 'updated_at': firestore.SERVER_TIMESTAMP
             })
-        )
-        return True
-    except Exception as e:
-        logger.error(f"Error updating chat title in Firestore: {str(e)}")
-        return False
+            return True
+        except Exception as e:
+            logger.error(f"Error updating chat title in Firestore: {str(e)}")
+            return False
 
-async def delete_chat(chat_id: str, user_id: str, profile_id: str = None) -> bool:
-    """Delete a chat and all its messages
-    
-    Args:
-        chat_id: The chat ID
-        user_id: The user ID from Firebase Auth
-        profile_id: The profile ID for data isolation
-        
-    Returns:
-        bool: True if successful
-    """
-    try:
-        effective_user_id = profile_id or user_id
-        chat_ref = (
-            db.collection('users')
-            .document(effective_user_id)
-            .collection('chats')
-            .document(chat_id)
-        )
-        
-        # Delete all messages in the chat first
-        messages_ref = chat_ref.collection('messages')
-        messages = messages_ref.stream()
-        
-        batch = db.batch()
-        for message in messages:
-            batch.delete(message.reference)
-        
-        # Delete the chat document
-        batch.delete(chat_ref)
-        batch.commit()
-        
-        return True
-    except Exception as e:
-        logger.error(f"Error deleting chat from Firestore: {str(e)}")
-        return False
+    async def delete_chat(self, chat_id: str, user_id: str, profile_id: str = None, on_progress=None) -> bool:
+        """Delete a chat, all its messages and its compressed memory summary
+
+        Messages are removed in chunked batches (below Firestore's 500-write limit)
+        with bounded parallelism, so large chats no longer fail in a single batch.
+
+        Args:
+            chat_id: The chat ID
+            user_id: The user ID from Firebase Auth
+            profile_id: The profile ID for data isolation
+            on_progress: Optional callback receiving the running count of deleted documents
+
+        Returns:
+            bool: True if successful
+        """
+        try:
+            effective_user_id = profile_id or user_id
+            user_ref = self.db.collection('users').document(effective_user_id)
+            chat_ref = user_ref.collection('chats').document(chat_id)
+            summary_ref = user_ref.collection('summary').document(chat_id)
+
+            deleted = await delete_chat_tree(
+                self.db, chat_ref, summary_ref,
+                on_progress=on_progress,
+                subcollections=self.MESSAGE_COLLECTIONS
+            )
+            if on_progress:
+                # Include the chat and summary documents deleted last
+                on_progress(deleted)
+            self.summary_cache.invalidate((effective_user_id, chat_id))
+            logger.info(f"Deleted chat {chat_id} for profile {effective_user_id} ({deleted} documents)")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting chat from Firestore: {str(e)}")
+            return False
+
+    async def save_delete_job(self, record: Dict[str, Any]) -> bool:
+        """Store a deletion job's status in delete_jobs/{job_id}, readable by every worker"""
+        try:
+            job_ref = self.db.collection('delete_jobs').document(record['job_id'])
+            await self._run(job_ref.set, record)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving delete job to Firestore: {str(e)}")
+            return False
+
+    async def load_delete_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a deletion job's status from delete_jobs/{job_id}, or None"""
+        try:
+            job_doc = await self._run(self.db.collection('delete_jobs').document(job_id).get)
+            return job_doc.to_dict() if job_doc.exists else None
+        except Exception as e:
+            logger.error(f"Error loading delete job from Firestore: {str(e)}")
+            return None
@@ -0,0 +1,419 @@
+import asyncio
+import json
+import logging
+import math
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists
+
+from blocking_io import run_blocking
+from chat_deletion import delete_refs_chunked
+from config import FIRESTORE_PAGE_SIZE, FIRESTORE_PAGE_MAX_BYTES
+from firebase_memory_manager import FirestoreMemoryStore
+from memory_store import ChatTurn, chat_turn_from_dict
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+LAYOUT_PAGED = 'paged'
+
+# Bookkeeping fields kept on the chat document, hidden from API responses
+_PAGE_INDEX_FIELDS = ('layout', 'page_count', 'last_page_turns', 'last_page_bytes', 'turn_count')
+
+# Firestore commits are capped at 500 writes and 10 MiB; stay well under both
+BATCH_MAX_WRITES = 450
+BATCH_MAX_BYTES = 8 * 1024 * 1024
+
+# A migration claim older than this is assumed to belong to a dead worker
+MIGRATION_LEASE_SECONDS = 120
+# How often writers waiting on another worker's migration re-check the chat
+MIGRATION_POLL_SECONDS = 0.2
+
+
+def _turn_size(turn: Dict[str, Any]) -> int:
+    return len(json.dumps(turn, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+def page_ref(chat_ref, index: int):
+    """Reference to page ``index`` of a chat; zero-padded so ids sort by index."""
+    return chat_ref.collection('pages').document(f"{index:06d}")
+
+
+def build_pages(turns: List[Dict[str, Any]], page_size: int, page_max_bytes: int) -> List[List[Dict[str, Any]]]:
+    """Split turns (oldest first) into pages of at most page_size turns and page_max_bytes."""
+    pages: List[List[Dict[str, Any]]] = []
+    page_bytes = 0
+    for turn in turns:
+        size = _turn_size(turn)
+        if not pages or len(pages[-1]) >= page_size or page_bytes + size > page_max_bytes:
+            pages.append([])
+            page_bytes = 0
+        pages[-1].append(turn)
+        page_bytes += size
+    return pages
+
+
+def _legacy_turn(msg) -> Dict[str, Any]:
+    data = msg.to_dict()
+    return {
+        'id': msg.id,
+        'user_id': data.get('user_id'),
+        'profile_id': data.get('profile_id'),
+        'personality': data.get('personality'),
+        'message': data.get('message'),
+        'response': data.get('response'),
+        'timestamp': data.get('timestamp'),
+    }
+
+
+def _page_fields(index: int, page_turns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        'index': index,
+        'turns': page_turns,
+        'count': len(page_turns),
+        'bytes': sum(_turn_size(t) for t in page_turns),
+    }
+
+
+async def migrate_chat(
+    db,
+    chat_ref,
+    page_size: int = FIRESTORE_PAGE_SIZE,
+    page_max_bytes: int = FIRESTORE_PAGE_MAX_BYTES,
+    delete_legacy: bool = False
+) -> int:
+    """Convert one chat from per-message documents to paged storage.
+
+    The migrating worker first claims the chat in a transaction, so
+    concurrent writers wait for it instead of converting the same chat
+    twice; a claim older than MIGRATION_LEASE_SECONDS is taken to belong
+    to a dead worker and is taken over. Pages are created (never
+    overwritten) and the chat document is flipped to the paged layout last,
+    in a transaction that also packs any messages written since the pages
+    were built, so readers keep using the legacy messages until the page
+    index is complete and no legacy write is dropped. Running it again on a
+    migrated chat is a no-op.
+
+    Args:
+        db: Firestore client
+        chat_ref: Reference to the chat document
+        page_size: Maximum turns per page
+        page_max_bytes: Maximum serialized turn bytes per page (Firestore documents are capped at 1 MiB)
+        delete_legacy: Also delete the per-message documents once migrated
+
+    Returns:
+        Number of migrated turns (0 if the chat was already paged, or was
+        migrated by another worker)
+    """
+    token = uuid.uuid4().hex
+    messages_ref = chat_ref.collection('messages')
+    pages_ref = chat_ref.collection('pages')
+
+    @firestore.transactional
+    def claim(transaction) -> Optional[bool]:
+        # None: already paged; False: another worker is migrating it; True: ours
+        snapshot = chat_ref.get(transaction=transaction)
+        chat_data = snapshot.to_dict() if snapshot.exists else {}
+        if chat_data.get('layout') == LAYOUT_PAGED:
+            return None
+        now = datetime.now(timezone.utc)
+        started = (chat_data.get('migration') or {}).get('started')
+        if started and (now - started).total_seconds() < MIGRATION_LEASE_SECONDS:
+            return False
+        transaction.set(chat_ref, {'migration': {'id': token, 'started': now}}, merge=True)
+        return True
+
+    def convert():
+        # Pages left by a worker whose claim expired are not visible yet
+        leftovers = [page.reference for page in pages_ref.select([]).stream()]
+        for start in range(0, len(leftovers), BATCH_MAX_WRITES):
+            batch = db.batch()
+            for reference in leftovers[start:start + BATCH_MAX_WRITES]:
+                batch.delete(reference)
+            batch.commit()
+
+        messages = list(messages_ref.order_by('timestamp').stream())
+        turns = [_legacy_turn(msg) for msg in messages]
+        pages = build_pages(turns, page_size, page_max_bytes)
+
+        # Pages can be close to 1 MiB each, so batches are flushed by size as well as count
+        batch, batch_bytes = db.batch(), 0
+        for index, page_turns in enumerate(pages):
+            fields = _page_fields(index, page_turns)
+            if len(batch) and (len(batch) >= BATCH_MAX_WRITES or batch_bytes + fields['bytes'] > BATCH_MAX_BYTES):
+                batch.commit()
+                batch, batch_bytes = db.batch(), 0
+            batch.create(page_ref(chat_ref, index), fields)
+            batch_bytes += fields['bytes']
+        if len(batch):
+            batch.commit()
+
+        @firestore.transactional
+        def flip(transaction):
+            snapshot = chat_ref.get(transaction=transaction)
+            if ((snapshot.to_dict() or {}).get('migration') or {}).get('id') != token:
+                return None  # Claim was taken over
+
+            # Messages written by legacy writers since the snapshot above
+            known = {turn['id'] for turn in turns}
+            tail_query = messages_ref.order_by('timestamp')
+            if turns and turns[-1]['timestamp'] is not None:
+                tail_query = tail_query.start_at({'timestamp': turns[-1]['timestamp']})
+            tail = [msg for msg in tail_query.stream(transaction=transaction) if msg.id not in known]
+            final_pages = list(pages)
+            if tail:
+                first = max(len(pages) - 1, 0)
+                rebuilt = build_pages((pages[first] if pages else []) + [_legacy_turn(msg) for msg in tail],
+                                      page_size, page_max_bytes)
+                final_pages[first:] = rebuilt
+                for index in range(first, len(final_pages)):
+                    fields = _page_fields(index, final_pages[index])
+                    if index < len(pages):
+                        transaction.update(page_ref(chat_ref, index), fields)
+                    else:
+                        transaction.create(page_ref(chat_ref, index), fields)
+
+            final_turns = [turn for page_turns in final_pages for turn in page_turns]
+            index_fields = {
+                'layout': LAYOUT_PAGED,
+                'migration': firestore.DELETE_FIELD,
+                'page_count': len(final_pages),
+                'last_page_turns': len(final_pages[-1]) if final_pages else 0,
+                'last_page_bytes': sum(_turn_size(t) for t in final_pages[-1]) if final_pages else 0,
+                'turn_count': len(final_turns),
+            }
+            if final_turns:
+                index_fields['last_message'] = final_turns[-1]['message'] or ''
+                index_fields['last_message_time'] = final_turns[-1]['timestamp']
+            transaction.update(chat_ref, index_fields)
+            return [msg.reference for msg in messages + tail], len(final_turns), len(final_pages)
+
+        return flip(db.transaction())
+
+    while True:
+        claimed = await run_blocking("firestore", claim, db.transaction())
+        if claimed is None:
+            return 0
+        if not claimed:
+            await asyncio.sleep(MIGRATION_POLL_SECONDS)
+            continue
+        try:
+            converted = await run_blocking("firestore", convert)
+        except AlreadyExists:
+            # A worker that took over our expired claim created the pages first
+            converted = None
+        if converted is None:
+            await asyncio.sleep(MIGRATION_POLL_SECONDS)
+            continue
+        break
+    message_refs, turn_count, page_count = converted
+
+    if delete_legacy and message_refs:
+        await delete_refs_chunked(db, message_refs)
+    logger.info(f"Migrated chat {chat_ref.id}: {turn_count} turns into {page_count} pages")
+    return turn_count
+
+
+class PagedFirestoreMemoryStore(FirestoreMemoryStore):
+    """Firestore storage that packs many turns into each document.
+
+    Turns are appended to users/{id}/chats/{chat}/pages/{index} documents
+    holding up to ``page_size`` turns each, and the chat document keeps the
+    page index (page_count, last page fill) plus the last message. Reading
+    the recent context is a single query over the newest pages instead of one
+    document read per message. Appends run in a transaction on the chat
+    document, so concurrent writers never lose turns or overfill a page.
+
+    Chats still in the per-message layout are read as before and migrated
+    on their next write.
+    """
+
+    MESSAGE_COLLECTIONS = ('messages', 'pages')
+
+    def __init__(self, db=None, summary_cache=None, page_size: int = None, page_max_bytes: int = None):
+        super().__init__(db=db, summary_cache=summary_cache)
+        self.page_size = page_size or FIRESTORE_PAGE_SIZE
+        self.page_max_bytes = page_max_bytes or FIRESTORE_PAGE_MAX_BYTES
+
+    def _chats(self, effective_user_id: str):
+        return self.db.collection('users').document(effective_user_id).collection('chats')
+
+    async def store_message(
+        self,
+        user_id: str,
+        profile_id: str = None,
+        personality: str = "swag",
+        message: str = None,
+        response: str = None,
+        chat_id: str = None
+    ) -> str:
+        """Append a turn to the chat's newest page, creating the chat or a new page as needed."""
+        try:
+            effective_user_id = profile_id or user_id
+            chat_ref = self._chats(effective_user_id).document(chat_id) if chat_id else self._chats(effective_user_id).document()
+            # Array elements cannot hold SERVER_TIMESTAMP, so turns carry a client timestamp
+            turn = {
+                'id': uuid.uuid4().hex[:20],
+                'user_id': user_id,
+                'profile_id': profile_id,
+                'personality': personality,
+                'message': message,
+                'response': response,
+                'timestamp': datetime.now(timezone.utc),
+            }
+            size = _turn_size(turn)
+
+            @firestore.transactional
+            def append(transaction) -> bool:
+                snapshot = chat_ref.get(transaction=transaction)
+                chat_data = snapshot.to_dict() if snapshot.exists else None
+                if chat_data is not None and chat_data.get('layout') != LAYOUT_PAGED:
+                    return False
+
+                page_count = (chat_data or {}).get('page_count', 0)
+                last_turns = (chat_data or {}).get('last_page_turns', 0)
+                last_bytes = (chat_data or {}).get('last_page_bytes', 0)
+                if page_count == 0 or last_turns >= self.page_size or last_bytes + size > self.page_max_bytes:
+                    transaction.set(page_ref(chat_ref, page_count), {
+                        'index': page_count,
+                        'turns': [turn],
+                        'count': 1,
+                        'bytes': size,
+                    })
+                    page_count, last_turns, last_bytes = page_count + 1, 1, size
+                else:
+                    transaction.update(page_ref(chat_ref, page_count - 1), {
+                        'turns': firestore.ArrayUnion([turn]),
+                        'count': firestore.Increment(1),
+                        'bytes': firestore.Increment(size),
+                    })
+                    last_turns, last_bytes = last_turns + 1, last_bytes + size
+
+                updates = {
+                    'updated_at': firestore.SERVER_TIMESTAMP,
+                    'page_count': page_count,
+                    'last_page_turns': last_turns,
+                    'last_page_bytes': last_bytes,
+                    'last_message': message or '',
+                    'last_message_time': turn['timestamp'],
+                }
+                if chat_data is None:
+                    title = f"Continuation of chat {datetime.now().strftime('%Y-%m-%d %H:%M')}" if chat_id else f"Chat {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+                    transaction.set(chat_ref, {
+                        'created_at': firestore.SERVER_TIMESTAMP,
+                        'personality': personality,
+                        'title': title,
+                        'layout': LAYOUT_PAGED,
+                        'turn_count': 1,
+                        **updates,
+                    })
+                else:
+                    transaction.update(chat_ref, {**updates, 'turn_count': firestore.Increment(1)})
+                return True
+
+            while not await self._run(append, self.db.transaction()):
+                # Chat still uses per-message documents: migrate it (or wait for
+                # the worker already migrating it), then append
+                await migrate_chat(self.db, chat_ref, self.page_size, self.page_max_bytes)
+            return chat_ref.id
+
+        except Exception as e:
+            logger.error(f"Error storing message in Firestore: {str(e)}")
+            raise
+
+    def _recent_turns(self, chat_ref, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Newest ``limit`` turns, newest first, or None if the chat has no pages."""
+        pages_ref = chat_ref.collection('pages')
+        # Enough full pages for ``limit`` turns
+        expected = math.ceil(limit / self.page_size)
+        pages = [page.to_dict() for page in pages_ref.order_by('index', direction='DESCENDING').limit(expected).stream()]
+        if not pages:
+            return None
+
+        turns: List[Dict[str, Any]] = []
+        for page in pages:
+            turns.extend(reversed(page.get('turns', [])))
+        oldest = pages[-1].get('index', 0)
+        if len(turns) < limit and oldest > 0 and pages[0].get('count', 0) < self.page_size:
+            # The newest page is partial, so one more page completes the window
+            extra = page_ref(chat_ref, oldest - 1).get()
+            if extra.exists:
+                turns.extend(reversed(extra.to_dict().get('turns', [])))
+                oldest -= 1
+        if len(turns) < limit and oldest > 0:
+            # Pages closed early by the byte cap; read further back
+            turns = []
+            for page in pages_ref.order_by('index', direction='DESCENDING').stream():
+                turns.extend(reversed(page.to_dict().get('turns', [])))
+                if len(turns) >= limit:
+                    break
+        return turns[:limit]
+
+    async def get_chat_messages(self, chat_id: str, user_id: str, profile_id: str = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the newest messages of a chat, newest first, from its pages."""
+        try:
+            effective_user_id = profile_id or user_id
+            turns = await self._run(self._recent_turns, self._chats(effective_user_id).document(chat_id), limit)
+            if turns is None:
+                return await super().get_chat_messages(chat_id, user_id, profile_id, limit)
+            result = []
+            for turn in turns:
+                timestamp = turn.get('timestamp')
+                result.append({
+                    **turn,
+                    'profile_id': turn.get('profile_id') or effective_user_id,
+                    'timestamp': timestamp.isoformat() if timestamp else None,
+                })
+            return result
+
+        except Exception as e:
+            logger.error(f"Error getting chat messages from Firestore: {str(e)}")
+            raise
+
+    async def get_recent_turns(self, chat_id: str, user_id: str, profile_id: str = None, limit: int = 100) -> List[ChatTurn]:
+        """Get the newest turns of a chat for building LLM context, from its pages."""
+        try:
+            effective_user_id = profile_id or user_id
+            turns = await self._run(self._recent_turns, self._chats(effective_user_id).document(chat_id), limit)
+            if turns is None:
+                return await super().get_recent_turns(chat_id, user_id, profile_id, limit)
+            return [chat_turn_from_dict(turn['id'], turn) for turn in turns]
+
+        except Exception as e:
+            logger.error(f"Error getting chat turns from Firestore: {str(e)}")
+            raise
+
+    async def get_chat_history(self, user_id: str, profile_id: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """List chats, most recently updated first; paged chats carry their last message inline."""
+        try:
+            effective_user_id = profile_id or user_id
+            chats_ref = self._chats(effective_user_id).order_by('updated_at', direction='DESCENDING').limit(limit)
+
+            def read() -> List[Dict[str, Any]]:
+                result = []
+                for chat in chats_ref.stream():
+                    chat_data = chat.to_dict()
+                    chat_data['id'] = chat.id
+                    chat_data.pop('migration', None)
+                    if chat_data.get('layout') == LAYOUT_PAGED:
+                        for field in _PAGE_INDEX_FIELDS:
+                            chat_data.pop(field, None)
+                    else:
+                        # Chat not migrated yet: look up its newest message document
+                        messages = chat.reference.collection('messages').order_by('timestamp', direction='DESCENDING').limit(1).stream()
+                        for msg in messages:
+                            message_data = msg.to_dict()
+                            chat_data['last_message'] = message_data.get('message', '')
+                            chat_data['last_message_time'] = message_data.get('timestamp')
+                            break
+                    result.append(chat_data)
+                return result
+
+            return await self._run(read)
+
+        except Exception as e:
+            logger.error(f"Error getting chat history from Firestore: {str(e)}")
+            raise
@@ -7,6 +7,7 @@ from firebase_admin import storage, firestore
 import firebase_admin
 from firebase_admin import credentials
 from config import FIREBASE_STORAGE_BUCKET
+from blocking_io import run_blocking
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -91,13 +92,16 @@ async def upload_meme(
         
         # Upload the file to Firebase Storage
         blob = bucket.blob(storage_path)
-        blob.upload_from_string(
-            file_data,
-            content_type=content_type
-        )
         
-        # Make the blob publicly accessible
-        blob.make_public()
+        def upload() -> None:
+            blob.upload_from_string(
+                file_data,
+                content_type=content_type
+            )
+            # Make the blob publicly accessible
+            blob.make_public()
+        
+        await run_blocking("storage", upload)
         
         # Store metadata in Firestore
         meme_data = {
@@ -115,7 +119,7 @@ async def upload_meme(
         
         # Add to Firestore
         meme_ref = db.collection('memes').document()
-        await meme_ref.set(meme_data)
+        await run_blocking("firestore", meme_ref.set, meme_data)
         
         return {
             'id': meme_ref.id,
@@ -130,9 +134,10 @@ async def upload_meme(
     except Exception as e:
         logger.error(f"Error uploading meme: {str(e)}")
         # Try to clean up if there was an error after blob was created
-        if 'blob' in locals() and blob.exists():
+        if 'blob' in locals():
             try:
-                blob.delete()
+                if await run_blocking("storage", blob.exists):
+                    await run_blocking("storage", blob.delete)
             except Exception as delete_error:
                 logger.error(f"Error cleaning up blob after failed upload: {str(delete_error)}")
         raise
@@ -171,7 +176,7 @@ async def get_memes(
         query = query.order_by('uploaded_at', direction='DESCENDING').limit(limit)
         
         # Execute the query
-        results = await query.get()
+        results = await run_blocking("firestore", query.get)
         
         # Process results
         memes = []
@@ -208,7 +213,7 @@ async def delete_meme(
     try:
         # Get the meme document
         meme_ref = db.collection('memes').document(meme_id)
-        meme_doc = await meme_ref.get()
+        meme_doc = await run_blocking("firestore", meme_ref.get)
         
         if not meme_doc.exists:
             logger.warning(f"Meme {meme_id} not found")
@@ -228,12 +233,12 @@ async def delete_meme(
         # Delete from Storage
         if 'storage_path' in meme_data:
             blob = bucket.blob(meme_data['storage_path'])
-            if blob.exists():
-                blob.delete()
+            if await run_blocking("storage", blob.exists):
+                await run_blocking("storage", blob.delete)
                 logger.info(f"Deleted blob {meme_data['storage_path']}")
         
         # Delete from Firestore
-        await meme_ref.delete()
+        await run_blocking("firestore", meme_ref.delete)
         logger.info(f"Deleted meme document {meme_id}")
         
         return True
@@ -1,15 +1,18 @@
 import httpx
 import asyncio
+import json
 import time
 import logging
+from typing import AsyncIterator, Optional
 from config import GROQ_API_KEY, GROQ_API_URL
 
-async def get_groq_response(messages: list):
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
+
+class GroqStreamError(RuntimeError):
+    """A streamed Groq completion failed before producing any reply text."""
+
+
+def _build_payload(messages: list) -> dict:
+    """Groq chat-completions payload for a role/content message list."""
     # Prepare the final messages list
     final_messages = []
     
@@ -34,7 +37,7 @@ async def get_groq_response(messages: list):
     max_allowed_tokens = 8000  # Leave some room for safety
     max_tokens = min(2048, max(100, max_allowed_tokens - estimated_input_tokens))
     
-    payload = {
+    return {
         "model": "llama3-70b-8192",
         "messages": final_messages,
         "temperature": 0.7,
@@ -43,6 +46,18 @@ async def get_groq_response(messages: list):
         "frequency_penalty": 0.5,
         "presence_penalty": 0.5
     }
+
+
+def _headers() -> dict:
+    return {
+        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+
+async def get_groq_response(messages: list):
+    headers = _headers()
+    payload = _build_payload(messages)
     
     max_retries = 3
     delay = 0.5  # seconds
@@ -98,3 +113,91 @@ async def get_groq_response(messages: list):
                 return f"An error occurred: {str(e)}"
             await asyncio.sleep(delay)
             delay = min(delay * 2, 5.0)  # Cap the delay at 5 seconds
+
+
+def parse_stream_line(line: str) -> Optional[str]:
+    """
+    Text delta carried by one server-sent-events line of a streamed completion.
+    
+    Returns:
+        The content delta, "" for lines without content, None at the end of the stream
+    """
+    if not line.startswith("data:"):
+        return ""
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return None
+    try:
+        choices = json.loads(data).get("choices") or [{}]
+    except ValueError:
+        return ""
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+
+async def stream_groq_response(messages: list, transport: Optional[httpx.AsyncBaseTransport] = None) -> AsyncIterator[str]:
+    """
+    Stream a Groq completion as text deltas, as the model produces them.
+    
+    Rate limits are retried with backoff until the first delta arrives; after
+    that a failure ends the stream. Unlike get_groq_response, errors are
+    raised rather than returned as reply text, so they are never spoken or
+    stored as the assistant's answer.
+    
+    Args:
+        messages: Role/content messages, system prompts first
+        transport: Optional httpx transport (tests)
+        
+    Yields:
+        Text deltas of the assistant reply
+        
+    Raises:
+        GroqStreamError: If the request fails before any text is streamed
+    """
+    headers = _headers()
+    payload = {**_build_payload(messages), "stream": True}
+    logger = logging.getLogger("groq_handler")
+    max_retries = 3
+    delay = 0.5  # seconds
+    streamed = False
+    
+    for attempt in range(max_retries):
+        try:
+            call_start = time.monotonic()
+            async with httpx.AsyncClient(timeout=15.0, transport=transport) as client:
+                async with client.stream("POST", GROQ_API_URL, headers=headers, json=payload) as response:
+                    if response.status_code == 429 and attempt < max_retries - 1:
+                        await asyncio.sleep(delay)
+                        delay *= 2
+                        continue
+                    if response.status_code == 429:
+                        raise GroqStreamError("Rate limit exceeded. Please try again in a few seconds.")
+                    if response.status_code != 200:
+                        error_msg = (await response.aread()).decode("utf-8", "replace")
+                        logger.error(f"Groq API error {response.status_code}: {error_msg}")
+                        raise GroqStreamError(f"Error from Groq API: {error_msg}")
+                    async for line in response.aiter_lines():
+                        delta = parse_stream_line(line)
+                        if delta is None:
+                            break
+                        if delta:
+                            if not streamed:
+                                logger.info(f"Groq first token after {time.monotonic() - call_start:.2f} seconds (attempt {attempt+1})")
+                                streamed = True
+                            yield delta
+                    return
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            if streamed:
+                # Part of the reply is already out; do not start it over
+                logger.error("Groq stream timed out mid-reply")
+                return
+            if attempt == max_retries - 1:
+                raise GroqStreamError("Request timed out. Please try again.")
+            await asyncio.sleep(delay)
+            delay *= 2
+        except GroqStreamError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in stream_groq_response: {str(e)}", exc_info=True)
+            if not streamed:
+                raise GroqStreamError(f"An error occurred: {str(e)}") from e
+            return
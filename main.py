@@ -1,5 +1,5 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Request, Body, status, Header
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uuid  # Added for generating unique IDs
 import logging # Added for logging
@@ -8,15 +8,28 @@ from pydantic import BaseModel
 from firebase_admin import auth, firestore
 from firebase_admin.exceptions import FirebaseError
 from firebase_auth import verify_firebase_token
-from groq_handler import get_groq_response
-from personalities import get_personality_context
-from firebase_memory_manager import (
+from auth_cache import token_cache
+from auth_context import load_user_record, user_data_from_record, user_data_from_claims
+from groq_handler import get_groq_response, stream_groq_response
+from personalities import (
+    ECHO_REPLY,
+    EMPTY_REPLY,
+    ERROR_REPLY,
+    MEMORY_PATCH_REPLY,
+    NO_RESPONSE_REPLY,
+    SPECIAL_REPLIES,
+    get_personality_context,
+)
+from memory_store import (
     store_message,
     get_chat_history,
     get_chat_messages,
     update_chat_title,
-    delete_chat
+    start_delete_chat,
+    get_delete_job
 )
+from metrics import get_metrics, require_metrics_token
+from blocking_io import run_blocking
 
 
 # --- GREETING KEYWORDS ---
@@ -31,6 +44,7 @@ from config import UPLOAD_DIR, FIREBASE_PROJECT_ID
 from dotenv import load_dotenv
 import os
 import json
+import re
 import time
 import asyncio
 import uuid
@@ -60,6 +74,11 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def metrics_endpoint():
+    """Report cache and queue metrics collected in this worker process (needs METRICS_TOKEN)."""
+    return get_metrics()
+
 # Test endpoint to verify CORS is working
 @app.get("/test-cors")
 async def test_cors():
@@ -123,18 +142,11 @@ class MemeUploadRequest(BaseModel):
 class HeadingRequest(BaseModel):
     messages: List[str]
 
-# Dependency to verify Firebase ID token and get user data
-async def get_current_user(request: Request) -> Dict[str, Any]:
-    """Verify Firebase ID token and return user data.
+async def _verify_request_token(request: Request) -> Dict[str, Any]:
+    """Extract the bearer token from the request and return its verified claims.
     
-    Args:
-        request: The incoming request
-        
-    Returns:
-        Dict containing user data including uid and profile_id if available
-        
     Raises:
-        HTTPException: If authentication fails
+        HTTPException: If the header is missing or malformed, or the token is invalid
     """
     auth_header = request.headers.get("Authorization")
     if not auth_header:
@@ -156,67 +168,12 @@ async def get_current_user(request: Request) -> Dict[str, Any]:
     id_token = parts[1]
     
     try:
-        # Verify the ID token using Firebase Admin SDK
-        decoded_token = await verify_firebase_token(id_token)
-        if not decoded_token:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Get the user record to access custom claims and other user data
-        try:
-            user = auth.get_user(decoded_token['uid'])
-            user_data = {
-                'uid': user.uid,
-                'email': user.email,
-                'email_verified': user.email_verified,
-                'display_name': user.display_name,
-                'phone_number': user.phone_number,
-                'photo_url': user.photo_url,
-                'disabled': user.disabled,
-                'custom_claims': user.custom_claims or {}
-            }
-            
-            # Add profile_id from custom claims if available
-            if user.custom_claims and 'profile_id' in user.custom_claims:
-                user_data['profile_id'] = user.custom_claims['profile_id']
-            else:
-                # Generate profile_id based on UID and provider ID for data isolation
-                provider_id = None
-                if user.provider_data and len(user.provider_data) > 0:
-                    provider_id = user.provider_data[0].provider_id
-                else:
-                    # Default to 'firebase' if no provider data available
-                    provider_id = 'firebase'
-                
-                # Create profile_id in format: uid_providerId
-                profile_id = f"{user.uid}_{provider_id}"
-                user_data['profile_id'] = profile_id
-                
-                # Try to save this profile_id to custom claims for future use
-                try:
-                    try:
-                        claims = user.custom_claims if user.custom_claims else {}
-                        claims['profile_id'] = profile_id
-                        auth.set_custom_user_claims(user.uid, claims)
-                        logging.info(f"Set profile_id in custom claims for user {user.uid}")
-                    except Exception as e:
-                        # Don't fail if we can't set custom claims, just log the error
-                        logging.error(f"Failed to set custom claims: {str(e)}")
-                except Exception as e:
-                    # Don't fail if we can't set custom claims, just log the error
-                    logging.error(f"Failed to set custom claims: {str(e)}")
-            
-            logging.info(f"User authenticated successfully: {user.uid} with profile_id: {user_data.get('profile_id')}")
-            return user_data
-        except ValueError as e:
-            logging.error(f"Token verification failed: {str(e)}")
-            raise HTTPException(
-                status_code=401,
-                detail=f"Invalid token: {str(e)}"
-            )
+        # Verify the ID token, reusing earlier verifications until exp
+        decoded_token = token_cache.get(id_token)
+        if decoded_token is None:
+            decoded_token = await verify_firebase_token(id_token)
+            if decoded_token:
+                token_cache.put(id_token, decoded_token)
     except ValueError as e:
         # Specific error for token validation failures
         logging.error(f"Token validation error: {str(e)}")
@@ -224,6 +181,33 @@ async def get_current_user(request: Request) -> Dict[str, Any]:
             status_code=401,
             detail=f"Invalid token: {str(e)}"
         )
+    if not decoded_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return decoded_token
+
+# Dependency to verify Firebase ID token and get user data
+async def get_current_user(request: Request) -> Dict[str, Any]:
+    """Verify Firebase ID token and return user data from the Firebase Auth user record.
+    
+    Args:
+        request: The incoming request
+        
+    Returns:
+        Dict containing user data including uid and profile_id if available
+        
+    Raises:
+        HTTPException: If authentication fails
+    """
+    decoded_token = await _verify_request_token(request)
+    try:
+        # Get the user record to access custom claims and other user data
+        user_data = user_data_from_record(await load_user_record(decoded_token['uid']))
+        logging.info(f"User authenticated successfully: {user_data['uid']} with profile_id: {user_data.get('profile_id')}")
+        return user_data
     except Exception as e:
         # General error handling
         logging.error(f"Authentication error: {str(e)}")
@@ -232,6 +216,32 @@ async def get_current_user(request: Request) -> Dict[str, Any]:
             detail=f"Authentication failed: {str(e)}"
         )
 
+# Lightweight dependency for endpoints that only need uid and profile_id
+async def get_current_user_claims(request: Request) -> Dict[str, Any]:
+    """Verify Firebase ID token and return user data built from its claims alone.
+    
+    Makes no Firebase Auth calls when the token carries a profile_id claim.
+    Endpoints that need the full record can call load_full_user() on the result.
+    
+    Args:
+        request: The incoming request
+        
+    Returns:
+        Dict with uid, email, email_verified, profile_id and sign_in_provider
+        
+    Raises:
+        HTTPException: If authentication fails
+    """
+    decoded_token = await _verify_request_token(request)
+    try:
+        return await user_data_from_claims(decoded_token)
+    except Exception as e:
+        logging.error(f"Authentication error: {str(e)}")
+        raise HTTPException(
+            status_code=401,
+            detail=f"Authentication failed: {str(e)}"
+        )
+
 # Cache for frequently asked questions
 @lru_cache(maxsize=100000)
 def get_cached_response(message: str, personality: str) -> Optional[str]:
@@ -395,15 +405,16 @@ async def get_test_token():
     try:
         # Try to get existing user or create new one
         try:
-            user = auth.get_user_by_email("test@example.com")
+            user = await run_blocking("auth", auth.get_user_by_email, "test@example.com")
         except auth.UserNotFoundError:
-            user = auth.create_user(
+            user = await run_blocking(
+                "auth", auth.create_user,
                 email="test@example.com",
                 password="test123456"
             )
         
         # Get an ID token
-        id_token = auth.create_custom_token(user.uid)
+        id_token = await run_blocking("auth", auth.create_custom_token, user.uid)
         
         # Exchange custom token for ID token
         async with httpx.AsyncClient() as client:
@@ -465,10 +476,10 @@ async def login_google(data: dict = Body(...)):
         raise HTTPException(status_code=400, detail="Google ID token required")
     # Verify Google ID token with Firebase
     try:
-        decoded_token = auth.verify_id_token(id_token)
+        decoded_token = await run_blocking("auth", auth.verify_id_token, id_token)
         uid = decoded_token["uid"]
         # Create a custom token for this user
-        custom_token = auth.create_custom_token(uid)
+        custom_token = await run_blocking("auth", auth.create_custom_token, uid)
         return {"token": custom_token.decode() if hasattr(custom_token, 'decode') else custom_token}
     except Exception as e:
         raise HTTPException(status_code=401, detail=str(e))
@@ -623,18 +634,238 @@ async def generate_groq_heading(request: HeadingRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+# Phrases that reveal the model behind the persona
+_META_PHRASES = [
+    "As an AI language model",
+    "I am an AI",
+    "I'm an AI",
+    "I am a language model",
+    "I'm a language model",
+    "I don't have personal experiences",
+    "I don't have personal opinions",
+    "I don't have personal feelings"
+]
+_FORBIDDEN_KEYWORDS = ["mistral ai", "mistral", "Mistral AI", "Mistral"]
+# Prompt or system leakage; any sentence containing one of these is dropped
+_META_LEAK_PHRASES = [
+    "system log", "prompt", "private LLM", "I'm just a computer program", "as an AI", "as an LLM", "I am an AI", "I am an LLM",
+    "I'm running on", "I will never share my system log", "instructions", "meta", "I don't have feelings", "I don't have a body",
+    "I'm here to help you with any questions or information you need."
+]
+
+
+def _sanitize_reply(response: str) -> str:
+    """Strip meta-references, model names and prompt leakage from an assistant reply.
+
+    Applied to every reply before it is stored, shown or spoken; voice mode
+    runs it on each sentence before synthesis as well as on the full reply.
+    """
+    if not response:
+        return response
+    cleaned = response
+    for phrase in _META_PHRASES:
+        cleaned = cleaned.replace(phrase, "")
+    for keyword in _FORBIDDEN_KEYWORDS:
+        cleaned = cleaned.replace(keyword, "AI")
+    for phrase in _META_LEAK_PHRASES:
+        if phrase.lower() in cleaned.lower():
+            # Remove the phrase and any surrounding sentences
+            cleaned = re.sub(r'[^.]*' + re.escape(phrase) + r'[^.]*[.!?]', '', cleaned, flags=re.IGNORECASE)
+    # Clean up excessive whitespace
+    return cleaned.strip()
+
+
+def _clean_llm_response(response) -> str:
+    """Clean and extract the assistant's response from the LLM output."""
+    if isinstance(response, dict):
+        if response.get("role") == "assistant":
+            return response.get("content", "")
+        return ""
+    elif isinstance(response, list):
+        # Find the first assistant message in the response
+        assistant_responses = [
+            m.get("content", "")
+            for m in response
+            if isinstance(m, dict) and m.get("role") == "assistant"
+        ]
+        return assistant_responses[0] if assistant_responses else ""
+    return str(response) if response is not None else ""
+
+
+def _remove_user_message_references(response: str, user_msg: str) -> str:
+    """Remove any references to the user's message in the response."""
+    if not response or not user_msg:
+        return response
+
+    # Remove exact matches of the user's message
+    cleaned = response.replace(user_msg, "")
+
+    # Remove common patterns that include the user's message
+    patterns = [
+        f"You said: \"{user_msg}\"",
+        f"When you said '{user_msg}'",
+        f"Your message '{user_msg}'",
+        f"You asked me to '{user_msg}'",
+        f"You wanted me to '{user_msg}'",
+    ]
+
+    for pattern in patterns:
+        cleaned = cleaned.replace(pattern, "")
+
+    return cleaned.strip() or ECHO_REPLY
+
+
+def _strip_persona_prefix(response: str, personality: str) -> str:
+    """Drop a leading "Swag Bhai:"-style speaker label."""
+    persona_name = {
+        "swag_bhai": "Swag Bhai",
+        "ceo_bhai": "CEO Bhai",
+        "roast_bhai": "Roast Bhai",
+        "vidhyarthi_bhai": "Vidhyarthi Bhai",
+        "jugadu_bhai": "Jugadu Bhai"
+    }.get(personality, "Bhai")
+    if response.lower().startswith(persona_name.lower() + ":"):
+        return response[len(persona_name) + 1:].strip()
+    return response
+
+
+def _postprocess_reply(response, message: str, personality: str, memory_present: bool) -> str:
+    """The model output as it is stored and shown, in text and voice mode alike."""
+    response = _clean_llm_response(response)
+    response = str(response).strip() if response else EMPTY_REPLY
+    response = _remove_user_message_references(response, message)
+    response = _strip_persona_prefix(response, personality)
+    response = _sanitize_reply(response) or NO_RESPONSE_REPLY
+
+    # Memory-aware response patch
+    lowered = response.lower()
+    if memory_present and ("i don't have the ability to remember" in lowered or "i can't remember" in lowered):
+        response = MEMORY_PATCH_REPLY
+    return response
+
+
+async def _persist_turn(
+    user_id: str,
+    profile_id: str,
+    personality: str,
+    message: str,
+    response: str,
+    conversation_id: str
+) -> str:
+    """Store a chat turn and refresh the conversation's compressed memory. Returns the conversation ID."""
+    # Store the conversation in Firestore
+    try:
+        conversation_id = await store_message(
+            user_id=user_id,
+            profile_id=profile_id,
+            personality=personality,
+            message=message,
+            response=response,
+            chat_id=conversation_id
+        )
+    except Exception as e:
+        logger.error(f"Error storing message in Firestore: {str(e)}")
+        if '404' in str(e):
+            logger.error(f"Firestore 404: Conversation document missing for chat_id={conversation_id}, user_id={user_id}, profile_id={profile_id}. This usually means the conversation was never created or was deleted.")
+        # Don't fail the request if storage fails, just log it
+        if not conversation_id:
+            conversation_id = str(uuid.uuid4())
+
+    # After storing, summarize the last 100 messages and store as compressed memory
+    try:
+        from memory_store import get_recent_turns, store_compressed_memory
+        from groq_memory import summarize_chat_memory
+        last_100_turns = await get_recent_turns(
+            chat_id=conversation_id,
+            user_id=user_id,
+            profile_id=profile_id,
+            limit=100
+        )
+        last_100_turns.reverse()
+        # Format as role/content pairs for summarization
+        formatted_msgs = []
+        for turn in last_100_turns:
+            if turn.message:
+                formatted_msgs.append({"role": "user", "content": turn.message})
+            if turn.response:
+                formatted_msgs.append({"role": "assistant", "content": turn.response})
+        compressed_memory = await summarize_chat_memory(formatted_msgs)
+        await store_compressed_memory(conversation_id, user_id, profile_id, compressed_memory)
+    except Exception as e:
+        logger.warning(f"Failed to summarize and store compressed memory: {str(e)}")
+    return conversation_id
+
+def _voice_chat_response(
+    messages: list,
+    started: float,
+    user_id: str,
+    profile_id: str,
+    personality: str,
+    message: str,
+    conversation_id: str,
+    language: str,
+    audio_format: str,
+    headers: Dict[str, str],
+    memory_present: bool = False
+) -> StreamingResponse:
+    """Stream the reply as NDJSON events: text deltas, per-sentence audio, then a done event.
+
+    Sentences are synthesized while the model is still writing (see
+    voice_pipeline.voice_events), each sanitized like the text reply before
+    it is shown or spoken. The full reply goes through the same
+    post-processing as the text path and is stored before the done event,
+    which carries the final message and conversation_id like the JSON reply. If
+    the model call fails, the stream ends with an error event instead and
+    nothing is stored.
+    """
+    from app.services.tts_service import tts_service
+    from voice_pipeline import voice_events
+
+    async def synthesize(sentence: str):
+        return await tts_service.get_audio(sentence, language, audio_format, personality)
+
+    def clean(sentence: str) -> str:
+        return _sanitize_reply(_strip_persona_prefix(sentence, personality))
+
+    async def body():
+        events = voice_events(
+            stream_groq_response(messages), synthesize, audio_format, started=started, clean=clean
+        )
+        failed = False
+        async for event in events:
+            if event["type"] == "error":
+                failed = True
+            if event["type"] == "done":
+                if failed:
+                    break
+                reply = _postprocess_reply(event["message"], message, personality, memory_present)
+                saved_id = await _persist_turn(user_id, profile_id, personality, message, reply, conversation_id)
+                event = {
+                    "type": "done",
+                    "message": reply,
+                    "timestamp": datetime.now().isoformat(),
+                    "personality": personality,
+                    "conversation_id": saved_id
+                }
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson", headers=headers)
+
 # Add new endpoint for conversation management
 @app.post("/chat")
 @app.options("/chat", include_in_schema=False)
 async def chat(
     request: Request, 
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     origin: str = Header(None, include_in_schema=False)
 ):
     """Handle chat messages and generate responses using Mistral.
     
     This endpoint processes incoming chat messages, retrieves conversation history,
     generates a response using Mistral, and stores the conversation in Firestore.
+    
+    With ``"mode": "voice"`` the reply is streamed as NDJSON events with audio for
+    each sentence (``language`` and ``audio_format``, default mp3, pick the voice).
     """
     # Handle preflight OPTIONS request
     if request.method == "OPTIONS":
@@ -649,6 +880,7 @@ async def chat(
         return response
     
     try:
+        request_started = time.perf_counter()
         data = await request.json()
         message = data.get("message")
         personality = data.get("personality", "swag")
@@ -683,11 +915,11 @@ async def chat(
                 response.headers[key] = value
             return response
 
-        # Specific response for Mythili L
+        # Scripted replies (e.g. for Mythili L)
         # Ensure 'message' is not None before calling strip() and lower()
-        if message and message.strip().lower() == "i am mythili from tumkur":
-            logger.info(f"Special message 'I am Mythili from Tumkur' received from user {current_user.get('uid')}")
-            special_response_text = "ohh woww u r the friend of Syed Farooq and a heart broken ex of Harshith R how is life now"
+        special_response_text = SPECIAL_REPLIES.get(message.strip().lower()) if message else None
+        if special_response_text:
+            logger.info(f"Special message '{message.strip()}' received from user {current_user.get('uid')}")
             
             # This special response currently bypasses normal message storage in Firestore.
             # If you want this interaction to be saved, you would add calls to store_message here
@@ -723,27 +955,27 @@ async def chat(
         fallback_used = False
         if conversation_id:
             try:
-                from firebase_memory_manager import get_compressed_memory, get_chat_messages
+                from memory_store import get_compressed_memory, get_recent_turns
                 # Only ever fetch memory/history for the current conversation_id
                 compressed_memory = await get_compressed_memory(conversation_id, user_id, profile_id)
                 if compressed_memory and isinstance(compressed_memory, list) and len(compressed_memory) > 0:
                     chat_history = compressed_memory
                 else:
-                    # Fallback: Fetch up to 100 previous messages for this conversation only
-                    chat_history = await get_chat_messages(
+                    # Fallback: Fetch up to 100 previous turns for this conversation only
+                    recent_turns = await get_recent_turns(
                         chat_id=conversation_id,
                         user_id=user_id,
                         profile_id=profile_id,
                         limit=100
                     )
-                    chat_history.reverse()
+                    recent_turns.reverse()
                     # Format fallback as role/content pairs
                     formatted_fallback = []
-                    for msg in chat_history:
-                        if msg.get('message'):
-                            formatted_fallback.append({"role": "user", "content": msg['message']})
-                        if msg.get('response'):
-                            formatted_fallback.append({"role": "assistant", "content": msg['response']})
+                    for turn in recent_turns:
+                        if turn.message:
+                            formatted_fallback.append({"role": "user", "content": turn.message})
+                        if turn.response:
+                            formatted_fallback.append({"role": "assistant", "content": turn.response})
                     chat_history = formatted_fallback[-20:]  # fallback to last 20 messages
                     fallback_used = True
             except Exception as e:
@@ -801,177 +1033,51 @@ async def chat(
             messages.append({"role": "user", "content": message})
 
         logger.info(f"Prompt sent to LLM (Groq): {json.dumps(messages, ensure_ascii=False, indent=2)}")
+
+        if data.get("mode") == "voice":
+            from app.services.audio_codec import AUDIO_MEDIA_TYPES, negotiate_format
+            audio_format = negotiate_format(None, data.get("audio_format"), "mp3")
+            if audio_format is None:
+                response = JSONResponse(
+                    content={
+                        "message": f"Unsupported audio_format. Use one of: {', '.join(AUDIO_MEDIA_TYPES)}",
+                        "conversation_id": conversation_id,
+                        "timestamp": datetime.now().isoformat(),
+                        "personality": personality
+                    },
+                    status_code=400
+                )
+                for key, value in headers.items():
+                    response.headers[key] = value
+                return response
+            return _voice_chat_response(
+                messages, request_started, user_id, profile_id, personality, message,
+                conversation_id, data.get("language", "en"), audio_format, headers,
+                memory_present=bool(chat_history)
+            )
+
         response = None
         try:
             # Get response from Groq
             response = await get_groq_response(messages)
             
-            # Clean and validate the response
-            def clean_llm_response(response):
-                """Clean and extract the assistant's response from the LLM output."""
-                if isinstance(response, dict):
-                    if response.get("role") == "assistant":
-                        return response.get("content", "")
-                    return ""
-                elif isinstance(response, list):
-                    # Find the first assistant message in the response
-                    assistant_responses = [
-                        m.get("content", "") 
-                        for m in response 
-                        if isinstance(m, dict) and m.get("role") == "assistant"
-                    ]
-                    return assistant_responses[0] if assistant_responses else ""
-                return str(response) if response is not None else ""
-                
-            def remove_user_message_references(response, user_msg):
-                """Remove any references to the user's message in the response."""
-                if not response or not user_msg:
-                    return response
-                    
-                # Remove exact matches of the user's message
-                cleaned = response.replace(user_msg, "")
-                
-                # Remove common patterns that include the user's message
-                patterns = [
-                    f"You said: \"{user_msg}\"",
-                    f"When you said '{user_msg}'",
-                    f"Your message '{user_msg}'",
-                    f"You asked me to '{user_msg}'",
-                    f"You wanted me to '{user_msg}'",
-                ]
-                
-                for pattern in patterns:
-                    cleaned = cleaned.replace(pattern, "")
-                    
-                return cleaned.strip() or "Hmm, let's change the subject. What else is on your mind?"
-                
-            def get_persona_name(pid):
-                """Get the display name for the current persona."""
-                return {
-                    "swag_bhai": "Swag Bhai",
-                    "ceo_bhai": "CEO Bhai",
-                    "roast_bhai": "Roast Bhai",
-                    "vidhyarthi_bhai": "Vidhyarthi Bhai",
-                    "jugadu_bhai": "Jugadu Bhai"
-                }.get(pid, "Bhai")
-                
-            def remove_meta_references(resp):
-                """Remove any meta-references from the response."""
-                if not resp:
-                    return resp
-                    
-                # Remove common meta-references
-                meta_phrases = [
-                    "As an AI language model",
-                    "I am an AI",
-                    "I'm an AI",
-                    "I am a language model",
-                    "I'm a language model",
-                    "I don't have personal experiences",
-                    "I don't have personal opinions",
-                    "I don't have personal feelings"
-                ]
-                
-                cleaned = resp
-                for phrase in meta_phrases:
-                    cleaned = cleaned.replace(phrase, "")
-                    
-                return cleaned.strip()
-
-            # Process the response
-            response = clean_llm_response(response)
-            response = str(response).strip() if response else "I'm not sure how to respond to that. Could you rephrase?"
-            response = remove_user_message_references(response, message)
-            
-            persona_name = get_persona_name(personality)
-            if response.lower().startswith(persona_name.lower() + ":"):
-                response = response[len(persona_name) + 1:].strip()
-            
-            response = remove_meta_references(response)
+            response = _postprocess_reply(response, message, personality, bool(chat_history))
             
         except Exception as e:
             logger.error(f"Error generating response with Groq: {str(e)}")
             logger.error(traceback.format_exc())
-            response = "Hmm, let me think of a better response. Try asking me something else!"
+            response = ERROR_REPLY
 
-        # Store the conversation in Firestore
-        try:
-            conversation_id = await store_message(
-                user_id=user_id,
-                profile_id=profile_id,
-                personality=personality,
-                message=message,
-                response=response,
-                chat_id=conversation_id
-            )
-        except Exception as e:
-            logger.error(f"Error storing message in Firestore: {str(e)}")
-            if '404' in str(e):
-                logger.error(f"Firestore 404: Conversation document missing for chat_id={conversation_id}, user_id={user_id}, profile_id={profile_id}. This usually means the conversation was never created or was deleted.")
-            # Don't fail the request if storage fails, just log it
-            if not conversation_id:
-                conversation_id = str(uuid.uuid4())
+        conversation_id = await _persist_turn(user_id, profile_id, personality, message, response, conversation_id)
         
-        # After storing, summarize the last 100 messages and store as compressed memory
-        try:
-            from firebase_memory_manager import get_chat_messages, store_compressed_memory
-            from groq_memory import summarize_chat_memory
-            last_100_msgs = await get_chat_messages(
-                chat_id=conversation_id,
-                user_id=user_id,
-                profile_id=profile_id,
-                limit=100
-            )
-            last_100_msgs.reverse()
-            # Format as role/content pairs for summarization
-            formatted_msgs = []
-            for msg in last_100_msgs:
-                user_message = msg.get('message')
-                bot_response = msg.get('response')
-                if user_message:
-                    formatted_msgs.append({"role": "user", "content": user_message})
-                if bot_response:
-                    formatted_msgs.append({"role": "assistant", "content": bot_response})
-            compressed_memory = await summarize_chat_memory(formatted_msgs)
-            await store_compressed_memory(conversation_id, user_id, profile_id, compressed_memory)
-        except Exception as e:
-            logger.warning(f"Failed to summarize and store compressed memory: {str(e)}")
-        
-        # Sanitize the response to remove any mention of 'Mistral' or 'Mistral AI'
-        if isinstance(response, str):
-            forbidden_keywords = ["mistral ai", "mistral", "Mistral AI", "Mistral"]
-            for keyword in forbidden_keywords:
-                response = response.replace(keyword, "AI")
         if not response:
-            response = "Sorry, the AI could not generate a response."
+            response = NO_RESPONSE_REPLY
 
         # Defensive: Guarantee conversation_id is never None in the response
         if not conversation_id:
             import uuid
             conversation_id = str(uuid.uuid4())
 
-        # --- Memory-aware response patch ---
-        if (
-            isinstance(response, str) and
-            ("i don't have the ability to remember" in response.lower() or "i can't remember" in response.lower()) and
-            memory_present
-        ):
-            response = "Yeah bro, you said it's about 1.6 x 1.1 x 1.5 cm³ in the left CP region. Stay strong!"
-
-        # Remove or rewrite any meta-prompt leakage (system log, prompt, LLM, etc.)
-        if isinstance(response, str):
-            meta_leak_phrases = [
-                "system log", "prompt", "private LLM", "I'm just a computer program", "as an AI", "as an LLM", "I am an AI", "I am an LLM",
-                "I'm running on", "I will never share my system log", "instructions", "meta", "I don't have feelings", "I don't have a body",
-                "I'm here to help you with any questions or information you need."
-            ]
-            for phrase in meta_leak_phrases:
-                if phrase.lower() in response.lower():
-                    # Remove the phrase and any surrounding sentences
-                    import re
-                    response = re.sub(r'[^.]*' + re.escape(phrase) + r'[^.]*[.!?]', '', response, flags=re.IGNORECASE)
-            # Clean up excessive whitespace
-            response = response.strip()
         # --- END POST-PROCESSING ---
         # Create JSON response with CORS headers
         response_data = {
@@ -1084,7 +1190,7 @@ async def chat(
         return error_response
 
 @app.put("/conversations/{conversation_id}")
-async def update_conversation(conversation_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+async def update_conversation(conversation_id: str, request: Request, current_user: dict = Depends(get_current_user_claims)):
     """Update a conversation's metadata (title, personality, etc.) in Firestore."""
     try:
         data = await request.json()
@@ -1116,17 +1222,17 @@ async def update_conversation(conversation_id: str, request: Request, current_us
                              .collection('conversations').document(conversation_id)
         
         # Check if the conversation exists and belongs to the user
-        conversation = await conversation_ref.get()
+        conversation = await run_blocking("firestore", conversation_ref.get)
         if not conversation.exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Conversation not found"
             )
             
-        await conversation_ref.update(update_data)
+        await run_blocking("firestore", conversation_ref.update, update_data)
         
         # Get the updated conversation
-        updated_conversation = await conversation_ref.get()
+        updated_conversation = await run_blocking("firestore", conversation_ref.get)
         
         return {
             "success": True,
@@ -1151,7 +1257,7 @@ async def update_conversation(conversation_id: str, request: Request, current_us
         )
 
 @app.get("/conversations")
-async def get_conversations_endpoint(current_user: dict = Depends(get_current_user)):
+async def get_conversations_endpoint(current_user: dict = Depends(get_current_user_claims)):
     """Get the user's conversations from Firestore."""
     try:
         # Get user ID and profile ID from the authenticated user
@@ -1173,26 +1279,31 @@ async def get_conversations_endpoint(current_user: dict = Depends(get_current_us
             detail="Failed to fetch conversations"
         )
 
-@app.delete("/conversations/{conversation_id}")
-async def delete_conversation_endpoint(conversation_id: str, current_user: dict = Depends(get_current_user)):
-    """Delete a conversation and all its messages from Firestore."""
+@app.delete("/conversations/{conversation_id}", status_code=status.HTTP_202_ACCEPTED)
+async def delete_conversation_endpoint(conversation_id: str, current_user: dict = Depends(get_current_user_claims)):
+    """Schedule deletion of a conversation and all its messages from Firestore.
+    
+    Deletion runs as a background job; poll /conversations/delete-jobs/{job_id} for its status
+    (any worker can answer, the job status is kept in the memory store).
+    """
     try:
         # Get user ID and profile ID from the authenticated user
         user_id = current_user.get("uid")
         profile_id = current_user.get("profile_id")
         
-        # Delete the conversation and its messages
-        success = await delete_chat(conversation_id, user_id, profile_id)
-        
-        if not success:
+        # Schedule deletion of the conversation and its messages
+        job = await start_delete_chat(conversation_id, user_id, profile_id)
+        if job is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail="Conversation not found or could not be deleted"
+                detail="Conversation not found"
             )
             
         return {
             "success": True,
-            "message": "Conversation deleted successfully"
+            "message": "Conversation deletion scheduled",
+            "job_id": job["job_id"],
+            "job": job
         }
         
     except HTTPException:
@@ -1205,6 +1316,21 @@ async def delete_conversation_endpoint(conversation_id: str, current_user: dict
             detail="Failed to delete conversation"
         )
 
+@app.get("/conversations/delete-jobs/{job_id}")
+async def get_delete_job_endpoint(job_id: str, current_user: dict = Depends(get_current_user_claims)):
+    """Get the status of a background conversation deletion job."""
+    owner_id = current_user.get("profile_id") or current_user.get("uid")
+    job = await get_delete_job(job_id, owner_id=owner_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Delete job not found"
+        )
+    return {
+        "success": True,
+        "job": job.to_dict()
+    }
+
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from fastapi import status as fastapi_status
@@ -0,0 +1,210 @@
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Optional, Callable, NamedTuple
+
+from chat_deletion import DeleteJob, get_delete_job as get_local_delete_job, start_delete_job
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class ChatTurn(NamedTuple):
+    """One stored user message and its response, as needed to build LLM context.
+
+    A tuple subclass: no per-instance __dict__, and only the projected fields.
+    """
+    id: str
+    message: Optional[str]
+    response: Optional[str]
+    timestamp: Optional[str]
+
+
+# Fields fetched for context reads; everything else stays on the server
+CHAT_TURN_FIELDS = ['message', 'response', 'timestamp']
+
+
+def chat_turn_from_dict(turn_id: str, data: Dict[str, Any]) -> ChatTurn:
+    """Build a ChatTurn from a decoded document, normalizing the timestamp to ISO format."""
+    timestamp = data.get('timestamp')
+    if timestamp is not None and not isinstance(timestamp, str):
+        timestamp = timestamp.isoformat()
+    return ChatTurn(turn_id, data.get('message'), data.get('response'), timestamp)
+
+
+class MemoryStore(ABC):
+    """Storage interface for conversations, messages and compressed memory.
+
+    All methods scope data by the effective user id (profile_id if available,
+    otherwise user_id), matching the Firestore layout users/{id}/chats/...
+    """
+
+    @abstractmethod
+    async def store_message(
+        self,
+        user_id: str,
+        profile_id: str = None,
+        personality: str = "swag",
+        message: str = None,
+        response: str = None,
+        chat_id: str = None
+    ) -> str:
+        """Store a message, creating the chat if needed. Returns the chat ID."""
+
+    @abstractmethod
+    async def get_chat_history(self, user_id: str, profile_id: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """List chats, most recently updated first, with their last message."""
+
+    @abstractmethod
+    async def get_chat_messages(self, chat_id: str, user_id: str, profile_id: str = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the newest messages of a chat, newest first."""
+
+    @abstractmethod
+    async def get_recent_turns(self, chat_id: str, user_id: str, profile_id: str = None, limit: int = 100) -> List[ChatTurn]:
+        """Get the newest turns of a chat, newest first, projected to ChatTurn fields."""
+
+    @abstractmethod
+    async def chat_exists(self, chat_id: str, user_id: str, profile_id: str = None) -> bool:
+        """Whether the chat exists (reads no message data)."""
+
+    @abstractmethod
+    async def update_chat_title(self, chat_id: str, user_id: str, title: str, profile_id: str = None) -> bool:
+        """Update the title of an existing chat. Returns False if it does not exist."""
+
+    @abstractmethod
+    async def delete_chat(
+        self,
+        chat_id: str,
+        user_id: str,
+        profile_id: str = None,
+        on_progress: Optional[Callable[[int], None]] = None
+    ) -> bool:
+        """Delete a chat, its messages and its compressed memory."""
+
+    @abstractmethod
+    async def store_compressed_memory(self, chat_id: str, user_id: str, profile_id: str, compressed_memory: list) -> bool:
+        """Store compressed (summarized) memory for a chat."""
+
+    @abstractmethod
+    async def get_compressed_memory(self, chat_id: str, user_id: str, profile_id: str) -> list:
+        """Get compressed memory for a chat, or an empty list."""
+
+    @abstractmethod
+    async def save_delete_job(self, record: Dict[str, Any]) -> bool:
+        """Store a deletion job's status record (DeleteJob.to_record()) under its job_id."""
+
+    @abstractmethod
+    async def load_delete_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a stored deletion job status record, or None."""
+
+
+_store: Optional[MemoryStore] = None
+
+
+def create_memory_store(backend: str, **kwargs) -> MemoryStore:
+    """Create a storage backend by name ("firestore", "firestore_paged" or "sqlite")."""
+    backend = (backend or "firestore").lower().strip()
+    if backend == "firestore":
+        from firebase_memory_manager import FirestoreMemoryStore
+        return FirestoreMemoryStore(**kwargs)
+    if backend == "firestore_paged":
+        from firebase_paged_memory_manager import PagedFirestoreMemoryStore
+        return PagedFirestoreMemoryStore(**kwargs)
+    if backend == "sqlite":
+        from sqlite_memory_manager import SQLiteMemoryStore
+        return SQLiteMemoryStore(**kwargs)
+    raise ValueError(f"Unknown memory backend: {backend}")
+
+
+def get_memory_store() -> MemoryStore:
+    """Return the process-wide storage backend selected by MEMORY_BACKEND."""
+    global _store
+    if _store is None:
+        from config import MEMORY_BACKEND
+        _store = create_memory_store(MEMORY_BACKEND)
+        logger.info(f"Using {MEMORY_BACKEND} memory backend")
+    return _store
+
+
+def set_memory_store(store: Optional[MemoryStore]) -> None:
+    """Replace the process-wide storage backend (used by tests and benchmarks)."""
+    global _store
+    _store = store
+
+
+# Module-level helpers delegating to the configured backend
+
+async def store_message(*args, **kwargs) -> str:
+    return await get_memory_store().store_message(*args, **kwargs)
+
+
+async def get_chat_history(*args, **kwargs) -> List[Dict[str, Any]]:
+    return await get_memory_store().get_chat_history(*args, **kwargs)
+
+
+async def get_chat_messages(*args, **kwargs) -> List[Dict[str, Any]]:
+    return await get_memory_store().get_chat_messages(*args, **kwargs)
+
+
+async def get_recent_turns(*args, **kwargs) -> List[ChatTurn]:
+    return await get_memory_store().get_recent_turns(*args, **kwargs)
+
+
+async def update_chat_title(*args, **kwargs) -> bool:
+    return await get_memory_store().update_chat_title(*args, **kwargs)
+
+
+async def delete_chat(*args, **kwargs) -> bool:
+    return await get_memory_store().delete_chat(*args, **kwargs)
+
+
+async def store_compressed_memory(*args, **kwargs) -> bool:
+    return await get_memory_store().store_compressed_memory(*args, **kwargs)
+
+
+async def get_compressed_memory(*args, **kwargs) -> list:
+    return await get_memory_store().get_compressed_memory(*args, **kwargs)
+
+
+async def start_delete_chat(chat_id: str, user_id: str, profile_id: str = None) -> Optional[Dict[str, Any]]:
+    """Schedule deletion of a chat as a background job
+
+    The job status is saved to the memory store, so any worker can answer
+    get_delete_job for it.
+
+    Args:
+        chat_id: The chat ID
+        user_id: The user ID from Firebase Auth
+        profile_id: The profile ID for data isolation
+
+    Returns:
+        The job status record, including its job_id, or None if the chat does not exist
+    """
+    store = get_memory_store()
+    if not await store.chat_exists(chat_id, user_id, profile_id):
+        return None
+
+    async def run(job: DeleteJob) -> int:
+        def on_progress(count: int) -> None:
+            job.deleted = count
+        if not await store.delete_chat(chat_id, user_id, profile_id, on_progress=on_progress):
+            raise RuntimeError(f"Failed to delete chat {chat_id}")
+        return job.deleted
+
+    job = await start_delete_job(chat_id, profile_id or user_id, run, save=store.save_delete_job)
+    return job.to_dict()
+
+
+async def get_delete_job(job_id: str, owner_id: str) -> Optional[DeleteJob]:
+    """Look up a deletion job owned by ``owner_id``, whichever worker started it.
+
+    Jobs started by this process are answered from memory (with live progress);
+    others from the record saved in the memory store.
+    """
+    job = get_local_delete_job(job_id, owner_id=owner_id)
+    if job is not None:
+        return job
+    record = await get_memory_store().load_delete_job(job_id)
+    if record is None or record.get("owner_id") != owner_id:
+        return None
+    job = DeleteJob.from_record(record)
+    return None if job.expired() else job
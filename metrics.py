@@ -0,0 +1,93 @@
+import hmac
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Header, HTTPException, status
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+_lock = threading.Lock()
+
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """Register a callable returning a snapshot of a component's counters.
+
+    Args:
+        name: Section name in the /metrics output
+        provider: Zero-argument callable returning a JSON-serializable dict
+    """
+    with _lock:
+        _providers[name] = provider
+
+
+def get_metrics() -> Dict[str, Any]:
+    """Collect a snapshot from every registered provider."""
+    with _lock:
+        providers = dict(_providers)
+    snapshot = {}
+    for name, provider in providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            logger.warning(f"Metrics provider {name} failed: {str(e)}")
+            snapshot[name] = {"error": str(e)}
+    return snapshot
+
+
+def require_metrics_token(authorization: Optional[str] = Header(None)) -> None:
+    """FastAPI dependency guarding /metrics.
+
+    The endpoint does not exist (404) unless METRICS_TOKEN is set, and then
+    needs ``Authorization: Bearer <METRICS_TOKEN>``.
+    """
+    from config import METRICS_TOKEN
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+class LatencyStats:
+    """Running count, mean and maximum of a duration, plus percentiles over a recent window."""
+
+    def __init__(self, window: int = 1024):
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self._recent.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """Percentile (0-1) of the recent window, in seconds."""
+        with self._lock:
+            recent = sorted(self._recent)
+        if not recent:
+            return 0.0
+        return recent[min(len(recent) - 1, int(fraction * len(recent)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total, maximum = self.count, self.total, self.max
+        return {
+            "count": count,
+            "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+            "p50_ms": round(self.percentile(0.5) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "max_ms": round(maximum * 1000, 3),
+        }
@@ -0,0 +1,58 @@
+"""
+Migrate stored chats from per-message documents to the paged layout.
+
+Every chat under users/{profile}/chats gets its messages packed into
+pages/{index} documents and its page index written to the chat document.
+Already-migrated chats are skipped, so the tool can be re-run safely; chats
+it misses are migrated lazily on their next write by the paged backend.
+
+    python migrate_paged_layout.py --dry-run
+    python migrate_paged_layout.py --profile <profile_id> --delete-legacy
+"""
+import argparse
+import asyncio
+import logging
+
+from firebase_admin import firestore
+
+from config import FIRESTORE_PAGE_SIZE, FIRESTORE_PAGE_MAX_BYTES
+from firebase_paged_memory_manager import LAYOUT_PAGED, migrate_chat
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate(db, profile_id: str = None, dry_run: bool = False, delete_legacy: bool = False,
+                  page_size: int = FIRESTORE_PAGE_SIZE) -> int:
+    """Migrate all chats (or one profile's chats). Returns the number of migrated chats."""
+    users = db.collection('users')
+    profiles = [users.document(profile_id)] if profile_id else users.list_documents()
+    migrated = 0
+    for user_ref in profiles:
+        for chat in user_ref.collection('chats').stream():
+            if (chat.to_dict() or {}).get('layout') == LAYOUT_PAGED:
+                continue
+            if dry_run:
+                logger.info(f"Would migrate {chat.reference.path}")
+            else:
+                await migrate_chat(db, chat.reference, page_size, FIRESTORE_PAGE_MAX_BYTES, delete_legacy)
+            migrated += 1
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", help="only migrate this profile's chats")
+    parser.add_argument("--page-size", type=int, default=FIRESTORE_PAGE_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="list chats that would be migrated")
+    parser.add_argument("--delete-legacy", action="store_true", help="delete per-message documents after migrating")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Importing firebase_auth initializes the Firebase app
+    from firebase_auth import initialize_firebase  # noqa: F401
+    count = asyncio.run(migrate(firestore.client(), args.profile, args.dry_run, args.delete_legacy, args.page_size))
+    print(f"{'Would migrate' if args.dry_run else 'Migrated'} {count} chats")
+
+
+if __name__ == "__main__":
+    main()
@@ -122,6 +122,30 @@ You're Jugadu Bhai — a born hacker, fixer, and life-hack wizard.
     },
 }
 
+# Scripted replies sent without calling the model, keyed by the lowercased message
+SPECIAL_REPLIES = {
+    "i am mythili from tumkur": "ohh woww u r the friend of Syed Farooq and a heart broken ex of Harshith R how is life now",
+}
+NO_RESPONSE_REPLY = "Sorry, the AI could not generate a response."
+# The model call failed
+ERROR_REPLY = "Hmm, let me think of a better response. Try asking me something else!"
+# The model returned nothing usable
+EMPTY_REPLY = "I'm not sure how to respond to that. Could you rephrase?"
+# The reply was nothing but an echo of the user's message
+ECHO_REPLY = "Hmm, let's change the subject. What else is on your mind?"
+# The model claimed it cannot remember although chat history was supplied
+MEMORY_PATCH_REPLY = "Yeah bro, you said it's about 1.6 x 1.1 x 1.5 cm³ in the left CP region. Stay strong!"
+
+# Every canned reply the chat endpoint can send; pre-rendered as TTS at startup
+FAST_PATH_REPLIES = [
+    *SPECIAL_REPLIES.values(),
+    NO_RESPONSE_REPLY,
+    ERROR_REPLY,
+    EMPTY_REPLY,
+    ECHO_REPLY,
+    MEMORY_PATCH_REPLY,
+]
+
 def get_personality_context(personality_id: str) -> List[Dict[str, Any]]:
     """Get the context and system prompt for a specific personality."""
     if personality_id not in PERSONALITIES:
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set
+
+from firebase_admin import auth
+
+from auth_cache import invalidate_user
+from blocking_io import run_blocking
+from config import AUTH_USER_CACHE_SIZE
+from metrics import register_metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def derive_profile_id(uid: str, provider_id: Optional[str] = None) -> str:
+    """Profile id used for data isolation: ``{uid}_{providerId}``, 'firebase' when there is no provider."""
+    return f"{uid}_{provider_id or 'firebase'}"
+
+
+def profile_id_for_user(user) -> str:
+    """Profile id for a Firebase Auth user record, from its claims or derived from its first provider."""
+    claims = user.custom_claims or {}
+    if claims.get('profile_id'):
+        return claims['profile_id']
+    provider_id = user.provider_data[0].provider_id if user.provider_data else None
+    return derive_profile_id(user.uid, provider_id)
+
+
+class ProfileProvisioner:
+    """Writes ``profile_id`` custom claims from a background worker.
+
+    Requests derive the profile id themselves and only enqueue the claim
+    write, so the Admin SDK call never sits on the request path. Users whose
+    claims were written by this process are remembered, and a user already
+    queued is not queued again, which makes repeated requests from a client
+    holding an old token free until it refreshes. The remembered users are
+    an LRU bounded like the auth caches; a user evicted from it just has the
+    (idempotent) write queued once more. Failed writes are forgotten so the
+    next request retries them.
+    """
+
+    def __init__(self, set_claims: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 max_provisioned: int = AUTH_USER_CACHE_SIZE):
+        self._set_claims = set_claims or auth.set_custom_user_claims
+        self._lock = threading.Lock()
+        self.max_provisioned = max_provisioned
+        self._provisioned: "OrderedDict[str, None]" = OrderedDict()
+        self._pending: Set[str] = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.completed = 0
+        self.failed = 0
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    def request(self, uid: str, profile_id: str, claims: Optional[Dict[str, Any]] = None) -> bool:
+        """Queue a claim write for ``uid`` unless it is already provisioned or queued.
+
+        Args:
+            uid: Firebase Auth user id
+            profile_id: Profile id to store in the custom claims
+            claims: The user's current custom claims, preserved alongside profile_id
+
+        Returns:
+            True if a write was queued
+        """
+        with self._lock:
+            if uid in self._provisioned:
+                self._provisioned.move_to_end(uid)
+                return False
+            if uid in self._pending:
+                return False
+            self._pending.add(uid)
+        self._ensure_worker().put_nowait((uid, {**(claims or {}), 'profile_id': profile_id}))
+        return True
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            uid, claims = await queue.get()
+            try:
+                await run_blocking("auth", self._set_claims, uid, claims)
+                # Cached user records still carry the old claims
+                invalidate_user(uid)
+                with self._lock:
+                    self._provisioned[uid] = None
+                    while len(self._provisioned) > self.max_provisioned:
+                        self._provisioned.popitem(last=False)
+                    self.completed += 1
+                logger.info(f"Set profile_id in custom claims for user {uid}")
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                logger.error(f"Failed to set custom claims for user {uid}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._pending.discard(uid)
+                queue.task_done()
+
+    async def drain(self) -> None:
+        """Wait until every queued claim write has been attempted."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+                "pending": len(self._pending),
+                "provisioned": len(self._provisioned),
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+
+profile_provisioner = ProfileProvisioner()
+register_metrics("profile_provisioner", profile_provisioner.stats)
@@ -0,0 +1,369 @@
+import os
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Callable
+
+from memory_store import ChatTurn, MemoryStore
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (
+    profile_id TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    title TEXT,
+    personality TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (profile_id, chat_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_chats_updated ON chats (profile_id, updated_at DESC);
+
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    profile_id TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    user_id TEXT,
+    personality TEXT,
+    message TEXT,
+    response TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_chat ON messages (profile_id, chat_id, seq DESC);
+
+CREATE TABLE IF NOT EXISTS summaries (
+    profile_id TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    compressed_memory TEXT NOT NULL,
+    PRIMARY KEY (profile_id, chat_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS delete_jobs (
+    job_id TEXT PRIMARY KEY,
+    record TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+_clock_lock = threading.Lock()
+_last_now = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _now() -> str:
+    # Strictly increasing within the process so updated_at ordering never ties
+    global _last_now
+    with _clock_lock:
+        now = datetime.now(timezone.utc)
+        if now <= _last_now:
+            now = _last_now + timedelta(microseconds=1)
+        _last_now = now
+        return now.isoformat()
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class SQLiteMemoryStore(MemoryStore):
+    """Conversation storage in a local SQLite database.
+
+    The database runs in WAL mode so readers never block the writer. Each
+    worker thread keeps its own connection; writes are serialized through a
+    lock because SQLite allows a single writer at a time anyway.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Database file; defaults to SQLITE_DB_PATH from config
+        """
+        if path is None:
+            from config import SQLITE_DB_PATH
+            path = SQLITE_DB_PATH
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._write_lock:
+            self._connection().executescript(SCHEMA)
+        logger.info(f"SQLite memory store ready at {os.path.abspath(path)}")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    async def _run(self, fn, *args):
+        return await asyncio.to_thread(fn, *args)
+
+    def _write(self, fn, *args):
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn, *args)
+                conn.execute("COMMIT")
+                return result
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    async def store_message(
+        self,
+        user_id: str,
+        profile_id: str = None,
+        personality: str = "swag",
+        message: str = None,
+        response: str = None,
+        chat_id: str = None
+    ) -> str:
+        """Store a message in SQLite, creating the chat if needed. Returns the chat ID."""
+        effective_user_id = profile_id or user_id
+
+        def write(conn: sqlite3.Connection) -> str:
+            nonlocal chat_id
+            now = _now()
+            if not chat_id:
+                chat_id = uuid.uuid4().hex[:20]
+                title = f"Chat {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+            else:
+                title = f"Continuation of chat {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+            conn.execute(
+                "INSERT INTO chats (profile_id, chat_id, title, personality, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (profile_id, chat_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (effective_user_id, chat_id, title, personality, now, now),
+            )
+            conn.execute(
+                "INSERT INTO messages (id, profile_id, chat_id, user_id, personality, message, response, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (uuid.uuid4().hex[:20], effective_user_id, chat_id, user_id, personality, message, response, now),
+            )
+            return chat_id
+
+        try:
+            return await self._run(self._write, write)
+        except Exception as e:
+            logger.error(f"Error storing message in SQLite: {str(e)}")
+            raise
+
+    async def get_chat_history(self, user_id: str, profile_id: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """List chats, most recently updated first, with their last message."""
+        effective_user_id = profile_id or user_id
+
+        def read() -> List[Dict[str, Any]]:
+            rows = self._connection().execute(
+                "SELECT c.chat_id, c.title, c.personality, c.created_at, c.updated_at, "
+                "m.message AS last_message, m.timestamp AS last_message_time "
+                "FROM chats c LEFT JOIN messages m ON m.seq = ("
+                "  SELECT seq FROM messages WHERE profile_id = c.profile_id AND chat_id = c.chat_id "
+                "  ORDER BY seq DESC LIMIT 1) "
+                "WHERE c.profile_id = ? ORDER BY c.updated_at DESC LIMIT ?",
+                (effective_user_id, limit),
+            ).fetchall()
+            result = []
+            for row in rows:
+                chat_data = {
+                    'id': row['chat_id'],
+                    'title': row['title'],
+                    'personality': row['personality'],
+                    'created_at': _parse(row['created_at']),
+                    'updated_at': _parse(row['updated_at']),
+                }
+                if row['last_message_time'] is not None:
+                    chat_data['last_message'] = row['last_message'] or ''
+                    chat_data['last_message_time'] = _parse(row['last_message_time'])
+                result.append(chat_data)
+            return result
+
+        try:
+            return await self._run(read)
+        except Exception as e:
+            logger.error(f"Error getting chat history from SQLite: {str(e)}")
+            raise
+
+    async def get_chat_messages(self, chat_id: str, user_id: str, profile_id: str = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the newest messages of a chat, newest first."""
+        effective_user_id = profile_id or user_id
+
+        def read() -> List[Dict[str, Any]]:
+            rows = self._connection().execute(
+                "SELECT id, user_id, personality, message, response, timestamp FROM messages "
+                "WHERE profile_id = ? AND chat_id = ? ORDER BY seq DESC LIMIT ?",
+                (effective_user_id, chat_id, limit),
+            ).fetchall()
+            return [{
+                'id': row['id'],
+                'user_id': row['user_id'],
+                'profile_id': effective_user_id,
+                'personality': row['personality'],
+                'message': row['message'],
+                'response': row['response'],
+                'timestamp': row['timestamp'],
+            } for row in rows]
+
+        try:
+            return await self._run(read)
+        except Exception as e:
+            logger.error(f"Error getting chat messages from SQLite: {str(e)}")
+            raise
+
+    async def get_recent_turns(self, chat_id: str, user_id: str, profile_id: str = None, limit: int = 100) -> List[ChatTurn]:
+        """Get the newest turns of a chat, newest first, projected to ChatTurn fields."""
+        effective_user_id = profile_id or user_id
+
+        def read() -> List[ChatTurn]:
+            cursor = self._connection().cursor()
+            # Plain tuples map straight onto ChatTurn without building Row objects
+            cursor.row_factory = None
+            rows = cursor.execute(
+                "SELECT id, message, response, timestamp FROM messages "
+                "WHERE profile_id = ? AND chat_id = ? ORDER BY seq DESC LIMIT ?",
+                (effective_user_id, chat_id, limit),
+            ).fetchall()
+            return [ChatTurn._make(row) for row in rows]
+
+        try:
+            return await self._run(read)
+        except Exception as e:
+            logger.error(f"Error getting chat turns from SQLite: {str(e)}")
+            raise
+
+    async def chat_exists(self, chat_id: str, user_id: str, profile_id: str = None) -> bool:
+        """Whether the chat exists."""
+        effective_user_id = profile_id or user_id
+
+        def read() -> bool:
+            row = self._connection().execute(
+                "SELECT 1 FROM chats WHERE profile_id = ? AND chat_id = ?",
+                (effective_user_id, chat_id),
+            ).fetchone()
+            return row is not None
+
+        return await self._run(read)
+
+    async def update_chat_title(self, chat_id: str, user_id: str, title: str, profile_id: str = None) -> bool:
+        """Update the title of an existing chat. Returns False if it does not exist."""
+        effective_user_id = profile_id or user_id
+
+        def write(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute(
+                "UPDATE chats SET title = ?, updated_at = ? WHERE profile_id = ? AND chat_id = ?",
+                (title, _now(), effective_user_id, chat_id),
+            )
+            return cursor.rowcount > 0
+
+        try:
+            return await self._run(self._write, write)
+        except Exception as e:
+            logger.error(f"Error updating chat title in SQLite: {str(e)}")
+            return False
+
+    async def delete_chat(
+        self,
+        chat_id: str,
+        user_id: str,
+        profile_id: str = None,
+        on_progress: Optional[Callable[[int], None]] = None
+    ) -> bool:
+        """Delete a chat, its messages and its compressed memory in one transaction."""
+        effective_user_id = profile_id or user_id
+        key = (effective_user_id, chat_id)
+
+        def write(conn: sqlite3.Connection) -> int:
+            deleted = conn.execute("DELETE FROM messages WHERE profile_id = ? AND chat_id = ?", key).rowcount
+            deleted += conn.execute("DELETE FROM chats WHERE profile_id = ? AND chat_id = ?", key).rowcount
+            deleted += conn.execute("DELETE FROM summaries WHERE profile_id = ? AND chat_id = ?", key).rowcount
+            return deleted
+
+        try:
+            deleted = await self._run(self._write, write)
+            if on_progress:
+                on_progress(deleted)
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting chat from SQLite: {str(e)}")
+            return False
+
+    async def store_compressed_memory(self, chat_id: str, user_id: str, profile_id: str, compressed_memory: list) -> bool:
+        """Store compressed (summarized) memory for a chat."""
+        effective_user_id = profile_id or user_id
+        payload = json.dumps(compressed_memory, ensure_ascii=False)
+
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT INTO summaries (profile_id, chat_id, compressed_memory) VALUES (?, ?, ?) "
+                "ON CONFLICT (profile_id, chat_id) DO UPDATE SET compressed_memory = excluded.compressed_memory",
+                (effective_user_id, chat_id, payload),
+            )
+
+        try:
+            await self._run(self._write, write)
+            return True
+        except Exception as e:
+            logger.error(f"Error storing compressed memory: {str(e)}")
+            return False
+
+    async def get_compressed_memory(self, chat_id: str, user_id: str, profile_id: str) -> list:
+        """Get compressed memory for a chat, or an empty list."""
+        effective_user_id = profile_id or user_id
+
+        def read() -> list:
+            row = self._connection().execute(
+                "SELECT compressed_memory FROM summaries WHERE profile_id = ? AND chat_id = ?",
+                (effective_user_id, chat_id),
+            ).fetchone()
+            return json.loads(row['compressed_memory']) if row else []
+
+        try:
+            return await self._run(read)
+        except Exception as e:
+            logger.error(f"Error retrieving compressed memory: {str(e)}")
+            return []
+
+    async def save_delete_job(self, record: Dict[str, Any]) -> bool:
+        """Store a deletion job's status, shared by every worker using this database file."""
+        payload = json.dumps(record)
+
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT INTO delete_jobs (job_id, record) VALUES (?, ?) "
+                "ON CONFLICT (job_id) DO UPDATE SET record = excluded.record",
+                (record['job_id'], payload),
+            )
+
+        try:
+            await self._run(self._write, write)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving delete job: {str(e)}")
+            return False
+
+    async def load_delete_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a deletion job's status, or None."""
+
+        def read() -> Optional[Dict[str, Any]]:
+            row = self._connection().execute(
+                "SELECT record FROM delete_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            return json.loads(row['record']) if row else None
+
+        try:
+            return await self._run(read)
+        except Exception as e:
+            logger.error(f"Error loading delete job: {str(e)}")
+            return None
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class SummaryCache:
+    """Read-through cache for compressed-memory summary documents.
+
+    Entries are keyed by (profile, chat) and carry the document's ``version``,
+    a counter incremented on every write. Within ``fresh_seconds`` of being
+    fetched or revalidated an entry is served without touching Firestore;
+    after that the caller compares versions before reusing it, so workers
+    that did not perform the write notice it. The version check projects a
+    single field, which saves transfer and decoding of the summary but is
+    still billed as a full document read. Entries never go back to an older
+    version, so a slow reader cannot replace a newer summary that was just
+    written. The cache is an LRU bounded by the approximate serialized size
+    of the cached values.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, fresh_seconds: float = 2.0):
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[int, Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(value: Any) -> int:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[int], Any, bool]:
+        """Return (version, value, fresh) for a cached key, or (None, None, False)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None, False
+            self._entries.move_to_end(key)
+            version, value, _, checked_at = entry
+            return version, value, time.monotonic() - checked_at < self.fresh_seconds
+
+    def put(self, key: Hashable, version: int, value: Any) -> None:
+        """Insert or replace an entry, evicting least recently used entries over the byte budget.
+
+        An entry already holding a newer version is kept as it is.
+        """
+        size = self._size(value)
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None and old[0] > version:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (version, value, size, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+                self.evictions += 1
+
+    def mark_fresh(self, key: Hashable) -> None:
+        """Record that the cached version was confirmed current."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = entry[:3] + (time.monotonic(),)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def record(self, outcome: str) -> None:
+        """Count a lookup outcome: "hit", "revalidated", "stale" or "miss"."""
+        with self._lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "revalidated":
+                self.hits += 1
+                self.revalidations += 1
+            elif outcome == "stale":
+                self.misses += 1
+                self.stale += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,359 @@
+"""
+In-process stand-in for the subset of the Firestore client used by the backend.
+
+It mirrors the shape of ``google.cloud.firestore_v1`` closely enough for the
+memory managers, benchmarks and contract tests to run without a Firebase
+project:
+
+- collection / document references with auto-generated ids
+- ``create``, ``set`` (with ``merge``), ``update``, ``delete`` and ``get(field_paths=...)``
+- queries with ``order_by``, ``start_at``, ``limit`` and ``select`` projection
+- write batches that enforce Firestore's 500-write and 10 MiB limits
+- transactions compatible with ``firestore.transactional``
+- ``SERVER_TIMESTAMP``, ``DELETE_FIELD``, ``Increment`` and ``ArrayUnion`` transforms
+
+An optional ``latency`` (seconds) is slept on every simulated round-trip so
+that concurrency behaviour can be benchmarked.
+"""
+import copy
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists
+
+MAX_BATCH_WRITES = 500
+MAX_BATCH_BYTES = 10 * 1024 * 1024
+
+
+class FakeFirestore:
+    """A minimal, thread-safe in-memory Firestore client."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._collections: Dict[Tuple[str, ...], Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.RLock()
+        self._txn_lock = threading.Lock()
+        self._clock = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.reads = 0
+        self.writes = 0
+        self.round_trips = 0
+
+    # -- client API -------------------------------------------------------
+
+    def collection(self, name: str) -> "FakeCollectionReference":
+        return FakeCollectionReference(self, (name,))
+
+    def batch(self) -> "FakeWriteBatch":
+        return FakeWriteBatch(self)
+
+    def transaction(self, **kwargs) -> "FakeTransaction":
+        return FakeTransaction(self, **kwargs)
+
+    def get_all(self, references, field_paths: Optional[List[str]] = None, transaction=None):
+        self._round_trip()
+        for reference in references:
+            data = self._read(reference._path)
+            if data is not None and field_paths is not None:
+                data = {k: v for k, v in data.items() if k in field_paths}
+            yield FakeDocumentSnapshot(reference, data)
+
+    # -- internals --------------------------------------------------------
+
+    def _round_trip(self) -> None:
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _now(self) -> datetime:
+        # Strictly increasing so ordering by server timestamp is stable
+        with self._lock:
+            self._clock += timedelta(microseconds=1)
+            return self._clock
+
+    def _read(self, path: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self.reads += 1
+            data = self._collections.get(path[:-1], {}).get(path[-1])
+            return copy.deepcopy(data) if data is not None else None
+
+    def _resolve(self, value: Any, current: Any = None) -> Any:
+        if value is firestore.SERVER_TIMESTAMP:
+            return self._now()
+        if isinstance(value, firestore.Increment):
+            return (current or 0) + value.value
+        if isinstance(value, firestore.ArrayUnion):
+            merged = list(current or [])
+            merged.extend(copy.deepcopy(v) for v in value.values if v not in merged)
+            return merged
+        if isinstance(value, dict):
+            return {k: self._resolve(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._resolve(v) for v in value]
+        return copy.deepcopy(value)
+
+    def _apply(self, op: str, path: Tuple[str, ...], data: Optional[Dict[str, Any]] = None,
+               merge: bool = False) -> None:
+        with self._lock:
+            self.writes += 1
+            docs = self._collections.setdefault(path[:-1], {})
+            existing = docs.get(path[-1])
+            if op == "delete":
+                docs.pop(path[-1], None)
+                return
+            if op == "update" and existing is None:
+                raise KeyError(f"No document to update: {'/'.join(path)}")
+            if op == "create" and existing is not None:
+                raise AlreadyExists(f"Document already exists: {'/'.join(path)}")
+            if op in ("set", "create") and not merge:
+                existing = {}
+            updated = dict(existing or {})
+            for key, value in data.items():
+                if value is firestore.DELETE_FIELD:
+                    updated.pop(key, None)
+                else:
+                    updated[key] = self._resolve(value, updated.get(key))
+            docs[path[-1]] = updated
+
+    def _apply_all(self, ops) -> None:
+        # Writes in one commit are atomic: check every precondition first
+        with self._lock:
+            for op, path, data, merge in ops:
+                if op == "create" and self._collections.get(path[:-1], {}).get(path[-1]) is not None:
+                    raise AlreadyExists(f"Document already exists: {'/'.join(path)}")
+            for op, path, data, merge in ops:
+                self._apply(op, path, data, merge=merge)
+
+    def _child_ids(self, path: Tuple[str, ...]) -> List[str]:
+        # Like list_documents(), include "missing" parents that only hold subcollections
+        with self._lock:
+            ids = set(self._collections.get(path, {}))
+            ids.update(p[len(path)] for p in self._collections if len(p) > len(path) and p[:len(path)] == path)
+            return sorted(ids)
+
+    def _list(self, path: Tuple[str, ...]) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            docs = self._collections.get(path, {})
+            return [(doc_id, copy.deepcopy(data)) for doc_id, data in docs.items()]
+
+    def document_count(self) -> int:
+        with self._lock:
+            return sum(len(docs) for docs in self._collections.values())
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference: "FakeDocumentReference", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        # Like the real client, every call returns a fresh deep copy
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+
+class FakeDocumentReference:
+    def __init__(self, client: FakeFirestore, path: Tuple[str, ...]):
+        self._client = client
+        self._path = path
+
+    @property
+    def id(self) -> str:
+        return self._path[-1]
+
+    @property
+    def path(self) -> str:
+        return "/".join(self._path)
+
+    def collection(self, name: str) -> "FakeCollectionReference":
+        return FakeCollectionReference(self._client, self._path + (name,))
+
+    def get(self, field_paths: Optional[List[str]] = None, transaction=None) -> FakeDocumentSnapshot:
+        self._client._round_trip()
+        data = self._client._read(self._path)
+        if data is not None and field_paths is not None:
+            data = {k: v for k, v in data.items() if k in field_paths}
+        return FakeDocumentSnapshot(self, data)
+
+    def create(self, data: Dict[str, Any]) -> None:
+        self._client._round_trip()
+        self._client._apply("create", self._path, data)
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        self._client._round_trip()
+        self._client._apply("set", self._path, data, merge=merge)
+
+    def update(self, data: Dict[str, Any]) -> None:
+        self._client._round_trip()
+        self._client._apply("update", self._path, data)
+
+    def delete(self) -> None:
+        self._client._round_trip()
+        self._client._apply("delete", self._path)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FakeDocumentReference) and other._path == self._path
+
+    def __hash__(self) -> int:
+        return hash(self._path)
+
+
+class FakeQuery:
+    def __init__(self, client: FakeFirestore, path: Tuple[str, ...], orders=(), limit_to=None,
+                 fields=None, start=None):
+        self._client = client
+        self._path = path
+        self._orders = orders
+        self._limit = limit_to
+        self._fields = fields
+        self._start = start
+
+    def _copy(self, **changes) -> "FakeQuery":
+        state = dict(orders=self._orders, limit_to=self._limit, fields=self._fields, start=self._start)
+        state.update(changes)
+        return FakeQuery(self._client, self._path, **state)
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "FakeQuery":
+        return self._copy(orders=self._orders + ((field, direction),))
+
+    def start_at(self, document_fields: Dict[str, Any]) -> "FakeQuery":
+        # Ascending orders only, which is all the backend uses
+        return self._copy(start=dict(document_fields))
+
+    def limit(self, count: int) -> "FakeQuery":
+        return self._copy(limit_to=count)
+
+    def select(self, field_paths: List[str]) -> "FakeQuery":
+        return self._copy(fields=list(field_paths))
+
+    def stream(self, transaction=None):
+        self._client._round_trip()
+        docs = self._client._list(self._path)
+        for field, direction in reversed(self._orders):
+            docs.sort(
+                key=lambda item: (item[1].get(field) is not None, item[1].get(field)),
+                reverse=str(direction).upper().startswith("DESC"),
+            )
+        if self._start is not None:
+            fields = [field for field, _ in self._orders if field in self._start]
+            start = tuple(self._start[field] for field in fields)
+            docs = [item for item in docs
+                    if all(item[1].get(f) is not None for f in fields)
+                    and tuple(item[1].get(f) for f in fields) >= start]
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        with self._client._lock:
+            # Billed per document returned, like the real service
+            self._client.reads += len(docs)
+        for doc_id, data in docs:
+            if self._fields is not None:
+                data = {k: v for k, v in data.items() if k in self._fields}
+            yield FakeDocumentSnapshot(FakeDocumentReference(self._client, self._path + (doc_id,)), data)
+
+    def get(self, transaction=None) -> List[FakeDocumentSnapshot]:
+        return list(self.stream(transaction=transaction))
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client: FakeFirestore, path: Tuple[str, ...]):
+        super().__init__(client, path)
+
+    @property
+    def id(self) -> str:
+        return self._path[-1]
+
+    def document(self, document_id: Optional[str] = None) -> FakeDocumentReference:
+        return FakeDocumentReference(self._client, self._path + (document_id or uuid.uuid4().hex[:20],))
+
+    def list_documents(self):
+        self._client._round_trip()
+        return [FakeDocumentReference(self._client, self._path + (doc_id,))
+                for doc_id in self._client._child_ids(self._path)]
+
+
+class FakeWriteBatch:
+    def __init__(self, client: FakeFirestore):
+        self._client = client
+        self._ops = []
+
+    def create(self, reference: FakeDocumentReference, data: Dict[str, Any]) -> None:
+        self._ops.append(("create", reference._path, data, False))
+
+    def set(self, reference: FakeDocumentReference, data: Dict[str, Any], merge: bool = False) -> None:
+        self._ops.append(("set", reference._path, data, merge))
+
+    def update(self, reference: FakeDocumentReference, data: Dict[str, Any]) -> None:
+        self._ops.append(("update", reference._path, data, False))
+
+    def delete(self, reference: FakeDocumentReference) -> None:
+        self._ops.append(("delete", reference._path, None, False))
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    def commit(self) -> list:
+        if len(self._ops) > MAX_BATCH_WRITES:
+            raise ValueError(f"maximum {MAX_BATCH_WRITES} writes allowed per request")
+        # Approximate request size: the serialized document data
+        size = sum(len(json.dumps(data, default=str)) for _, _, data, _ in self._ops if data)
+        if size > MAX_BATCH_BYTES:
+            raise ValueError(f"request payload size exceeds the limit: {MAX_BATCH_BYTES} bytes")
+        self._client._round_trip()
+        self._client._apply_all(self._ops)
+        committed, self._ops = self._ops, []
+        return committed
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Serialisable transaction compatible with ``firestore.transactional``.
+
+    Transactions hold a client-wide lock from ``_begin`` until commit or
+    rollback, which gives the same isolation guarantees the real service
+    provides through optimistic retries.
+    """
+
+    def __init__(self, client: FakeFirestore, max_attempts: int = 5, read_only: bool = False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+
+    def _clean_up(self) -> None:
+        self._ops = []
+        self._id = None
+
+    def _begin(self, retry_id=None) -> None:
+        self._client._txn_lock.acquire()
+        self._id = uuid.uuid4().bytes
+
+    def _commit(self) -> list:
+        try:
+            self._client._apply_all(self._ops)
+            committed = self._ops
+            return committed
+        finally:
+            self._release()
+
+    def _rollback(self) -> None:
+        self._release()
+
+    def _release(self) -> None:
+        self._ops = []
+        if self._id is not None:
+            self._id = None
+            self._client._txn_lock.release()
+
+    def get(self, reference: FakeDocumentReference):
+        yield reference.get()
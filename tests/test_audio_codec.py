@@ -0,0 +1,97 @@
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import audio_codec
+from app.services.audio_codec import (
+    AudioCodecError,
+    PCMFormat,
+    assemble_wav,
+    encode_speech,
+    fix_wav_header,
+    negotiate_format,
+    transcode,
+    wav_header,
+    wav_samples,
+)
+
+
+def _piped_wav(samples: bytes, extra_chunk: bytes = b"") -> bytes:
+    """WAV as ffmpeg writes it to a pipe: both sizes left as 0xFFFFFFFF."""
+    fmt = struct.pack("<HHIIHH", 1, 1, 16000, 32000, 2, 16)
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        + extra_chunk
+        + b"data" + struct.pack("<I", 0xFFFFFFFF) + samples
+    )
+
+
+def test_fix_wav_header_patches_riff_and_data_sizes():
+    samples = b"\x01\x00" * 100
+    info = b"LIST" + struct.pack("<I", 5) + b"INFO!" + b"\x00"  # odd size, padded
+    fixed = fix_wav_header(_piped_wav(samples, info))
+
+    assert struct.unpack_from("<I", fixed, 4)[0] == len(fixed) - 8
+    data_offset = fixed.index(b"data")
+    assert struct.unpack_from("<I", fixed, data_offset + 4)[0] == len(samples)
+    assert fixed[data_offset + 8:] == samples
+
+
+def test_fix_wav_header_leaves_other_formats_alone():
+    assert fix_wav_header(b"OggS\x00\x02") == b"OggS\x00\x02"
+
+
+def test_transcode_reports_missing_ffmpeg(monkeypatch):
+    monkeypatch.setattr(audio_codec, "FFMPEG_BINARY", "/nonexistent/ffmpeg")
+    with pytest.raises(AudioCodecError, match="not found"):
+        transcode(b"\xff\xfb", "mp3", "wav")
+
+
+def test_negotiate_format():
+    assert negotiate_format(None, None, "wav") == "wav"
+    assert negotiate_format("*/*", None, "wav") == "wav"
+    assert negotiate_format("application/json, text/plain, */*", None, "mp3") == "mp3"
+    assert negotiate_format("audio/ogg;codecs=opus, audio/mpeg;q=0.8", None, "wav") == "ogg"
+    assert negotiate_format("audio/wav;q=0.5, audio/mpeg", None, "wav") == "mp3"
+    assert negotiate_format('audio/ogg; codecs="vorbis", audio/wav;q=0.1', None, "mp3") == "wav"
+    # The request field beats the Accept header; unknown names are rejected
+    assert negotiate_format("audio/wav", "opus", "wav") == "ogg"
+    assert negotiate_format("audio/wav", "flac", "wav") is None
+
+
+def test_mp3_passes_through_without_ffmpeg(monkeypatch):
+    monkeypatch.setattr(audio_codec, "FFMPEG_BINARY", "/nonexistent/ffmpeg")
+    assert encode_speech(b"\xff\xfbmp3", "mp3") == b"\xff\xfbmp3"
+
+
+def test_assemble_wav_writes_one_header_and_all_samples():
+    mono = PCMFormat(24000, 1, 2)
+    chunks = [wav_header(mono, 4) + b"\x01\x00\x02\x00", _piped_wav(b"\x03\x00")]
+    chunks[1] = chunks[1][:24] + struct.pack("<I", 24000) + chunks[1][28:]  # match rate of the first
+
+    assembled = assemble_wav(chunks)
+    pcm_format, samples = wav_samples(assembled)
+    assert assembled.count(b"RIFF") == 1
+    assert pcm_format == mono
+    assert bytes(samples) == b"\x01\x00\x02\x00\x03\x00"
+    assert struct.unpack_from("<I", assembled, 4)[0] == len(assembled) - 8
+
+
+def test_assemble_wav_resamples_mismatched_chunks(monkeypatch):
+    first, other = PCMFormat(24000, 1, 2), PCMFormat(22050, 1, 2)
+    converted = []
+
+    def fake_resample(data, pcm_format):
+        converted.append(pcm_format)
+        return wav_header(pcm_format, 2) + b"\x09\x00"
+
+    monkeypatch.setattr(audio_codec, "resample_wav", fake_resample)
+    assembled = assemble_wav([wav_header(first, 2) + b"\x01\x00", wav_header(other, 4) + b"\x05\x00\x06\x00"])
+    assert converted == [first]
+    assert bytes(wav_samples(assembled)[1]) == b"\x01\x00\x09\x00"
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.api.endpoints import speech
+from app.services import audio_upload
+from app.services.audio_upload import (
+    UnsupportedAudioError, UploadTooLargeError, ingest_audio, sniff_audio_format
+)
+
+WAV_HEAD = b"RIFF\x24\x00\x00\x00WAVEfmt "
+
+
+async def _chunks(parts, consumed):
+    for part in parts:
+        consumed.append(part)
+        yield part
+
+
+def _ingest(parts, **kwargs):
+    consumed = []
+    upload = asyncio.run(ingest_audio(_chunks(parts, consumed), **kwargs))
+    return upload, consumed
+
+
+def test_sniff_audio_format():
+    assert sniff_audio_format(WAV_HEAD) == "wav"
+    assert sniff_audio_format(b"ID3\x04\x00\x00\x00\x00\x00\x00\x00\x00") == "mp3"
+    assert sniff_audio_format(b"\xff\xfb\x90\x64" + b"\x00" * 8) == "mp3"
+    assert sniff_audio_format(b"\xff\xf1\x50\x80" + b"\x00" * 8) == "aac"
+    assert sniff_audio_format(b"OggS\x00\x02" + b"\x00" * 6) == "ogg"
+    assert sniff_audio_format(b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01\x42\xf7\x81") == "webm"
+    assert sniff_audio_format(b"\x00\x00\x00\x20ftypM4A ") == "mp4"
+    assert sniff_audio_format(b"%PDF-1.7\n%\xe2\xe3") is None
+    assert sniff_audio_format(b"<html><body>") is None
+
+
+def test_small_upload_stays_in_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_upload, "UPLOAD_DIR", str(tmp_path))
+    upload, _ = _ingest([WAV_HEAD[:5], WAV_HEAD[5:], b"\x00" * 100], spool_bytes=1024)
+    assert upload.audio_format == "wav"
+    assert not upload.spooled
+    assert upload.source == WAV_HEAD + b"\x00" * 100
+    assert os.listdir(tmp_path) == []
+
+
+def test_large_upload_is_spooled_and_removed_on_close(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_upload, "UPLOAD_DIR", str(tmp_path))
+    parts = [WAV_HEAD] + [b"\x01" * 300] * 5
+    upload, _ = _ingest(parts, spool_bytes=512)
+    assert upload.spooled and upload.size == len(WAV_HEAD) + 1500
+    assert os.path.dirname(upload.source) == str(tmp_path)
+    with open(upload.source, "rb") as f:
+        assert f.read() == b"".join(parts)
+    upload.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_ingest_rejects_early():
+    # Declared too large: nothing is read
+    with pytest.raises(UploadTooLargeError):
+        _ingest([WAV_HEAD], max_bytes=10, declared_length=11)
+
+    consumed = []
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(ingest_audio(_chunks([WAV_HEAD, b"\x00" * 64, b"\x00" * 64, b"never read"], consumed), max_bytes=100))
+    assert len(consumed) == 3
+
+    consumed = []
+    with pytest.raises(UnsupportedAudioError):
+        asyncio.run(ingest_audio(_chunks([b"<html><body>hello", b"never read"], consumed)))
+    assert len(consumed) == 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    received = []
+
+    async def fake_transcribe(audio_file, language="en", engine=None):
+        received.append(audio_file)
+        return "namaste", None
+
+    monkeypatch.setattr(speech.stt_service, "transcribe_audio", fake_transcribe)
+    app = FastAPI()
+    app.include_router(speech.router, prefix="/api/speech")
+    return TestClient(app), received
+
+
+def test_stream_endpoint(client, monkeypatch):
+    client, received = client
+    body = WAV_HEAD + b"\x00" * 200
+    response = client.post("/api/speech/stt/stream?language=hi", content=body, headers={"Content-Type": "audio/wav"})
+    assert response.status_code == 200
+    assert response.json()["text"] == "namaste"
+    assert received == [body]
+
+    monkeypatch.setattr(audio_upload, "STT_MAX_UPLOAD_BYTES", 100)
+    assert client.post("/api/speech/stt/stream", content=body, headers={"Content-Type": "audio/wav"}).status_code == 413
+    assert client.post("/api/speech/stt/stream", content=b"<html><body>hi</body>", headers={"Content-Type": "audio/wav"}).status_code == 415
+    assert client.post("/api/speech/stt/stream", content=body, headers={"Content-Type": "text/plain"}).status_code == 415
+
+
+def test_multipart_endpoint_uses_the_same_checks(client):
+    client, received = client
+    files = {"audio": ("clip.wav", WAV_HEAD + b"\x00" * 10, "audio/wav")}
+    assert client.post("/api/speech/stt", files=files).status_code == 200
+    files = {"audio": ("clip.wav", b"not audio at all", "audio/wav")}
+    assert client.post("/api/speech/stt", files=files).status_code == 415
+    assert len(received) == 1
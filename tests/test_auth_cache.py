@@ -0,0 +1,47 @@
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from auth_cache import TokenCache, UserRecordCache
+
+
+def test_token_cache_serves_until_exp():
+    cache = TokenCache(max_entries=10)
+    cache.put("token-a", {"uid": "u1", "exp": time.time() + 60})
+    cache.put("token-b", {"uid": "u1", "exp": time.time() - 1})
+
+    assert cache.get("token-a")["uid"] == "u1"
+    assert cache.get("token-b") is None
+    assert cache.get("token-c") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+    assert "token-a" not in cache._entries
+
+
+def test_token_cache_is_bounded_and_invalidates_by_user():
+    cache = TokenCache(max_entries=2)
+    exp = time.time() + 60
+    cache.put("t1", {"uid": "u1", "exp": exp})
+    cache.put("t2", {"uid": "u2", "exp": exp})
+    cache.get("t1")
+    cache.put("t3", {"uid": "u1", "exp": exp})
+
+    assert cache.get("t2") is None
+    assert cache.stats()["evictions"] == 1
+    cache.invalidate_user("u1")
+    assert cache.stats()["entries"] == 0
+
+
+def test_user_record_cache_expires_after_ttl():
+    cache = UserRecordCache(max_entries=10, ttl_seconds=0.05)
+    cache.put("u1", object())
+    assert cache.get("u1") is not None
+    cache.invalidate("u1")
+    assert cache.get("u1") is None
+
+    cache.put("u1", object())
+    time.sleep(0.06)
+    assert cache.get("u1") is None
@@ -0,0 +1,56 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import auth_context
+from auth_cache import user_record_cache
+
+
+def _fail_get_user(uid):
+    raise AssertionError("user record should not be fetched")
+
+
+def test_claims_context_makes_no_auth_calls(monkeypatch):
+    monkeypatch.setattr(auth_context.auth, "get_user", _fail_get_user)
+    decoded = {
+        "uid": "u1",
+        "email": "u1@example.com",
+        "email_verified": True,
+        "profile_id": "u1_google.com",
+        "firebase": {"sign_in_provider": "google.com"},
+    }
+
+    user_data = asyncio.run(auth_context.user_data_from_claims(decoded))
+
+    assert user_data == {
+        "uid": "u1",
+        "email": "u1@example.com",
+        "email_verified": True,
+        "profile_id": "u1_google.com",
+        "sign_in_provider": "google.com",
+    }
+
+
+def test_claims_without_profile_id_fall_back_to_user_record(monkeypatch):
+    requested = []
+    monkeypatch.setattr(auth_context.profile_provisioner, "request", lambda *args: requested.append(args))
+    record = SimpleNamespace(
+        uid="u2", email=None, email_verified=False, display_name=None, phone_number="+91000",
+        photo_url=None, disabled=False, custom_claims=None,
+        provider_data=[SimpleNamespace(provider_id="phone")],
+    )
+    user_record_cache.put("u2", record)
+    try:
+        user_data = asyncio.run(auth_context.user_data_from_claims({"uid": "u2", "firebase": {"sign_in_provider": "phone"}}))
+        full = asyncio.run(auth_context.load_full_user(user_data))
+    finally:
+        user_record_cache.invalidate("u2")
+
+    assert user_data["profile_id"] == "u2_phone"
+    assert full["profile_id"] == "u2_phone"
+    assert full["phone_number"] == "+91000"
+    assert requested[0] == ("u2", "u2_phone", {})
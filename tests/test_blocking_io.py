@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from blocking_io import BlockingPool, PoolSaturatedError, ProcessPool, get_pool, run_blocking
+
+
+def test_slow_pool_does_not_starve_other_pools():
+    slow = BlockingPool("slow", max_workers=2)
+    fast = BlockingPool("fast", max_workers=2)
+    release = threading.Event()
+
+    async def scenario():
+        stuck = [asyncio.ensure_future(slow.run(release.wait)) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        assert await fast.run(lambda: "ok") == "ok"
+        fast_latency = time.perf_counter() - start
+        assert slow.stats()["active"] == 2
+        assert slow.stats()["queued"] == 2
+        release.set()
+        await asyncio.gather(*stuck)
+        return fast_latency
+
+    assert asyncio.run(scenario()) < 0.5
+    stats = slow.stats()
+    assert stats["completed"] == 4
+    assert stats["saturated"] == 2
+    assert stats["active"] == stats["queued"] == 0
+    assert stats["queue_time"]["count"] == 4
+    slow.shutdown()
+    fast.shutdown()
+
+
+def test_errors_propagate_and_are_counted():
+    pool = BlockingPool("errors", max_workers=1)
+
+    def fail():
+        raise KeyError("missing")
+
+    with pytest.raises(KeyError):
+        asyncio.run(pool.run(fail))
+    assert pool.stats()["failed"] == 1
+    pool.shutdown()
+
+
+def test_named_pools_are_shared_and_validated():
+    assert get_pool("firestore") is get_pool("firestore")
+    assert asyncio.run(run_blocking("auth", sum, [1, 2, 3])) == 6
+    with pytest.raises(ValueError):
+        get_pool("nonexistent")
+
+
+def test_full_queue_rejects_new_calls():
+    pool = BlockingPool("bounded", max_workers=1, max_queue=2)
+    release = threading.Event()
+
+    async def scenario():
+        accepted = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolSaturatedError):
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*accepted)
+
+    asyncio.run(scenario())
+    stats = pool.stats()
+    assert stats["completed"] == 3
+    assert stats["rejected"] == 1
+    assert stats["queued"] == 0
+    pool.shutdown()
+
+
+def test_process_pool_runs_calls_in_workers_with_timeout():
+    pool = ProcessPool("decode", max_workers=2, max_queue=1)
+
+    async def scenario():
+        pids = await asyncio.gather(*(pool.run(os.getpid) for _ in range(2)))
+        assert os.getpid() not in pids
+        with pytest.raises(TimeoutError):
+            await pool.run(time.sleep, 1.0, timeout=0.1)
+        # One worker is still sleeping; with one call waiting the queue is full
+        busy = [asyncio.ensure_future(pool.run(time.sleep, 0.3)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolSaturatedError):
+            await pool.run(os.getpid)
+        await asyncio.gather(*busy)
+
+    try:
+        asyncio.run(scenario())
+        stats = pool.stats()
+        assert stats["timed_out"] == 1
+        assert stats["rejected"] == 1
+        assert stats["completed"] >= 4
+        assert stats["run_time"]["count"] >= 4
+    finally:
+        pool.shutdown()
@@ -0,0 +1,74 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import chat_deletion
+import memory_store
+from chat_deletion import delete_chat_tree, get_delete_job, start_delete_job
+from firebase_memory_manager import FirestoreMemoryStore
+from tests.fake_firestore import FakeFirestore
+
+
+def _seed_chat(db, messages):
+    user_ref = db.collection('users').document('profile_1')
+    chat_ref = user_ref.collection('chats').document('chat_1')
+    chat_ref.set({'title': 'test'})
+    for i in range(messages):
+        chat_ref.collection('messages').document().set({'message': f"m{i}"})
+    summary_ref = user_ref.collection('summary').document('chat_1')
+    summary_ref.set({'compressed_memory': [{'role': 'user', 'content': 'hi'}]})
+    return chat_ref, summary_ref
+
+
+def test_delete_chat_tree_handles_more_than_one_batch():
+    db = FakeFirestore()
+    chat_ref, summary_ref = _seed_chat(db, 1200)
+
+    deleted = asyncio.run(delete_chat_tree(db, chat_ref, summary_ref, batch_size=450, max_parallel=3))
+
+    assert deleted == 1202
+    assert db.document_count() == 0
+
+
+def test_delete_job_reports_status_to_owner_only():
+    db = FakeFirestore()
+    chat_ref, summary_ref = _seed_chat(db, 10)
+
+    async def scenario():
+        job = await start_delete_job('chat_1', 'profile_1', lambda job: delete_chat_tree(db, chat_ref, summary_ref))
+        assert job.status == "pending"
+        assert get_delete_job(job.id, owner_id='someone_else') is None
+        while get_delete_job(job.id, owner_id='profile_1').status in ("pending", "running"):
+            await asyncio.sleep(0.01)
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "completed"
+    assert job.deleted == 12
+    assert not summary_ref.get().exists
+
+
+def test_delete_job_status_is_readable_from_another_worker():
+    store = FirestoreMemoryStore(db=FakeFirestore())
+    memory_store.set_memory_store(store)
+    try:
+        async def scenario():
+            chat_id = await store.store_message("uid", "profile_1", "swag", "hi", "yo", None)
+            assert await memory_store.start_delete_chat("missing", "uid", "profile_1") is None
+            job = await memory_store.start_delete_chat(chat_id, "uid", "profile_1")
+            while get_delete_job(job["job_id"]).status in ("pending", "running"):
+                await asyncio.sleep(0.01)
+            # A worker that did not start the job only has the saved record
+            chat_deletion._jobs.clear()
+            assert await memory_store.get_delete_job(job["job_id"], owner_id="someone_else") is None
+            return await memory_store.get_delete_job(job["job_id"], owner_id="profile_1")
+
+        job = asyncio.run(scenario())
+    finally:
+        memory_store.set_memory_store(None)
+    assert job.status == "completed"
+    # Chat document, its message and its summary slot
+    assert job.deleted == 3
@@ -0,0 +1,155 @@
+"""
+Contract tests shared by every MemoryStore backend.
+
+Each test runs against the Firestore implementations (per-message and paged
+layouts, backed by the in-memory fake) and the SQLite implementation, so all
+of them must behave identically.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from firebase_memory_manager import FirestoreMemoryStore
+from firebase_paged_memory_manager import PagedFirestoreMemoryStore
+from sqlite_memory_manager import SQLiteMemoryStore
+from tests.fake_firestore import FakeFirestore
+
+
+@pytest.fixture(params=["firestore", "firestore_paged", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "firestore":
+        return FirestoreMemoryStore(db=FakeFirestore())
+    if request.param == "firestore_paged":
+        # Small pages so multi-page reads are exercised
+        return PagedFirestoreMemoryStore(db=FakeFirestore(), page_size=2)
+    return SQLiteMemoryStore(path=str(tmp_path / "memory.db"))
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_store_message_creates_chat_and_appends(store):
+    chat_id = run(store.store_message("uid", "profile", "swag", "hello", "yo", None))
+    assert chat_id
+    same_id = run(store.store_message("uid", "profile", "swag", "again", "yo yo", chat_id))
+    assert same_id == chat_id
+
+    messages = run(store.get_chat_messages(chat_id, "uid", "profile"))
+    assert [m["message"] for m in messages] == ["again", "hello"]
+    assert messages[0]["response"] == "yo yo"
+    assert messages[0]["personality"] == "swag"
+    assert isinstance(messages[0]["timestamp"], str)
+    assert messages[0]["id"]
+
+
+def test_store_message_with_unknown_chat_id_creates_it(store):
+    chat_id = run(store.store_message("uid", "profile", "ceo", "hi", "hello", "client-chat-id"))
+    assert chat_id == "client-chat-id"
+    history = run(store.get_chat_history("uid", "profile"))
+    assert [c["id"] for c in history] == ["client-chat-id"]
+    assert history[0]["personality"] == "ceo"
+
+
+def test_get_chat_messages_respects_limit(store):
+    chat_id = None
+    for i in range(5):
+        chat_id = run(store.store_message("uid", "profile", "swag", f"m{i}", f"r{i}", chat_id))
+    messages = run(store.get_chat_messages(chat_id, "uid", "profile", limit=2))
+    assert [m["message"] for m in messages] == ["m4", "m3"]
+
+
+def test_chat_history_orders_by_update_and_includes_last_message(store):
+    first = run(store.store_message("uid", "profile", "swag", "a1", "r", None))
+    second = run(store.store_message("uid", "profile", "swag", "b1", "r", None))
+    run(store.store_message("uid", "profile", "swag", "a2", "r", first))
+
+    history = run(store.get_chat_history("uid", "profile"))
+    assert [c["id"] for c in history] == [first, second]
+    assert history[0]["last_message"] == "a2"
+    assert history[0]["last_message_time"] is not None
+    assert history[0]["title"]
+
+    assert len(run(store.get_chat_history("uid", "profile", limit=1))) == 1
+
+
+def test_profile_isolation(store):
+    chat_id = run(store.store_message("uid", "profile_a", "swag", "secret", "r", None))
+    assert run(store.get_chat_history("uid", "profile_b")) == []
+    assert run(store.get_chat_messages(chat_id, "uid", "profile_b")) == []
+    assert run(store.get_compressed_memory(chat_id, "uid", "profile_b")) == []
+
+
+def test_messages_carry_the_effective_profile_id(store):
+    # Without a profile id, data is isolated under the user id
+    chat_id = run(store.store_message("uid", None, "swag", "hi", "r", None))
+    messages = run(store.get_chat_messages(chat_id, "uid", ""))
+    assert [m["profile_id"] for m in messages] == ["uid"]
+
+    chat_id = run(store.store_message("uid", "profile", "swag", "hi", "r", None))
+    assert [m["profile_id"] for m in run(store.get_chat_messages(chat_id, "uid", "profile"))] == ["profile"]
+
+
+def test_update_chat_title(store):
+    chat_id = run(store.store_message("uid", "profile", "swag", "hi", "r", None))
+    assert run(store.update_chat_title(chat_id, "uid", "Renamed", "profile")) is True
+    assert run(store.get_chat_history("uid", "profile"))[0]["title"] == "Renamed"
+    assert run(store.update_chat_title("missing", "uid", "Nope", "profile")) is False
+
+
+def test_compressed_memory_round_trip(store):
+    memory = [{"role": "user", "content": "I am 1.6 cm tall"}, {"role": "assistant", "content": "noted"}]
+    assert run(store.get_compressed_memory("chat", "uid", "profile")) == []
+    assert run(store.store_compressed_memory("chat", "uid", "profile", memory)) is True
+    assert run(store.get_compressed_memory("chat", "uid", "profile")) == memory
+    assert run(store.store_compressed_memory("chat", "uid", "profile", memory[:1])) is True
+    assert run(store.get_compressed_memory("chat", "uid", "profile")) == memory[:1]
+
+
+def test_delete_chat_removes_messages_and_summary(store):
+    keep = run(store.store_message("uid", "profile", "swag", "keep", "r", None))
+    chat_id = None
+    for i in range(3):
+        chat_id = run(store.store_message("uid", "profile", "swag", f"m{i}", "r", chat_id))
+    run(store.store_compressed_memory(chat_id, "uid", "profile", [{"role": "user", "content": "x"}]))
+
+    progress = []
+    assert run(store.delete_chat(chat_id, "uid", "profile", on_progress=progress.append)) is True
+    assert progress
+    assert run(store.get_chat_messages(chat_id, "uid", "profile")) == []
+    assert run(store.get_compressed_memory(chat_id, "uid", "profile")) == []
+    assert [c["id"] for c in run(store.get_chat_history("uid", "profile"))] == [keep]
+
+
+def test_chat_exists(store):
+    chat_id = run(store.store_message("uid", "profile", "swag", "hi", "yo", None))
+    assert run(store.chat_exists(chat_id, "uid", "profile")) is True
+    assert run(store.chat_exists(chat_id, "uid", "other")) is False
+    assert run(store.delete_chat(chat_id, "uid", "profile")) is True
+    assert run(store.chat_exists(chat_id, "uid", "profile")) is False
+
+
+def test_delete_job_records_round_trip(store):
+    record = {"job_id": "job", "chat_id": "chat", "owner_id": "profile", "status": "running",
+              "deleted": 0, "error": None, "created_at": 1.0, "finished_at": None}
+    assert run(store.load_delete_job("job")) is None
+    assert run(store.save_delete_job(record)) is True
+    assert run(store.save_delete_job({**record, "status": "completed", "deleted": 3, "finished_at": 2.0})) is True
+    assert run(store.load_delete_job("job")) == {**record, "status": "completed", "deleted": 3, "finished_at": 2.0}
+
+
+def test_get_recent_turns_projects_context_fields(store):
+    chat_id = None
+    for i in range(3):
+        chat_id = run(store.store_message("uid", "profile", "swag", f"m{i}", f"r{i}", chat_id))
+
+    turns = run(store.get_recent_turns(chat_id, "uid", "profile", limit=2))
+    assert [(t.message, t.response) for t in turns] == [("m2", "r2"), ("m1", "r1")]
+    assert all(isinstance(t.timestamp, str) and t.id for t in turns)
+    assert not hasattr(turns[0], "__dict__")
+    assert run(store.get_recent_turns(chat_id, "uid", "other_profile")) == []
@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from metrics import get_metrics, register_metrics, require_metrics_token
+
+
+def _client():
+    app = FastAPI()
+
+    @app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+    async def metrics():
+        return get_metrics()
+
+    return TestClient(app)
+
+
+def test_metrics_are_disabled_without_a_token(monkeypatch):
+    monkeypatch.setattr(config, "METRICS_TOKEN", "")
+    assert _client().get("/metrics", headers={"Authorization": "Bearer "}).status_code == 404
+
+
+def test_metrics_need_the_bearer_token(monkeypatch):
+    monkeypatch.setattr(config, "METRICS_TOKEN", "s3cret")
+    register_metrics("test_section", lambda: {"value": 1})
+    client = _client()
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert response.json()["test_section"] == {"value": 1}
@@ -0,0 +1,172 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from firebase_admin import firestore
+
+from firebase_memory_manager import FirestoreMemoryStore
+from firebase_paged_memory_manager import PagedFirestoreMemoryStore, migrate_chat
+from migrate_paged_layout import migrate
+from tests.fake_firestore import FakeFirestore
+
+
+def _pages(db, chat_id):
+    chat_ref = db.collection('users').document('profile').collection('chats').document(chat_id)
+    return [p.to_dict() for p in chat_ref.collection('pages').order_by('index').stream()]
+
+
+def test_recent_context_costs_one_query():
+    db = FakeFirestore()
+    store = PagedFirestoreMemoryStore(db=db, page_size=50)
+    chat_id = None
+    for i in range(100):
+        chat_id = asyncio.run(store.store_message("uid", "profile", "swag", f"m{i}", f"r{i}", chat_id))
+    assert [p['count'] for p in _pages(db, chat_id)] == [50, 50]
+
+    db.reads = db.round_trips = 0
+    turns = asyncio.run(store.get_recent_turns(chat_id, "uid", "profile", limit=100))
+
+    assert [t.message for t in turns] == [f"m{i}" for i in range(99, -1, -1)]
+    assert db.round_trips == 1
+    assert db.reads == 2
+
+
+def test_partial_newest_page_costs_one_extra_page():
+    db = FakeFirestore()
+    store = PagedFirestoreMemoryStore(db=db, page_size=50)
+    chat_id = None
+    for i in range(120):
+        chat_id = asyncio.run(store.store_message("uid", "profile", "swag", f"m{i}", f"r{i}", chat_id))
+    assert [p['count'] for p in _pages(db, chat_id)] == [50, 50, 20]
+
+    db.reads = db.round_trips = 0
+    turns = asyncio.run(store.get_recent_turns(chat_id, "uid", "profile", limit=100))
+
+    assert [t.message for t in turns] == [f"m{i}" for i in range(119, 19, -1)]
+    assert db.round_trips == 2
+    assert db.reads == 3
+
+
+def test_concurrent_appends_keep_every_turn():
+    db = FakeFirestore()
+    store = PagedFirestoreMemoryStore(db=db, page_size=5)
+    chat_id = asyncio.run(store.store_message("uid", "profile", "swag", "first", "r", None))
+
+    def append(i):
+        asyncio.run(store.store_message("uid", "profile", "swag", f"m{i}", "r", chat_id))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(append, range(40)))
+
+    pages = _pages(db, chat_id)
+    assert [p['index'] for p in pages] == list(range(len(pages)))
+    assert all(len(p['turns']) == p['count'] <= 5 for p in pages)
+    messages = {t['message'] for p in pages for t in p['turns']}
+    assert messages == {"first"} | {f"m{i}" for i in range(40)}
+
+
+def test_migration_tool_converts_legacy_chats():
+    db = FakeFirestore()
+    legacy = FirestoreMemoryStore(db=db)
+    chat_id = None
+    for i in range(7):
+        chat_id = asyncio.run(legacy.store_message("uid", "profile", "swag", f"m{i}", f"r{i}", chat_id))
+    before = asyncio.run(legacy.get_chat_messages(chat_id, "uid", "profile"))
+
+    assert asyncio.run(migrate(db, dry_run=True)) == 1
+    assert asyncio.run(migrate(db, delete_legacy=True, page_size=3)) == 1
+    assert asyncio.run(migrate(db)) == 0
+
+    store = PagedFirestoreMemoryStore(db=db, page_size=3)
+    after = asyncio.run(store.get_chat_messages(chat_id, "uid", "profile"))
+    assert [(m['id'], m['message'], m['timestamp']) for m in after] == \
+        [(m['id'], m['message'], m['timestamp']) for m in before]
+    assert [p['count'] for p in _pages(db, chat_id)] == [3, 3, 1]
+    history = asyncio.run(store.get_chat_history("uid", "profile"))
+    assert history[0]['last_message'] == "m6"
+    assert 'page_count' not in history[0]
+
+
+def test_legacy_chat_is_migrated_on_next_write():
+    db = FakeFirestore()
+    chat_id = asyncio.run(FirestoreMemoryStore(db=db).store_message("uid", "profile", "swag", "old", "r", None))
+
+    store = PagedFirestoreMemoryStore(db=db)
+    asyncio.run(store.store_message("uid", "profile", "swag", "new", "r", chat_id))
+
+    assert [t.message for t in asyncio.run(store.get_recent_turns(chat_id, "uid", "profile"))] == ["new", "old"]
+    assert _pages(db, chat_id)[0]['count'] == 2
+
+
+def _legacy_chat(db, count):
+    legacy = FirestoreMemoryStore(db=db)
+    chat_id = None
+    for i in range(count):
+        chat_id = asyncio.run(legacy.store_message("uid", "profile", "swag", f"old{i}", "r", chat_id))
+    return chat_id
+
+
+def test_concurrent_writes_to_legacy_chat_migrate_it_once():
+    db = FakeFirestore(latency=0.001)
+    chat_id = _legacy_chat(db, 7)
+    store = PagedFirestoreMemoryStore(db=db, page_size=3)
+
+    def append(i):
+        asyncio.run(store.store_message("uid", "profile", "swag", f"new{i}", "r", chat_id))
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(append, range(2)))
+
+    pages = _pages(db, chat_id)
+    messages = [t['message'] for p in pages for t in p['turns']]
+    assert sorted(messages) == sorted([f"old{i}" for i in range(7)] + ["new0", "new1"])
+    assert messages[:7] == [f"old{i}" for i in range(7)]
+    chat = db.collection('users').document('profile').collection('chats').document(chat_id).get().to_dict()
+    assert chat['turn_count'] == 9
+    assert chat['page_count'] == len(pages)
+    assert chat['last_page_turns'] == pages[-1]['count']
+    assert 'migration' not in chat
+
+
+def test_migration_packs_legacy_writes_made_while_it_runs(monkeypatch):
+    import firebase_paged_memory_manager as paged
+
+    db = FakeFirestore()
+    chat_id = _legacy_chat(db, 4)
+    chat_ref = db.collection('users').document('profile').collection('chats').document(chat_id)
+    build_pages = paged.build_pages
+
+    def build_then_write(turns, page_size, page_max_bytes):
+        # A legacy writer lands after the migration snapshot
+        if len(turns) == 4:
+            chat_ref.collection('messages').document().set({
+                'message': "late", 'response': "r", 'personality': "swag",
+                'user_id': "uid", 'profile_id': "profile", 'timestamp': firestore.SERVER_TIMESTAMP,
+            })
+        return build_pages(turns, page_size, page_max_bytes)
+
+    monkeypatch.setattr(paged, "build_pages", build_then_write)
+    assert asyncio.run(paged.migrate_chat(db, chat_ref, page_size=3)) == 5
+
+    store = PagedFirestoreMemoryStore(db=db, page_size=3)
+    turns = asyncio.run(store.get_recent_turns(chat_id, "uid", "profile"))
+    assert [t.message for t in turns] == ["late", "old3", "old2", "old1", "old0"]
+    assert [p['count'] for p in _pages(db, chat_id)] == [3, 2]
+
+
+def test_migration_splits_batches_of_large_pages():
+    db = FakeFirestore()
+    chat_ref = db.collection('users').document('profile').collection('chats').document('big')
+    chat_ref.set({'title': "Big chat"})
+    # Fifteen ~850 KiB turns: one per page, ~12.5 MiB in all
+    for i in range(15):
+        chat_ref.collection('messages').document(f"m{i:02d}").set({
+            'message': f"{i}" + "x" * (850 * 1024), 'response': "r", 'timestamp': firestore.SERVER_TIMESTAMP,
+        })
+
+    assert asyncio.run(migrate_chat(db, chat_ref, page_size=50)) == 15
+    assert [p['count'] for p in _pages(db, 'big')] == [1] * 15
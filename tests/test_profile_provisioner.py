@@ -0,0 +1,77 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from profile_provisioner import ProfileProvisioner, profile_id_for_user
+
+
+def test_profile_id_is_derived_from_claims_or_provider():
+    google = SimpleNamespace(uid="u1", custom_claims=None, provider_data=[SimpleNamespace(provider_id="google.com")])
+    bare = SimpleNamespace(uid="u2", custom_claims={}, provider_data=[])
+    claimed = SimpleNamespace(uid="u3", custom_claims={"profile_id": "p3"}, provider_data=[])
+
+    assert profile_id_for_user(google) == "u1_google.com"
+    assert profile_id_for_user(bare) == "u2_firebase"
+    assert profile_id_for_user(claimed) == "p3"
+
+
+def test_claims_are_written_once_in_the_background():
+    calls = []
+    provisioner = ProfileProvisioner(set_claims=lambda uid, claims: calls.append((uid, claims)))
+
+    async def scenario():
+        assert provisioner.request("u1", "u1_google.com", {"role": "user"})
+        # Same user again while queued: no second write
+        assert not provisioner.request("u1", "u1_google.com", {"role": "user"})
+        assert calls == []
+        await provisioner.drain()
+        assert not provisioner.request("u1", "u1_google.com", {"role": "user"})
+
+    asyncio.run(scenario())
+    assert calls == [("u1", {"role": "user", "profile_id": "u1_google.com"})]
+    assert provisioner.stats()["provisioned"] == 1
+    assert provisioner.stats()["queue_depth"] == 0
+
+
+def test_failed_writes_are_retried_on_next_request():
+    attempts = []
+
+    def set_claims(uid, claims):
+        attempts.append(uid)
+        if len(attempts) == 1:
+            raise RuntimeError("auth unavailable")
+
+    provisioner = ProfileProvisioner(set_claims=set_claims)
+
+    async def scenario():
+        provisioner.request("u1", "u1_firebase")
+        await provisioner.drain()
+        assert provisioner.request("u1", "u1_firebase")
+        await provisioner.drain()
+
+    asyncio.run(scenario())
+    assert attempts == ["u1", "u1"]
+    assert provisioner.stats()["failed"] == 1
+    assert provisioner.stats()["completed"] == 1
+
+
+def test_remembered_users_are_bounded():
+    calls = []
+    provisioner = ProfileProvisioner(set_claims=lambda uid, claims: calls.append(uid), max_provisioned=2)
+
+    async def scenario():
+        for uid in ("u1", "u2", "u3"):
+            provisioner.request(uid, f"{uid}_firebase")
+            await provisioner.drain()
+        # u1 was the least recently seen and has been forgotten
+        assert not provisioner.request("u3", "u3_firebase")
+        assert provisioner.request("u1", "u1_firebase")
+        await provisioner.drain()
+
+    asyncio.run(scenario())
+    assert calls == ["u1", "u2", "u3", "u1"]
+    assert provisioner.stats()["provisioned"] == 2
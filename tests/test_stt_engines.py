@@ -0,0 +1,176 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import stt_engines
+from app.services import stt_service as stt_module
+from app.services.stt_engines import (
+    GoogleEngine, RecognizerPool, SpeechNotRecognizedError, STTEngine, VoskEngine, create_engines, engine_stats
+)
+from app.services.stt_service import STTService
+from app.services.vad import VADResult
+from metrics import get_metrics
+
+
+class FakeEngine(STTEngine):
+    def __init__(self, name, fail=False, unheard=False, languages=None):
+        self.name = name
+        self.fail = fail
+        self.unheard = unheard
+        self.languages = languages
+        self.calls = 0
+
+    def supports(self, language):
+        return self.languages is None or language in self.languages
+
+    def recognize(self, pcm, sample_rate, language):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        if self.unheard:
+            raise SpeechNotRecognizedError(f"{self.name} could not understand the audio")
+        return f"{self.name}:{language}"
+
+
+class FakeModel:
+    loads = 0
+
+    def __init__(self, path):
+        FakeModel.loads += 1
+        self.path = path
+
+
+class FakeRecognizer:
+    created = 0
+
+    def __init__(self, model, sample_rate):
+        FakeRecognizer.created += 1
+        self.fed = 0
+
+    def AcceptWaveform(self, data):
+        time.sleep(0.01)
+        self.fed += len(data)
+        return self.fed == 16000  # An utterance ends after the first 0.5 s
+
+    def Result(self):
+        return json.dumps({"text": "namaste"})
+
+    def FinalResult(self):
+        self.fed = 0
+        return json.dumps({"text": "bhai"})
+
+
+class FakeVosk:
+    Model = FakeModel
+    KaldiRecognizer = FakeRecognizer
+
+
+def _transcribe(service, monkeypatch, **kwargs):
+    async def decoded(*args, **kw):
+        return b"\x01\x00" * 16000, VADResult(0, 32000, 1.0, 10.0, 1.0)
+
+    monkeypatch.setattr(stt_module, "run_in_process", decoded)
+    return asyncio.run(service.transcribe_audio(b"upload", **kwargs))
+
+
+def test_fallback_and_per_request_selection(monkeypatch):
+    google = FakeEngine("google", fail=True)
+    vosk = FakeEngine("vosk", languages={"en", "hi"})
+    service = STTService(engines=[google, vosk])
+
+    fallbacks = engine_stats.fallbacks
+    assert _transcribe(service, monkeypatch, language="hi") == ("vosk:hi", None)
+    assert engine_stats.fallbacks == fallbacks + 1
+    assert _transcribe(service, monkeypatch, language="en", engine="vosk") == ("vosk:en", None)
+    assert google.calls == 1  # The requested engine answered; no fallback needed
+
+    # Only Google does Spanish, and it is down
+    assert _transcribe(service, monkeypatch, language="es") == (None, "google down")
+    text, error = _transcribe(service, monkeypatch, engine="whisper")
+    assert text is None and "not available" in error
+
+
+def test_unrecognized_speech_does_not_fall_back(monkeypatch):
+    vosk = FakeEngine("vosk")
+    service = STTService(engines=[FakeEngine("google", unheard=True), vosk])
+    assert _transcribe(service, monkeypatch) == (None, "google could not understand the audio")
+    assert vosk.calls == 0
+
+
+def test_vosk_loads_models_once_and_pools_recognizers(tmp_path, monkeypatch):
+    (tmp_path / "vosk-model-small-en").mkdir()
+    monkeypatch.setattr(stt_engines, "vosk", FakeVosk)
+    FakeModel.loads = FakeRecognizer.created = 0
+    engine = VoskEngine(models_dir=str(tmp_path), pool_size=2)
+    assert engine.available() and engine.supports("en") and not engine.supports("hi")
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(engine.recognize(b"\x00" * 48000, 16000, "en")))
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["namaste bhai"] * 6
+    assert FakeModel.loads == 1
+    assert FakeRecognizer.created == 2
+    assert engine.stats()["en:16000"]["idle"] == 2
+
+
+def test_create_engines_skips_vosk_without_models(tmp_path, monkeypatch):
+    monkeypatch.setattr(stt_engines, "vosk", None)
+    engines = create_engines(["vosk", "google"])
+    assert [type(engine) for engine in engines] == [GoogleEngine]
+    assert [type(engine) for engine in create_engines(["vosk"])] == [GoogleEngine]
+
+
+def test_discarded_recognizers_wake_waiters():
+    pool = RecognizerPool(object, size=1)
+    first = pool.acquire()
+    acquired = []
+
+    def worker():
+        recognizer = pool.acquire()
+        acquired.append(recognizer)
+        pool.discard()  # Every recognizer errors out
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    assert pool.stats()["waits"] == 3
+    pool.discard()
+    for thread in threads:
+        thread.join(timeout=2)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert len(acquired) == 3 and first not in acquired
+    assert pool.stats()["created"] == 0
+
+
+def test_vosk_pool_stats_are_published(tmp_path, monkeypatch):
+    (tmp_path / "vosk-model-small-en").mkdir()
+    monkeypatch.setattr(stt_engines, "vosk", FakeVosk)
+    monkeypatch.setitem(stt_engines.ENGINE_TYPES, "vosk", lambda: VoskEngine(models_dir=str(tmp_path), pool_size=2))
+    engine = create_engines(["vosk"])[0]
+    engine.recognize(b"\x00" * 16000, 16000, "en")
+    assert get_metrics()["stt_vosk"]["en:16000"]["created"] == 1
+
+
+def test_engine_without_recognize_cannot_be_constructed():
+    class Incomplete(STTEngine):
+        name = "incomplete"
+
+    with pytest.raises(TypeError, match="recognize"):
+        Incomplete()
@@ -0,0 +1,101 @@
+import asyncio
+import math
+import struct
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from pydub import AudioSegment
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import audio_codec, stt_engines
+from app.services import stt_service as stt_module
+from app.services.audio_codec import AudioCodecError, AudioTooLongError, decode_pcm
+from app.services.stt_engines import GoogleEngine
+from app.services.stt_service import STTService
+from app.services.vad import VADResult, decode_speech
+
+
+def _segment(seconds: float) -> AudioSegment:
+    samples = int(seconds * 16000)
+    pcm = struct.pack(f"<{samples}h", *(int(6000 * math.sin(i / 5)) for i in range(samples)))
+    return AudioSegment(data=pcm, sample_width=2, frame_rate=16000, channels=1)
+
+
+def test_transcribe_never_touches_disk(monkeypatch):
+    service = STTService(engines=[GoogleEngine()])
+    decoded = []
+
+    async def fake_run_in_process(pool, fn, data, sample_rate, max_seconds, decode_timeout, timeout=None):
+        decoded.append((pool, fn, data, sample_rate))
+        return _segment(2.0).raw_data, VADResult(0, 64000, 0.8, 40.0, 3.0)
+
+    def fake_recognize_google(audio_data, language):
+        seen.append((len(audio_data.frame_data), language))
+        return "namaste"
+
+    def no_temp_files(*args, **kwargs):
+        raise AssertionError("temporary file created")
+
+    seen = []
+    monkeypatch.setattr(stt_module, "run_in_process", fake_run_in_process)
+    monkeypatch.setattr(service.engines[0].recognizer, "recognize_google", fake_recognize_google)
+    monkeypatch.setattr(stt_engines.sr, "AudioFile", no_temp_files)
+    monkeypatch.setattr("tempfile.NamedTemporaryFile", no_temp_files)
+
+    text, error = asyncio.run(service.transcribe_audio(b"upload", language="hi"))
+    assert (text, error) == ("namaste", None)
+    assert decoded == [("audio_decode", decode_speech, b"upload", 16000)]
+    assert seen == [(64000, "hi-IN")]
+
+
+def test_silent_clip_skips_recognition(monkeypatch):
+    service = STTService(engines=[GoogleEngine()])
+
+    async def silent(*args, **kwargs):
+        return b"", VADResult(0, 0, 0.0, 12.0, 5.0)
+
+    def recognize_google(audio_data, language):
+        raise AssertionError("silence sent for recognition")
+
+    monkeypatch.setattr(stt_module, "run_in_process", silent)
+    monkeypatch.setattr(service.engines[0].recognizer, "recognize_google", recognize_google)
+    assert asyncio.run(service.transcribe_audio(b"upload")) == (None, "No speech detected in the audio")
+
+
+def test_decode_failures_become_error_messages(monkeypatch):
+    service = STTService(engines=[GoogleEngine()])
+    for raised, message in (
+        (AudioTooLongError("Audio is longer than 120 seconds"), "Audio is longer than 120 seconds"),
+        (AudioCodecError("ffmpeg failed: Invalid data"), "Unsupported audio format"),
+        (TimeoutError("slow"), "Audio decoding timed out"),
+    ):
+        async def failing(*args, raised=raised, **kwargs):
+            raise raised
+
+        monkeypatch.setattr(stt_module, "run_in_process", failing)
+        assert asyncio.run(service.transcribe_audio(b"upload")) == (None, message)
+
+
+def test_decode_pcm_stops_ffmpeg_past_the_limit(monkeypatch):
+    commands = []
+
+    def fake_run(command, input, **kwargs):
+        commands.append(command)
+        seconds = float(command[command.index("-t") + 1]) if "-t" in command else 1.0
+        return subprocess.CompletedProcess(command, 0, stdout=b"\0\0" * int(seconds * 16000), stderr=b"")
+
+    monkeypatch.setattr(audio_codec.subprocess, "run", fake_run)
+    with pytest.raises(AudioTooLongError):
+        decode_pcm(b"long upload", max_seconds=10)
+    command = commands[0]
+    assert "-f" not in command[:command.index("-i")]  # Container is probed, not assumed
+    assert command[command.index("-ar") + 1] == "16000"
+    assert command[-2:] == ["s16le", "pipe:1"]
+
+    # Spooled uploads are read by ffmpeg from disk
+    assert len(decode_pcm("/uploads/clip.upload")) == 32000
+    assert commands[1][commands[1].index("-i") + 1] == "/uploads/clip.upload"
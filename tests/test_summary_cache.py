@@ -0,0 +1,65 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from firebase_memory_manager import FirestoreMemoryStore
+from summary_cache import SummaryCache
+from tests.fake_firestore import FakeFirestore
+
+MEMORY = [{"role": "user", "content": "my exam is on monday"}]
+
+
+def test_store_updates_cache_and_bumps_version():
+    cache = SummaryCache(fresh_seconds=60)
+    db = FakeFirestore()
+    store = FirestoreMemoryStore(db=db, summary_cache=cache)
+
+    asyncio.run(store.store_compressed_memory("chat", "uid", "profile", MEMORY))
+    asyncio.run(store.store_compressed_memory("chat", "uid", "profile", MEMORY + MEMORY))
+    doc = db.collection('users').document('profile').collection('summary').document('chat').get()
+    assert doc.to_dict()['version'] == 2
+
+    reads = db.reads
+    assert asyncio.run(store.get_compressed_memory("chat", "uid", "profile")) == MEMORY + MEMORY
+    assert db.reads == reads
+    assert cache.stats()["hits"] == 1
+
+
+def test_other_worker_write_is_detected_by_version_check():
+    cache = SummaryCache(fresh_seconds=0)
+    db = FakeFirestore()
+    worker_a = FirestoreMemoryStore(db=db, summary_cache=cache)
+
+    asyncio.run(worker_a.store_compressed_memory("chat", "uid", "profile", MEMORY))
+    assert asyncio.run(worker_a.get_compressed_memory("chat", "uid", "profile")) == MEMORY
+    assert cache.stats()["revalidations"] == 1
+
+    # Simulate a different worker process writing a newer summary directly
+    summary_ref = db.collection('users').document('profile').collection('summary').document('chat')
+    summary_ref.set({'compressed_memory': [], 'version': 2})
+    assert asyncio.run(worker_a.get_compressed_memory("chat", "uid", "profile")) == []
+    assert cache.stats()["stale"] == 1
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = SummaryCache(max_bytes=200, fresh_seconds=60)
+    for i in range(10):
+        cache.put(("profile", f"chat{i}"), 1, [{"role": "user", "content": "x" * 40}])
+    stats = cache.stats()
+    assert stats["bytes"] <= 200
+    assert stats["evictions"] > 0
+    assert cache.lookup(("profile", "chat9"))[0] == 1
+    assert cache.lookup(("profile", "chat0"))[0] is None
+
+
+def test_older_version_never_replaces_newer_entry():
+    cache = SummaryCache(fresh_seconds=60)
+    cache.put("key", 2, MEMORY + MEMORY)
+    # A slow reader that fetched version 1 before the write finishes now
+    cache.put("key", 1, MEMORY)
+    assert cache.lookup("key")[:2] == (2, MEMORY + MEMORY)
+    cache.put("key", 3, [])
+    assert cache.lookup("key")[:2] == (3, [])
@@ -0,0 +1,125 @@
+import asyncio
+import base64
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.x509.oid import NameOID
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from token_verifier import FirebaseTokenVerifier, StaleKeysError, UnknownKeyError, parse_max_age
+
+PROJECT_ID = "gigabhai-test"
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _certificate(key) -> str:
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.test")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    return cert.public_bytes(serialization.Encoding.PEM).decode("ascii")
+
+
+def _token(key, kid="key-1", alg="RS256", **overrides) -> str:
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "sub": "user-123",
+        "iat": now,
+        "auth_time": now,
+        "exp": now + 3600,
+        "profile_id": "user-123_google.com",
+    }
+    claims.update(overrides)
+    signing_input = f"{_b64(json.dumps({'alg': alg, 'kid': kid}).encode())}.{_b64(json.dumps(claims).encode())}"
+    signature = key.sign(signing_input.encode("ascii"), padding.PKCS1v15(), hashes.SHA256())
+    return f"{signing_input}.{_b64(signature)}"
+
+
+@pytest.fixture(scope="module")
+def key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def verifier(key):
+    verifier = FirebaseTokenVerifier(PROJECT_ID)
+    verifier.load_certificates({"key-1": _certificate(key)})
+    return verifier
+
+
+def test_valid_token_returns_claims_with_uid(verifier, key):
+    claims = verifier.verify(_token(key))
+    assert claims["uid"] == "user-123"
+    assert claims["profile_id"] == "user-123_google.com"
+    assert verifier.stats()["verified"] == 1
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"aud": "other-project"}, "audience"),
+    ({"iss": "https://securetoken.google.com/other-project"}, "issuer"),
+    ({"exp": int(time.time()) - 3600}, "expired"),
+    ({"exp": int(time.time()) - 5}, "expired"),  # No leeway on exp
+    ({"iat": int(time.time()) + 3600}, "before issued"),
+    ({"sub": ""}, "subject"),
+])
+def test_invalid_claims_are_rejected(verifier, key, overrides, message):
+    with pytest.raises(ValueError, match=message):
+        verifier.verify(_token(key, **overrides))
+
+
+def test_signature_and_key_checks(verifier, key):
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with pytest.raises(ValueError, match="signature"):
+        verifier.verify(_token(other_key))
+    with pytest.raises(ValueError, match="algorithm"):
+        verifier.verify(_token(key, alg="HS256"))
+    with pytest.raises(UnknownKeyError):
+        verifier.verify(_token(key, kid="rotated-key"))
+    with pytest.raises(ValueError, match="Malformed"):
+        verifier.verify("not-a-token")
+    assert verifier.stats()["rejected"] == 4
+
+
+def test_refresh_loads_keys_and_honours_max_age(key):
+    def handler(request):
+        return httpx.Response(200, json={"key-1": _certificate(key)},
+                              headers={"Cache-Control": "public, max-age=19800, must-revalidate"})
+
+    verifier = FirebaseTokenVerifier(PROJECT_ID, transport=httpx.MockTransport(handler))
+    assert not verifier.ready
+    assert asyncio.run(verifier.refresh()) == 19800
+    assert verifier.verify(_token(key))["uid"] == "user-123"
+    assert 19700 < verifier.stats()["keys_expire_in"] <= 19800
+    assert parse_max_age(None) == 3600
+
+
+def test_stale_keys_are_only_trusted_for_a_grace_period(key):
+    verifier = FirebaseTokenVerifier(PROJECT_ID, stale_grace=600)
+    # Refreshes have been failing since the keys' max-age ran out 5 minutes ago
+    verifier.load_certificates({"key-1": _certificate(key)}, max_age=-300)
+    assert verifier.verify(_token(key))["uid"] == "user-123"
+
+    verifier.load_certificates({"key-1": _certificate(key)}, max_age=-900)
+    with pytest.raises(StaleKeysError):
+        verifier.verify(_token(key))
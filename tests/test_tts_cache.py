@@ -0,0 +1,112 @@
+import asyncio
+import os
+import sys
+import threading
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import tts_service
+from app.services.tts_cache import TTSCache, cache_key
+from app.services.tts_engines import GTTSEngine
+from app.services.tts_service import TTSService
+
+
+def test_key_ignores_whitespace_but_not_language_or_format():
+    assert cache_key("Namaste  bhai\n", "hi", "wav") == cache_key(" Namaste bhai", "hi", "wav")
+    assert cache_key("Namaste bhai", "hi", "wav") != cache_key("Namaste bhai", "en", "wav")
+    assert cache_key("Namaste bhai", "hi", "wav") != cache_key("Namaste bhai", "hi", "mp3")
+
+
+def test_lru_eviction_and_reload(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=250)
+    keys = [cache_key(f"line {i}", "en", "wav") for i in range(3)]
+    cache.put(keys[0], b"a" * 100, "wav")
+    cache.put(keys[1], b"b" * 100, "wav")
+    assert cache.get(keys[0]) == b"a" * 100
+    cache.put(keys[2], b"c" * 100, "wav")
+
+    assert cache.get(keys[1]) is None
+    assert not os.path.exists(tmp_path / f"{keys[1]}.wav")
+    assert cache.stats()["evictions"] == 1
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    reloaded = TTSCache(str(tmp_path), max_bytes=250)
+    assert reloaded.stats()["bytes"] == 200
+    assert reloaded.get(keys[2]) == b"c" * 100
+
+
+def test_async_get_reads_off_the_event_loop(tmp_path, monkeypatch):
+    cache = TTSCache(str(tmp_path))
+    key = cache_key("Chai", "en", "mp3")
+    cache.put(key, b"ID3chai", "mp3")
+    readers = []
+    get = cache.get
+
+    def recording_get(k):
+        readers.append(threading.current_thread().name)
+        return get(k)
+
+    monkeypatch.setattr(cache, "get", recording_get)
+    assert asyncio.run(cache.get_async(key)) == b"ID3chai"
+    assert asyncio.run(cache.get_async(cache_key("Paani", "en", "mp3"))) is None
+    assert readers and readers[0] != threading.main_thread().name
+    assert len(readers) == 1  # A miss never leaves the event loop
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def _fake_service(tmp_path, monkeypatch):
+    rendered, encoded = [], []
+
+    def fake_synthesize(text, lang_code, persona=None):
+        rendered.append((text, lang_code))
+        return f"MP3{text}".encode()
+
+    def fake_encode(data, audio_format, source_format="mp3"):
+        if audio_format == source_format:
+            return data
+        encoded.append(audio_format)
+        return audio_format.upper().encode() + data
+
+    engine = GTTSEngine()
+    engine.synthesize = fake_synthesize
+    service = TTSService(
+        output_dir=str(tmp_path / "out"), cache=TTSCache(str(tmp_path / "cache")), engines=[engine]
+    )
+    monkeypatch.setattr(tts_service, "encode_speech", fake_encode)
+    return service, rendered, encoded
+
+
+def test_service_synthesizes_each_text_once(tmp_path, monkeypatch):
+    service, rendered, _ = _fake_service(tmp_path, monkeypatch)
+
+    async def scenario():
+        first, _ = await service.get_audio("Kya haal hai?", "hi")
+        second, _ = await service.get_audio("Kya  haal hai? ", "hi")
+        path, _ = await service.text_to_speech("Kya haal hai?", "hi")
+        return first, second, path
+
+    first, second, path = asyncio.run(scenario())
+    assert first == second == b"WAVMP3Kya haal hai?"
+    assert rendered == [("Kya haal hai?", "hi")]
+    assert Path(path).read_bytes() == first
+    assert service.cache.stats()["hits"] == 2
+
+
+def test_formats_share_one_synthesis_and_mp3_skips_transcoding(tmp_path, monkeypatch):
+    service, rendered, encoded = _fake_service(tmp_path, monkeypatch)
+
+    async def scenario():
+        mp3, _ = await service.get_audio("Chai pi lo", "en", audio_format="mp3")
+        ogg, _ = await service.get_audio("Chai pi lo", "en", audio_format="ogg")
+        ogg_again, _ = await service.get_audio("Chai pi lo", "en", audio_format="ogg")
+        flac, error = await service.get_audio("Chai pi lo", "en", audio_format="flac")
+        return mp3, ogg, ogg_again, flac, error
+
+    mp3, ogg, ogg_again, flac, error = asyncio.run(scenario())
+    assert mp3 == b"MP3Chai pi lo"
+    assert ogg == ogg_again == b"OGGMP3Chai pi lo"
+    assert rendered == [("Chai pi lo", "en")]
+    assert encoded == ["ogg"]
+    assert flac is None and "Unsupported" in error
@@ -0,0 +1,94 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import tts_engines
+from app.services.tts_cache import TTSCache
+from app.services.tts_engines import EspeakEngine, GTTSEngine, TTSEngine, create_engines, engine_stats, persona_rate
+from app.services.tts_service import TTSService
+
+
+class FlakyEngine(TTSEngine):
+    def __init__(self, name, native_format, fail=False):
+        self.name = name
+        self.native_format = native_format
+        self.fail = fail
+        self.calls = 0
+
+    def synthesize(self, text, lang_code, persona=None):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return f"{self.name}:{text}".encode()
+
+
+def test_espeak_uses_persona_rates(monkeypatch):
+    commands = []
+
+    def fake_run(command, input, **kwargs):
+        commands.append((command, input))
+        return subprocess.CompletedProcess(command, 0, stdout=b"RIFF....WAVE", stderr=b"")
+
+    monkeypatch.setattr(tts_engines.subprocess, "run", fake_run)
+    engine = EspeakEngine(binary="espeak-ng")
+    assert engine.synthesize("-v hack", "zh-CN", "ceo_bhai") == b"RIFF....WAVE"
+
+    command, text = commands[0]
+    assert command[command.index("-s") + 1] == "150"
+    assert command[command.index("-v") + 1] == "cmn"
+    assert text == b"-v hack"  # Text goes through stdin, never argv
+    assert [persona_rate(p) for p in ("swag", "roast_bhai", "vidhyarthi", "jugadu", None)] == [180, 170, 160, 155, 160]
+    assert engine.voice_key("en", "swag") != engine.voice_key("en", "ceo")
+    assert GTTSEngine().voice_key("en", "swag") == "en"
+
+
+def test_fallback_output_is_served_but_not_cached(tmp_path):
+    primary = FlakyEngine("primary", "mp3", fail=True)
+    fallback = FlakyEngine("fallback", "mp3")
+    service = TTSService(cache=TTSCache(str(tmp_path)), engines=[primary, fallback])
+    fallbacks = engine_stats.fallbacks
+
+    async def speak():
+        return await service.get_audio("Kya haal?", "en", audio_format="mp3")
+
+    assert asyncio.run(speak()) == (b"fallback:Kya haal?", None)
+    assert service.cache.stats()["entries"] == 0
+    assert engine_stats.fallbacks == fallbacks + 1
+
+    # Once the preferred engine is back its voice replaces the fallback's, and is cached
+    primary.fail = False
+    assert asyncio.run(speak()) == (b"primary:Kya haal?", None)
+    assert asyncio.run(speak()) == (b"primary:Kya haal?", None)
+    assert primary.calls == 2
+    assert engine_stats.stats()["engines"]["primary"]["failures"] >= 1
+
+
+def test_every_engine_failing_reports_an_error(tmp_path):
+    service = TTSService(
+        cache=TTSCache(str(tmp_path)),
+        engines=[FlakyEngine("a", "mp3", fail=True), FlakyEngine("b", "wav", fail=True)]
+    )
+    data, error = asyncio.run(service.get_audio("Hello", audio_format="mp3"))
+    assert data is None
+    assert "a down" in error and "b down" in error
+
+
+def test_unavailable_engines_are_skipped():
+    engines = create_engines(["espeak", "nope", "gtts"])
+    names = [engine.name for engine in engines]
+    assert names[-1] == "gtts" and "nope" not in names
+    assert ("espeak" in names) == EspeakEngine().available()
+
+
+def test_engine_without_synthesize_cannot_be_constructed():
+    class Incomplete(TTSEngine):
+        name = "incomplete"
+
+    with pytest.raises(TypeError, match="synthesize"):
+        Incomplete()
@@ -0,0 +1,106 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.api.endpoints import speech
+from app.services.tts_cache import TTSCache
+from app.services.tts_engines import TTSEngine
+from app.services.tts_service import TTSService
+
+
+class Mp3Engine(TTSEngine):
+    name = "fake"
+    native_format = "mp3"
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def synthesize(self, text, lang_code, persona=None):
+        if self.fail:
+            raise RuntimeError("down")
+        return b"ID3" + text.encode() * 4
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    service = TTSService(cache=TTSCache(str(tmp_path)), engines=[Mp3Engine()])
+    monkeypatch.setattr(speech, "tts_service", service)
+    app = FastAPI()
+    app.include_router(speech.router, prefix="/api/speech")
+    return TestClient(app)
+
+
+def test_cached_audio_is_served_by_key_with_immutable_headers(client):
+    posted = client.post("/api/speech/tts", json={"text": "Namaste bhai", "format": "mp3"})
+    assert posted.status_code == 200
+    key = posted.headers["x-tts-key"]
+    assert posted.headers["content-location"] == f"/api/speech/tts/{key}"
+    assert "immutable" in posted.headers["cache-control"]
+
+    fetched = client.get(f"/api/speech/tts/{key}")
+    assert fetched.status_code == 200
+    assert fetched.content == posted.content
+    assert fetched.headers["content-type"] == "audio/mpeg"
+    assert fetched.headers["cache-control"] == speech.IMMUTABLE_CACHE_CONTROL
+    assert fetched.headers["etag"] == posted.headers["etag"]
+
+    revalidated = client.get(f"/api/speech/tts/{key}", headers={"If-None-Match": f'W/"x", {fetched.headers["etag"]}'})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+
+def test_range_requests(client):
+    key = client.post("/api/speech/tts", json={"text": "Chai", "format": "mp3"}).headers["x-tts-key"]
+    audio = client.get(f"/api/speech/tts/{key}").content
+    size = len(audio)
+
+    partial = client.get(f"/api/speech/tts/{key}", headers={"Range": "bytes=2-5"})
+    assert partial.status_code == 206
+    assert partial.content == audio[2:6]
+    assert partial.headers["content-range"] == f"bytes 2-5/{size}"
+
+    assert client.get(f"/api/speech/tts/{key}", headers={"Range": "bytes=-3"}).content == audio[-3:]
+    assert client.get(f"/api/speech/tts/{key}", headers={"Range": "bytes=4-"}).content == audio[4:]
+
+    unsatisfiable = client.get(f"/api/speech/tts/{key}", headers={"Range": f"bytes={size}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{size}"
+
+    # A stale If-Range falls back to the full body
+    stale = client.get(f"/api/speech/tts/{key}", headers={"Range": "bytes=0-1", "If-Range": '"old"'})
+    assert stale.status_code == 200 and stale.content == audio
+
+
+def test_unknown_or_uncached_audio_is_not_served_by_key(client, monkeypatch):
+    assert client.get("/api/speech/tts/" + "0" * 64).status_code == 404
+    assert client.get("/api/speech/tts/not-a-key").status_code == 404
+
+    # Fallback output is not cached, so it gets no key and stays uncacheable
+    fallback = TTSService(cache=speech.tts_service.cache, engines=[Mp3Engine(fail=True), Mp3Engine()])
+    monkeypatch.setattr(speech, "tts_service", fallback)
+    response = client.post("/api/speech/tts", json={"text": "Kya haal", "format": "mp3"})
+    assert response.status_code == 200
+    assert "x-tts-key" not in response.headers
+    assert response.headers["cache-control"].startswith("no-cache")
+    assert response.headers["etag"]
+
+
+def test_long_ogg_text_is_served_as_one_file(client, monkeypatch):
+    rendered = []
+
+    async def render_full(text, language="en", audio_format="wav", persona=None):
+        rendered.append(audio_format)
+        return b"OggS" + text.encode(), None
+
+    monkeypatch.setattr(speech.tts_service, "render_full", render_full)
+    response = client.post("/api/speech/tts", json={"text": "One sentence. Another one.", "format": "ogg"})
+    assert response.status_code == 200
+    assert rendered == ["ogg"]
+    assert response.content.count(b"OggS") == 1
+    assert response.headers["content-length"] == str(len(response.content))
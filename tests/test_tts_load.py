@@ -0,0 +1,62 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.tts_cache import TTSCache
+from app.services.tts_engines import GTTSEngine
+from app.services.tts_service import TTSService
+from blocking_io import run_blocking
+from memory_store import create_memory_store
+
+SYNTHESIS_SECONDS = 0.2
+
+
+def _chat_turn(store):
+    """The memory-store work of one /chat request: read context, write both turns."""
+    chat = {}
+
+    async def turn(i):
+        start = time.perf_counter()
+        if "id" in chat:
+            await store.get_recent_turns(chat["id"], "user", "profile", limit=10)
+        chat["id"] = await store.store_message(
+            "user", "profile", "swag", message=f"message {i}", response="reply", chat_id=chat.get("id")
+        )
+        return time.perf_counter() - start
+    return turn
+
+
+def test_chat_latency_stays_flat_under_tts_load(tmp_path):
+    def blocking_synthesis(text, lang_code, persona=None):
+        # gTTS holds the calling thread for the whole network round trip
+        time.sleep(SYNTHESIS_SECONDS)
+        return text.encode()
+
+    engine = GTTSEngine()
+    engine.synthesize = blocking_synthesis
+    service = TTSService(cache=TTSCache(str(tmp_path / "cache")), engines=[engine])
+    store = create_memory_store("sqlite", path=str(tmp_path / "chat.db"))
+    turn = _chat_turn(store)
+
+    async def measure():
+        return [await turn(i) for i in range(10)]
+
+    async def scenario():
+        idle = await measure()
+        tts_load = [
+            asyncio.ensure_future(service.get_audio(f"Line number {i}.", audio_format="mp3"))
+            for i in range(24)
+        ]
+        loaded = await measure()
+        results = await asyncio.gather(*tts_load)
+        return idle, loaded, results
+
+    idle, loaded, results = asyncio.run(scenario())
+    assert all(data and not error for data, error in results)
+    # 24 renders of 0.2s each: a blocked loop would add seconds to every turn
+    assert max(loaded) < max(idle) + SYNTHESIS_SECONDS / 2
+    assert asyncio.run(run_blocking("tts", lambda: "idle")) == "idle"
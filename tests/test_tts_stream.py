@@ -0,0 +1,143 @@
+import asyncio
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.audio_codec import PCMFormat, wav_samples
+from app.services.tts_cache import TTSCache
+from app.services.tts_engines import TTSEngine
+from app.services.tts_service import TTSError, TTSService, split_sentences, stream_stats
+
+
+def _wav(samples: bytes, sample_rate: int = 24000) -> bytes:
+    fmt = struct.pack("<HHIIHH", 1, 1, sample_rate, sample_rate * 2, 2, 16)
+    return (
+        b"RIFF" + struct.pack("<I", 36 + len(samples)) + b"WAVE"
+        + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        + b"data" + struct.pack("<I", len(samples)) + samples
+    )
+
+
+def test_split_sentences():
+    text = "Arre bhai!  Kya scene hai? Chal, chai peete hain. Aur phir kaam karte hain. नमस्ते। ठीक है."
+    assert split_sentences(text, max_chars=40) == [
+        "Arre bhai!",
+        "Kya scene hai? Chal, chai peete hain.",
+        "Aur phir kaam karte hain. नमस्ते।",
+        "ठीक है.",
+    ]
+    long_sentence = "one, two, three " + "x" * 30
+    assert all(len(chunk) <= 12 for chunk in split_sentences(long_sentence, max_chars=12))
+    assert split_sentences("  \n ") == []
+
+
+def _service(tmp_path, delays, fail=None):
+    service = TTSService(cache=TTSCache(str(tmp_path)))
+    active, peak = [0], [0]
+
+    async def fake_get_audio(text, language="en", audio_format="wav", persona=None):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(delays.get(text, 0))
+        active[0] -= 1
+        if text == fail:
+            return None, "synthesis failed"
+        return _wav(text.encode()) if audio_format == "wav" else text.encode(), None
+
+    service.get_audio = fake_get_audio
+    return service, peak
+
+
+def test_stream_keeps_order_with_bounded_parallelism(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.tts_service.TTS_CHUNK_MAX_CHARS", 8)
+    text = "One. Two. Three. Four. Five."
+    # Later chunks finish first; the stream must still come out in order
+    service, peak = _service(tmp_path, {"One.": 0.05, "Two.": 0.03, "Three.": 0.01})
+    first_audio = stream_stats.time_to_first_audio.count
+
+    async def collect(audio_format):
+        return [piece async for piece in service.stream_audio(text, audio_format=audio_format, concurrency=2)]
+
+    assert asyncio.run(collect("mp3")) == [b"One.", b"Two.", b"Three.", b"Four.", b"Five."]
+    assert peak[0] == 2
+
+    wav = b"".join(asyncio.run(collect("wav")))
+    assert wav.count(b"RIFF") == 1
+    assert struct.unpack_from("<I", wav, 4)[0] == 0xFFFFFFFF
+    assert wav.endswith(b"One.Two.Three.Four.Five.")
+    assert stream_stats.time_to_first_audio.count == first_audio + 2
+
+
+def test_stream_stops_at_failed_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.tts_service.TTS_CHUNK_MAX_CHARS", 8)
+    service, _ = _service(tmp_path, {}, fail="Two.")
+
+    async def collect():
+        received = []
+        with pytest.raises(TTSError, match="synthesis failed"):
+            async for piece in service.stream_audio("One. Two. Three.", audio_format="mp3"):
+                received.append(piece)
+        return received
+
+    assert asyncio.run(collect()) == [b"One."]
+
+
+def test_ogg_is_not_streamed_as_chained_files(tmp_path):
+    service, _ = _service(tmp_path, {})
+
+    async def collect():
+        return [piece async for piece in service.stream_audio("One. Two.", audio_format="ogg")]
+
+    with pytest.raises(ValueError, match="cannot be streamed"):
+        asyncio.run(collect())
+
+
+def test_wav_stream_resamples_chunks_from_another_engine(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.tts_service.TTS_CHUNK_MAX_CHARS", 8)
+    service = TTSService(cache=TTSCache(str(tmp_path)))
+    resampled = []
+
+    async def fake_get_audio(text, language="en", audio_format="wav", persona=None):
+        # "Two." came from the 22.05 kHz fallback engine
+        return _wav(text.encode(), 22050 if text == "Two." else 24000), None
+
+    def fake_resample(data, pcm_format):
+        source, samples = wav_samples(data)
+        resampled.append((source.sample_rate, pcm_format))
+        return _wav(bytes(samples).upper(), pcm_format.sample_rate)
+
+    service.get_audio = fake_get_audio
+    monkeypatch.setattr("app.services.tts_service.resample_wav", fake_resample)
+
+    async def collect():
+        return [piece async for piece in service.stream_audio("One. Two. Three.", audio_format="wav")]
+
+    wav = b"".join(asyncio.run(collect()))
+    assert wav_samples(wav)[0].sample_rate == 24000
+    assert wav.endswith(b"One.TWO.Three.")
+    assert resampled == [(22050, PCMFormat(24000, 1, 2))]
+
+
+class WavEngine(TTSEngine):
+    name = "wav"
+    native_format = "wav"
+
+    def synthesize(self, text, lang_code, persona=None):
+        return _wav(text.encode())
+
+
+def test_render_full_assembles_chunks_into_one_file(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.tts_service.TTS_CHUNK_MAX_CHARS", 8)
+    service = TTSService(cache=TTSCache(str(tmp_path)), engines=[WavEngine()])
+
+    data, error = asyncio.run(service.render_full("One. Two. Three.", audio_format="wav"))
+    assert error is None
+    assert data.count(b"RIFF") == 1
+    assert bytes(wav_samples(data)[1]) == b"One.Two.Three."
+    # Each chunk was cached on its own for the next request
+    assert service.cache.stats()["entries"] == 3
@@ -0,0 +1,53 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.tts_service import split_sentences
+from app.services.tts_warmup import TTSWarmup, warm_texts
+from personalities import ERROR_REPLY, FAST_PATH_REPLIES, MEMORY_PATCH_REPLY, PERSONALITY_PROMPTS
+
+
+class RecordingService:
+    def __init__(self, fail_language=None):
+        self.requests = []
+        self.fail_language = fail_language
+
+    async def get_audio(self, text, language="en", audio_format="wav", persona=None):
+        self.requests.append((text, language, audio_format))
+        if language == self.fail_language:
+            return None, "gTTS unreachable"
+        return b"audio", None
+
+
+def test_warms_every_intro_and_canned_reply_as_the_endpoint_looks_them_up():
+    service = RecordingService()
+    warmup = TTSWarmup(languages=["en", "hi"], formats=["mp3"])
+    asyncio.run(warmup.run(service))
+
+    texts = [text for text, _ in warm_texts()]
+    assert all(persona["intro"] in texts for persona in PERSONALITY_PROMPTS.values())
+    assert all(reply in texts for reply in FAST_PATH_REPLIES)
+    assert ERROR_REPLY in texts and MEMORY_PATCH_REPLY in texts
+    expected = {chunk for text in texts for chunk in split_sentences(text)}
+    for language in ("en", "hi"):
+        assert {text for text, lang, _ in service.requests if lang == language} == expected
+    assert len(service.requests) == 2 * len(expected)
+    assert warmup.stats()["ready"] is True
+    assert warmup.stats()["rendered"] == len(service.requests)
+
+
+def test_failures_are_counted_but_do_not_block_readiness():
+    service = RecordingService(fail_language="hi")
+    warmup = TTSWarmup(languages=["en", "hi"], formats=["wav"])
+    assert warmup.ready is False
+
+    async def scenario():
+        await warmup.start(service)
+
+    asyncio.run(scenario())
+    stats = warmup.stats()
+    assert stats["ready"] is True
+    assert stats["failed"] == stats["rendered"] == stats["total"] // 2
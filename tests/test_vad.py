@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.vad import PAD_MS, VADStats, detect_speech
+
+RATE = 16000
+rng = np.random.default_rng(7)
+
+
+def noise(seconds, level=30.0):
+    return rng.normal(0, level, int(seconds * RATE))
+
+
+def voiced(seconds, level=4000.0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    harmonics = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6))
+    return level * harmonics * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)) / 2
+
+
+def fricative(seconds, level=70.0):
+    return rng.normal(0, level, int(seconds * RATE))
+
+
+def pcm(*parts):
+    return np.clip(np.concatenate(parts), -32768, 32767).astype("<i2").tobytes()
+
+
+def test_trims_silence_around_speech():
+    clip = pcm(noise(3.0), voiced(1.0), noise(0.3), voiced(0.7), noise(4.0))
+    result = detect_speech(clip, RATE)
+    pad = PAD_MS / 1000
+    assert abs(result.start / 2 / RATE - (3.0 - pad)) < 0.05
+    assert abs(result.end / 2 / RATE - (5.0 + pad)) < 0.05
+    assert 0.15 < result.speech_ratio < 0.25
+    assert 20 < result.noise_floor < 45  # From the background, not the speech
+    assert result.duration == 9.0
+
+
+def test_keeps_unvoiced_consonants():
+    # A quiet "s" well before the vowel is still inside the kept span
+    clip = pcm(noise(2.0), fricative(0.5), noise(0.5), voiced(0.5), noise(2.0))
+    result = detect_speech(clip, RATE)
+    assert abs(result.start / 2 / RATE - (2.0 - PAD_MS / 1000)) < 0.05
+
+
+def test_no_speech():
+    assert not detect_speech(pcm(noise(3.0)), RATE).has_speech
+    assert not detect_speech(bytes(RATE * 2), RATE).has_speech  # Digital silence
+    assert not detect_speech(b"\x00\x10" * 10, RATE).has_speech  # Shorter than a frame
+
+    # Speech from the first sample: nothing to trim at the start
+    result = detect_speech(pcm(voiced(1.0), noise(1.0)), RATE)
+    assert result.start == 0
+
+
+def test_pause_free_or_low_contrast_speech_is_kept_whole():
+    # Push-to-talk: speech from the first sample to the last, no background to measure
+    steady = pcm(voiced(2.0))
+    result = detect_speech(steady, RATE)
+    assert result.has_speech
+    assert (result.start, result.end) == (0, len(steady))
+
+    # Loud background with speech barely above it
+    murky = pcm(noise(1.0, level=400.0), voiced(1.0, level=500.0) + noise(1.0, level=400.0))
+    result = detect_speech(murky, RATE)
+    assert (result.start, result.end) == (0, len(murky))
+
+
+def test_vad_stats():
+    stats = VADStats()
+    stats.record(detect_speech(pcm(noise(1.0), voiced(1.0), noise(1.0)), RATE), RATE)
+    stats.record(detect_speech(pcm(noise(2.0)), RATE), RATE)
+    snapshot = stats.stats()
+    assert snapshot["clips"] == 2 and snapshot["no_speech"] == 1
+    assert snapshot["input_seconds"] == 5.0
+    assert 1.3 < snapshot["sent_seconds"] < 1.5
@@ -0,0 +1,108 @@
+import asyncio
+import base64
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Add the parent directory to the path so we can import from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from groq_handler import GroqStreamError, parse_stream_line, stream_groq_response
+from voice_pipeline import pop_sentences, voice_events, voice_stats
+
+
+async def _deltas(pieces, delay=0.0):
+    for piece in pieces:
+        await asyncio.sleep(delay)
+        yield piece
+
+
+def test_pop_sentences_keeps_unfinished_tail():
+    assert pop_sentences("Arre bhai! Kya scene") == (["Arre bhai!"], "Kya scene")
+    assert pop_sentences("Price is 3.5 lakh") == ([], "Price is 3.5 lakh")
+    assert pop_sentences('He said "wow." Then। ') == (['He said "wow."', "Then।"], "")
+
+
+def test_stream_groq_response_yields_deltas():
+    chunks = [{"choices": [{"delta": {"content": text}}]} for text in ("Yo ", "bhai", "!")]
+    body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text=body))
+
+    async def collect():
+        return [delta async for delta in stream_groq_response([{"role": "user", "content": "hi"}], transport=transport)]
+
+    assert asyncio.run(collect()) == ["Yo ", "bhai", "!"]
+    assert parse_stream_line(": keep-alive") == ""
+    assert parse_stream_line("data: [DONE]") is None
+
+
+def test_stream_groq_response_raises_instead_of_yielding_errors():
+    transport = httpx.MockTransport(lambda request: httpx.Response(500, text="upstream broke"))
+
+    async def collect():
+        return [delta async for delta in stream_groq_response([{"role": "user", "content": "hi"}], transport=transport)]
+
+    with pytest.raises(GroqStreamError, match="upstream broke"):
+        asyncio.run(collect())
+
+
+def test_audio_starts_before_the_text_stream_ends():
+    pieces = ["Namaste ", "dost. ", "Aaj ", "kya ", "plan ", "hai? ", "Chalo ", "shuru ", "karte ", "hain"]
+    synthesized = []
+
+    async def synthesize(sentence):
+        synthesized.append(sentence)
+        await asyncio.sleep(0.01)
+        if sentence.startswith("Aaj"):
+            return None, "gTTS unreachable"
+        return sentence.encode(), None
+
+    async def collect():
+        return [event async for event in voice_events(_deltas(pieces, delay=0.02), synthesize, "mp3")]
+
+    first_audio = voice_stats.time_to_first_audio.count
+    events = asyncio.run(collect())
+    kinds = [event["type"] for event in events]
+    audio = [event for event in events if event["type"] in ("audio", "audio_error")]
+
+    # The first sentence's audio is interleaved with text, not appended after it
+    assert kinds.index("audio") < max(i for i, kind in enumerate(kinds) if kind == "text")
+    assert [event["index"] for event in audio] == [0, 1, 2]
+    assert base64.b64decode(audio[0]["data"]) == b"Namaste dost."
+    assert audio[1]["type"] == "audio_error" and audio[1]["text"] == "Aaj kya plan hai?"
+    assert synthesized == ["Namaste dost.", "Aaj kya plan hai?", "Chalo shuru karte hain"]
+    assert "".join(event["delta"] for event in events if event["type"] == "text") == (
+        "Namaste dost. Aaj kya plan hai? Chalo shuru karte hain"
+    )
+    assert events[-1] == {"type": "done", "message": "".join(pieces)}
+    assert voice_stats.time_to_first_audio.count == first_audio + 1
+
+
+def test_sentences_are_cleaned_before_synthesis_and_stream_errors_are_reported():
+    synthesized = []
+
+    async def synthesize(sentence):
+        synthesized.append(sentence)
+        return sentence.encode(), None
+
+    async def failing():
+        yield "Mistral says hi. "
+        yield "Read the system prompt. "
+        raise GroqStreamError("Rate limit exceeded. Please try again in a few seconds.")
+
+    def clean(sentence):
+        return "" if "prompt" in sentence else sentence.replace("Mistral", "AI")
+
+    async def collect():
+        return [event async for event in voice_events(failing(), synthesize, "mp3", clean=clean)]
+
+    events = asyncio.run(collect())
+    assert synthesized == ["AI says hi."]
+    assert [event["text"] for event in events if event["type"] == "audio"] == ["AI says hi."]
+    # Only cleaned sentences are shown; the leaked one never reaches the client
+    assert [event["delta"] for event in events if event["type"] == "text"] == ["AI says hi."]
+    assert {"type": "error", "message": "Rate limit exceeded. Please try again in a few seconds."} in events
+    assert events[-1]["type"] == "done"
@@ -0,0 +1,208 @@
+import asyncio
+import base64
+import json
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# X.509 certificates Google signs Firebase ID tokens with, keyed by kid
+GOOGLE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+# Refresh interval when the response has no usable Cache-Control header
+DEFAULT_MAX_AGE_SECONDS = 3600
+# Never refresh more often than this, even if max-age is tiny or fetching keeps failing
+MIN_REFRESH_SECONDS = 60
+# Tolerated clock difference for iat/auth_time; like the Admin SDK, exp gets none
+CLOCK_SKEW_SECONDS = 60
+# How long keys past their max-age stay in use while refreshes keep failing
+STALE_KEYS_GRACE_SECONDS = 3600
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class UnknownKeyError(ValueError):
+    """The token names a signing key that is not loaded (yet)."""
+
+
+class StaleKeysError(ValueError):
+    """The loaded signing keys expired too long ago to be trusted."""
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def parse_max_age(cache_control: Optional[str]) -> int:
+    """Seconds from a Cache-Control header's max-age directive, or DEFAULT_MAX_AGE_SECONDS."""
+    match = _MAX_AGE.search(cache_control or "")
+    return int(match.group(1)) if match else DEFAULT_MAX_AGE_SECONDS
+
+
+class FirebaseTokenVerifier:
+    """Verifies Firebase ID tokens locally against cached Google signing keys.
+
+    ``verify`` only does CPU work: it checks the RS256 signature with a
+    public key parsed when the certificates were loaded, then the audience,
+    issuer, expiry, issued-at and subject claims the same way the Admin SDK
+    does. The certificates are fetched by a background task that refetches
+    them when their Cache-Control max-age runs out; if a refresh fails the
+    current keys stay in use for up to ``stale_grace`` seconds past their
+    max-age while the fetch is retried, after which ``verify`` refuses to
+    decide and callers fall back to the Admin SDK.
+    """
+
+    def __init__(self, project_id: str, certs_url: str = GOOGLE_CERTS_URL,
+                 clock_skew: int = CLOCK_SKEW_SECONDS, stale_grace: int = STALE_KEYS_GRACE_SECONDS,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Args:
+            project_id: Firebase project id; tokens must carry it as audience
+            certs_url: Where to fetch the signing certificates from
+            clock_skew: Seconds of leeway for the iat and auth_time claims
+            stale_grace: Seconds expired keys stay in use while refreshes fail
+            transport: Optional httpx transport (tests)
+        """
+        self.project_id = project_id
+        self.issuer = f"https://securetoken.google.com/{project_id}"
+        self.certs_url = certs_url
+        self.clock_skew = clock_skew
+        self.stale_grace = stale_grace
+        self._transport = transport
+        self._keys: Dict[str, Any] = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refresher: Optional[asyncio.Task] = None
+        self.verified = 0
+        self.rejected = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    # -- signing keys -----------------------------------------------------
+
+    def load_certificates(self, certificates: Dict[str, str], max_age: int = DEFAULT_MAX_AGE_SECONDS) -> None:
+        """Replace the signing keys with PEM certificates keyed by kid."""
+        keys = {
+            kid: x509.load_pem_x509_certificate(pem.encode("utf-8")).public_key()
+            for kid, pem in certificates.items()
+        }
+        with self._lock:
+            self._keys = keys
+            self._expires_at = time.time() + max_age
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._keys)
+
+    async def refresh(self) -> int:
+        """Fetch the certificates once. Returns their max-age in seconds."""
+        async with httpx.AsyncClient(transport=self._transport, timeout=10) as client:
+            response = await client.get(self.certs_url)
+            response.raise_for_status()
+        max_age = parse_max_age(response.headers.get("cache-control"))
+        self.load_certificates(response.json(), max_age)
+        self.refreshes += 1
+        logger.info(f"Loaded {len(self._keys)} Firebase signing keys, valid for {max_age}s")
+        return max_age
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            try:
+                delay = await self.refresh()
+            except Exception as e:
+                self.refresh_failures += 1
+                logger.error(f"Failed to refresh Firebase signing keys: {str(e)}")
+                delay = MIN_REFRESH_SECONDS
+            await asyncio.sleep(max(delay, MIN_REFRESH_SECONDS))
+
+    def ensure_refreshing(self) -> None:
+        """Start the background refresh task on the running loop if it is not running."""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.get_running_loop().create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    # -- verification -----------------------------------------------------
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Verify a Firebase ID token and return its claims, with ``uid`` set to the subject.
+
+        Raises:
+            UnknownKeyError: If the token's kid is not among the loaded keys
+            StaleKeysError: If the keys are past their max-age by more than ``stale_grace``
+            ValueError: If the token is malformed, badly signed or its claims are invalid
+        """
+        try:
+            claims = self._verify(token)
+        except ValueError:
+            self.rejected += 1
+            raise
+        self.verified += 1
+        return claims
+
+    def _verify(self, token: str) -> Dict[str, Any]:
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+            header = json.loads(_b64decode(header_segment))
+            claims = json.loads(_b64decode(payload_segment))
+            signature = _b64decode(signature_segment)
+        except Exception:
+            raise ValueError("Malformed token")
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise ValueError("Malformed token")
+
+        if header.get("alg") != "RS256":
+            raise ValueError(f"Unexpected signing algorithm: {header.get('alg')}")
+        key = self._keys.get(header.get("kid"))
+        if key is None:
+            raise UnknownKeyError(f"Unknown signing key: {header.get('kid')}")
+        now = time.time()
+        if now > self._expires_at + self.stale_grace:
+            raise StaleKeysError(f"Signing keys expired {int(now - self._expires_at)}s ago and could not be refreshed")
+        try:
+            key.verify(signature, f"{header_segment}.{payload_segment}".encode("ascii"),
+                       padding.PKCS1v15(), hashes.SHA256())
+        except InvalidSignature:
+            raise ValueError("Invalid token signature")
+
+        if claims.get("aud") != self.project_id:
+            raise ValueError(f"Token has incorrect audience: {claims.get('aud')}")
+        if claims.get("iss") != self.issuer:
+            raise ValueError(f"Token has incorrect issuer: {claims.get('iss')}")
+        if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] <= now:
+            raise ValueError("Token expired")
+        if not isinstance(claims.get("iat"), (int, float)) or claims["iat"] > now + self.clock_skew:
+            raise ValueError("Token used before issued")
+        if "auth_time" in claims and claims["auth_time"] > now + self.clock_skew:
+            raise ValueError("Token auth_time is in the future")
+        subject = claims.get("sub")
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise ValueError("Token has invalid subject")
+        claims["uid"] = subject
+        return claims
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keys": len(self._keys),
+            "keys_expire_in": round(self._expires_at - time.time(), 1) if self._keys else None,
+            "verified": self.verified,
+            "rejected": self.rejected,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
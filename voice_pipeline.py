@@ -0,0 +1,193 @@
+import asyncio
+import base64
+import logging
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import TTS_STREAM_CONCURRENCY
+from metrics import LatencyStats, register_metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# End of a sentence: terminal punctuation (Latin or Devanagari danda), optional
+# closing quotes/brackets, then whitespace so "3.5" or "..." mid-stream is not a break
+_SENTENCE_BREAK = re.compile(r"[.!?।॥]+[\"'’”)\]]*\s+")
+
+Synthesize = Callable[[str], Awaitable[Tuple[Optional[bytes], Optional[str]]]]
+
+
+def pop_sentences(buffer: str) -> Tuple[List[str], str]:
+    """
+    Take the complete sentences off the front of streamed text.
+
+    Args:
+        buffer: Text received so far and not yet consumed
+
+    Returns:
+        Tuple of (complete sentences, unfinished remainder)
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_BREAK.finditer(buffer):
+        sentence = buffer[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, buffer[start:]
+
+
+class VoiceStats:
+    """Counters and end-to-end latencies of voice-mode replies."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.replies = 0
+        self.sentences = 0
+        self.audio_failures = 0
+        self.time_to_first_text = LatencyStats()
+        self.time_to_first_audio = LatencyStats()
+
+    def record(self, replies: int = 0, sentences: int = 0, audio_failures: int = 0) -> None:
+        with self._lock:
+            self.replies += replies
+            self.sentences += sentences
+            self.audio_failures += audio_failures
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {
+                "replies": self.replies,
+                "sentences": self.sentences,
+                "audio_failures": self.audio_failures,
+            }
+        return {
+            **counters,
+            "time_to_first_text": self.time_to_first_text.snapshot(),
+            "time_to_first_audio": self.time_to_first_audio.snapshot(),
+        }
+
+
+voice_stats = VoiceStats()
+register_metrics("voice_pipeline", voice_stats.stats)
+
+
+async def voice_events(
+    deltas: AsyncIterator[str],
+    synthesize: Synthesize,
+    audio_format: str = "mp3",
+    concurrency: int = TTS_STREAM_CONCURRENCY,
+    started: Optional[float] = None,
+    clean: Optional[Callable[[str], str]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Interleave an LLM text stream with audio for each sentence it completes.
+
+    Every time the stream completes a sentence, its cleaned text is emitted
+    and its synthesis starts (at most ``concurrency`` at once); the audio is
+    emitted in sentence order as soon as it is ready, between whatever text
+    events are flowing. Raw model output is never emitted except as part of
+    the done message, which the caller post-processes before showing it.
+
+    Events, as dicts ready for NDJSON:
+        {"type": "text", "delta": str}  (one cleaned sentence, space-joined)
+        {"type": "audio", "index": int, "text": str, "format": str, "data": base64 str}
+        {"type": "audio_error", "index": int, "text": str, "error": str}
+        {"type": "error", "message": str}  (the text stream broke off)
+        {"type": "done", "message": str}  (the full raw reply, always last)
+
+    Args:
+        deltas: Text deltas from the LLM
+        synthesize: Coroutine rendering one sentence to (audio_bytes, error)
+        audio_format: Format the synthesize callable produces, echoed in audio events
+        concurrency: Sentences synthesized in parallel
+        started: perf_counter() at request start, for the latency metrics
+        clean: Rewrites each sentence before it is shown and synthesized;
+            sentences it empties are dropped
+    """
+    started = started or time.perf_counter()
+    events: asyncio.Queue = asyncio.Queue()
+    renders: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(concurrency)
+    parts: List[str] = []
+    shown = 0
+
+    async def render(sentence: str) -> Tuple[Optional[bytes], Optional[str]]:
+        async with semaphore:
+            try:
+                return await synthesize(sentence)
+            except Exception as e:
+                return None, str(e)
+
+    def schedule(sentence: str) -> None:
+        nonlocal shown
+        if clean is not None:
+            sentence = clean(sentence)
+            if not sentence:
+                return
+        if not shown:
+            voice_stats.time_to_first_text.observe(time.perf_counter() - started)
+        events.put_nowait({"type": "text", "delta": sentence if not shown else " " + sentence})
+        shown += 1
+        renders.put_nowait((sentence, asyncio.ensure_future(render(sentence))))
+
+    async def read_text() -> None:
+        buffer = ""
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+                sentences, buffer = pop_sentences(buffer + delta)
+                for sentence in sentences:
+                    schedule(sentence)
+            if buffer.strip():
+                schedule(buffer.strip())
+        except Exception as e:
+            # Keep the audio already scheduled; the reply just ends here
+            logger.error(f"Voice reply text stream failed: {str(e)}")
+            events.put_nowait({"type": "error", "message": str(e)})
+        finally:
+            renders.put_nowait(None)
+
+    async def emit_audio() -> None:
+        index = 0
+        while True:
+            item = await renders.get()
+            if item is None:
+                return
+            sentence, task = item
+            data, error = await task
+            if error or not data:
+                voice_stats.record(audio_failures=1)
+                logger.warning(f"Voice reply sentence {index} failed to synthesize: {error}")
+                events.put_nowait({"type": "audio_error", "index": index, "text": sentence, "error": error or "No audio"})
+            else:
+                if index == 0:
+                    voice_stats.time_to_first_audio.observe(time.perf_counter() - started)
+                events.put_nowait({
+                    "type": "audio",
+                    "index": index,
+                    "text": sentence,
+                    "format": audio_format,
+                    "data": base64.b64encode(data).decode("ascii"),
+                })
+            voice_stats.record(sentences=1)
+            index += 1
+
+    producers = asyncio.gather(read_text(), emit_audio())
+    producers.add_done_callback(lambda _: events.put_nowait(None))
+    voice_stats.record(replies=1)
+    try:
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+        yield {"type": "done", "message": "".join(parts)}
+    finally:
+        producers.cancel()
+        while not renders.empty():
+            item = renders.get_nowait()
+            if item is not None:
+                item[1].cancel()